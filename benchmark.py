@@ -0,0 +1,331 @@
+import argparse
+import atexit
+import contextlib
+import functools
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+VOICE_DIR = os.path.join(ROOT, "record-and-ai-response")
+sys.path.insert(0, VOICE_DIR)
+# Measure the real work, not cache lookups
+os.environ.setdefault("WHISPER_CACHE", "off")
+os.environ.setdefault("LLM_CACHE", "off")
+# Whatever the suite stores (notes, and any cache left on) goes to a scratch directory, never the user's
+SCRATCH_DIR = tempfile.mkdtemp(prefix="ai-tests-benchmark-")
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+os.environ["NOTES_DB_PATH"] = os.path.join(SCRATCH_DIR, "notes.sqlite")
+os.environ["LLM_CACHE_PATH"] = os.path.join(SCRATCH_DIR, "completions.sqlite")
+os.environ["WHISPER_CACHE_PATH"] = os.path.join(SCRATCH_DIR, "transcripts.sqlite")
+
+from audio_capture import read_wav, resample_poly, WHISPER_SAMPLE_RATE
+from vad import synthetic_speech
+from ollama_stub import start_stub_server
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmark_baseline.json")
+FIXTURES = [os.path.join(ROOT, "test_audio.wav"), os.path.join(ROOT, "test_audio_manual.wav")]
+
+
+class FakeInputStream:
+    """
+    Stands in for sounddevice.InputStream: plays FakeInputStream.source into the callback
+    block by block from a background thread, speed times faster than real time, then
+    keeps sending quiet noise until the stream is closed.
+    """
+    source = np.zeros(0, dtype=np.float32)
+    speed = 8.0
+    quiet_level = 1e-4
+
+    def __init__(self, samplerate=16000, channels=1, blocksize=512, callback=None, **kwargs):
+        self.samplerate = samplerate
+        self.blocksize = blocksize or 512
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        audio = FakeInputStream.source
+        rng = np.random.default_rng(0)
+        delay = self.blocksize / self.samplerate / FakeInputStream.speed
+        position = 0
+        while not self._stop.is_set():
+            block = audio[position:position + self.blocksize]
+            if block.size < self.blocksize:
+                tail = rng.standard_normal(self.blocksize - block.size).astype(np.float32) * FakeInputStream.quiet_level
+                block = np.concatenate((block, tail))
+            position += self.blocksize
+            self.callback(block.reshape(-1, 1), self.blocksize, None, None)
+            time.sleep(delay)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="fake-input", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def _install_fake_devices(give_up_after):
+    # record_audio polls keyboard.is_pressed('q'); it reports a press only if the VAD never ends the recording
+    sounddevice = types.ModuleType("sounddevice")
+    sounddevice.InputStream = FakeInputStream
+    keyboard = types.ModuleType("keyboard")
+    keyboard.started = time.perf_counter()
+    keyboard.is_pressed = lambda key: time.perf_counter() - keyboard.started > give_up_after
+    sys.modules["sounddevice"] = sounddevice
+    sys.modules["keyboard"] = keyboard
+    return keyboard
+
+
+def _load_script(path, name):
+    # The scripts have hyphenated file names, so they are loaded by path
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its RSS high-water mark, so each stage gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import tracing
+    return tracing._peak_rss_mb()
+
+
+def measure(fn, repeat, audio_seconds=None):
+    """
+    Runs fn repeat times with its output silenced.
+    :return: Dict with the median wall and CPU seconds, peak RSS and real-time factor.
+    """
+    walls, cpus = [], []
+    _reset_peak_rss()
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    wall = statistics.median(walls)
+    return {
+        'wall': round(wall, 4),
+        'cpu': round(statistics.median(cpus), 4),
+        'peak_rss_mb': _peak_rss_mb(),
+        'rtf': round(wall / audio_seconds, 4) if audio_seconds else None,
+    }
+
+
+def measure_startup(path, repeat):
+    """
+    Launches a fresh interpreter that only imports the script (its __main__ block doesn't run),
+    i.e. the delay before a recording script can open the microphone.
+    :return: Dict like measure(); CPU time is the child's, peak RSS isn't tracked.
+    """
+    code = ("import importlib.util, sys; sys.path.insert(0, sys.argv[1]); "
+            "spec = importlib.util.spec_from_file_location('script', sys.argv[2]); "
+            "spec.loader.exec_module(importlib.util.module_from_spec(spec))")
+    walls, cpus = [], []
+    for _ in range(repeat):
+        before = os.times()
+        wall = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code, VOICE_DIR, path], check=True, capture_output=True)
+        walls.append(time.perf_counter() - wall)
+        after = os.times()
+        cpus.append(after.children_user + after.children_system - before.children_user - before.children_system)
+    return {'wall': round(statistics.median(walls), 4), 'cpu': round(statistics.median(cpus), 4),
+            'peak_rss_mb': None, 'rtf': None}
+
+
+def fixture_audio():
+    pieces = []
+    for path in FIXTURES:
+        samples, rate = read_wav(path)
+        pieces.append(resample_poly(samples, rate))
+    return np.concatenate(pieces)
+
+
+def utterance(background, speech_seconds):
+    """
+    Fixture background with synthetic speech mixed in from 0.3s, so the VAD has an utterance to end on.
+    """
+    offset = int(0.3 * WHISPER_SAMPLE_RATE)
+    speech = synthetic_speech(WHISPER_SAMPLE_RATE, speech_seconds)
+    length = max(background.size, offset + speech.size)
+    audio = np.resize(background, length).astype(np.float32)
+    audio[offset:offset + speech.size] += speech
+    return audio
+
+
+def generated_script(words, error_rate, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ("the quick brown fox jumps over a lazy dog while we record notes about planning "
+                  "meetings budgets venues agendas and follow up emails for next week").split()
+    reference = [rng.choice(vocabulary) for _ in range(words)]
+    hypothesis = []
+    for word in reference:
+        r = rng.random()
+        if r < error_rate / 3:
+            continue
+        hypothesis.append(rng.choice(vocabulary) if r < 2 * error_rate / 3 else word)
+        if 2 * error_rate / 3 <= r < error_rate:
+            hypothesis.append(rng.choice(vocabulary))
+    return " ".join(reference), " ".join(hypothesis)
+
+
+def run_suite(args):
+    results = {}
+    # Time to import each script in a fresh process, before the fake devices are installed here
+    scripts = {'record_and_ai_respond_a': os.path.join(VOICE_DIR, "record-and-ai-respond-a.py"),
+               'record_and_ai_respond_b': os.path.join(VOICE_DIR, "record-and-ai-respond-b.py"),
+               'compare_speech': os.path.join(ROOT, "compare-speech.py")}
+    for name, path in scripts.items():
+        try:
+            results[f'startup.import.{name}'] = measure_startup(path, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"startup.import.{name} skipped: {e.stderr.decode(errors='replace').strip().splitlines()[-1]}")
+
+    keyboard = _install_fake_devices(give_up_after=args.record_timeout)
+    respond_b = _load_script(os.path.join(VOICE_DIR, "record-and-ai-respond-b.py"), "record_and_ai_respond_b")
+    compare_speech = _load_script(os.path.join(ROOT, "compare-speech.py"), "compare_speech")
+
+    def record(module, audio, **kwargs):
+        FakeInputStream.source = audio
+        keyboard.started = time.perf_counter()
+        return module.record_audio(**kwargs)
+
+    # Capture + VAD endpointing on fixture background with a short and a long utterance
+    background = fixture_audio()
+    short = utterance(background, 4.0)
+    long = utterance(background, args.minutes * 60)
+    FakeInputStream.speed = args.speed
+    record_kwargs = dict(samplerate=16000, silence_duration=1.5, window_size=10, initial_threshold_multiplier=0.8)
+    results['record_audio.short'] = measure(lambda: record(respond_b, short, **record_kwargs), args.repeat,
+                                            short.size / WHISPER_SAMPLE_RATE)
+    results['record_audio.long'] = measure(lambda: record(respond_b, long, **record_kwargs), 1,
+                                           long.size / WHISPER_SAMPLE_RATE)
+    results['compare_speech.record_audio'] = measure(lambda: record(compare_speech, short), args.repeat,
+                                                     short.size / WHISPER_SAMPLE_RATE)
+
+    # Whisper on the fixtures as recorded and on the generated long clip
+    if not args.skip_whisper:
+        import whisper_models
+        whisper_models.get_model(args.model)  # Load time isn't part of the stage
+        transcribe = functools.partial(respond_b.transcribe_audio_with_whisper, model_name=args.model)
+        results['transcribe.fixtures'] = measure(lambda: transcribe(background), args.repeat,
+                                                 background.size / WHISPER_SAMPLE_RATE)
+        results['transcribe.long'] = measure(lambda: transcribe(long), 1, long.size / WHISPER_SAMPLE_RATE)
+
+    # Word alignment of a long script against a noisy transcription
+    reference, hypothesis = generated_script(args.script_words, 0.1)
+    results['compare_scripts'] = measure(lambda: compare_speech.compare_scripts(reference, hypothesis), args.repeat)
+
+    # Model round trips against the stub server; Markdown notes go to a temporary directory
+    server = start_stub_server(token_delay=args.token_delay)
+    with tempfile.TemporaryDirectory() as directory:
+        respond_b.save_to_markdown_file = functools.partial(respond_b.save_to_markdown_file, directory=directory)
+        prompt = "Please summarize the following text:\n\n" + hypothesis[:2000]
+        for mode in ("json", "llm"):
+            results[f'process_transcript.{mode}'] = measure(
+                lambda: respond_b.process_transcript(prompt, server.api_url, title_mode=mode, use_cache=False, prefill=False),
+                args.repeat)
+        # Action instruction sent once, then only the transcript per request
+        prefilled = respond_b.ACTION_INSTRUCTIONS['make_todo'] + hypothesis[:2000]
+        results['process_transcript.json.prefilled'] = measure(
+            lambda: respond_b.process_transcript(prefilled, server.api_url, use_cache=False), args.repeat)
+    server.shutdown()
+    return results
+
+
+def compare(results, baseline, tolerance, noise_floor=0.02):
+    """
+    :return: List of (stage, baseline wall, current wall) for stages that got slower than
+             tolerance allows (and by more than noise_floor seconds).
+    """
+    regressions = []
+    for stage, current in results.items():
+        previous = baseline.get('results', {}).get(stage)
+        if previous is None:
+            continue
+        if current['wall'] > previous['wall'] * (1 + tolerance) and current['wall'] - previous['wall'] > noise_floor:
+            regressions.append((stage, previous['wall'], current['wall']))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    previous = (baseline or {}).get('results', {})
+    print(f"{'stage':<40} {'wall s':>9} {'cpu s':>9} {'peak MB':>8} {'RTF':>8} {'vs base':>8}")
+    for stage, row in results.items():
+        rtf = f"{row['rtf']:.3f}" if row['rtf'] is not None else "-"
+        peak = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] else "-"
+        change = "-"
+        if stage in previous and previous[stage]['wall']:
+            change = f"{(row['wall'] / previous[stage]['wall'] - 1) * 100:+.0f}%"
+        print(f"{stage:<40} {row['wall']:>9.3f} {row['cpu']:>9.3f} {peak:>8} {rtf:>8} {change:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recording, transcription, comparison and model round trips "
+                                                 "on the repo's audio fixtures with fake input and a stub Ollama server.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median is reported.")
+    parser.add_argument("--minutes", type=float, default=2, help="Length of the generated long utterance.")
+    parser.add_argument("--speed", type=float, default=8, help="How much faster than real time fake input is played.")
+    parser.add_argument("--record-timeout", type=float, default=120, help="Simulate pressing 'q' after this many seconds.")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--skip-whisper", action="store_true", help="Leave out the transcription stages.")
+    parser.add_argument("--script-words", type=int, default=5000)
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Stub server seconds per generated token.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before a stage is flagged.")
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = run_suite(args)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump({'created': time.strftime("%Y-%m-%d %H:%M:%S"), 'python': platform.python_version(),
+                       'platform': platform.platform(), 'model': args.model, 'results': results}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for stage, before, after in regressions:
+            print(f"REGRESSION {stage}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against the baseline from {baseline.get('created', '?')}.")
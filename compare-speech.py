@@ -1,95 +1,120 @@
-import whisper
+import os
+import sys
+
+# Shared voice helpers live next to the recording scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "record-and-ai-response"))
+# Imported first so startup is timed from here (see lazy_imports)
+import lazy_imports
 import sounddevice as sd
 import numpy as np
-import difflib
 import time
+import threading
 import wave
-import keyboard
-import os
 import re
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import whisper_models
+import quantized_whisper
+import transcription_cache
+import tracing
+from streaming_transcriber import StreamingTranscriber
+from audio_capture import AudioCapture, read_wav, resample_poly
+from vad import VoiceActivityDetector, SPEECH_END, NO_SPEECH, NO_SPEECH_GRACE
+import alignment
+
+# Only needed once recording runs, so it loads after capture has started
+keyboard = lazy_imports.lazy_import("keyboard")
+IMPORT_SECONDS = lazy_imports.since_start()
 
-def record_audio(samplerate=16000, silence_duration=3, window_size=10, initial_threshold_multiplier=0.2):
+def record_audio(samplerate=16000, silence_duration=3, window_size=10, initial_threshold_multiplier=0.2, on_block=None):
     """
-    Records audio continuously, adjusting the silence threshold dynamically in real-time.
+    Records audio until the voice activity detector reports the end of speech, or until
+    silence_duration plus NO_SPEECH_GRACE seconds pass without any speech.
     :param samplerate: The sample rate for audio recording (default: 16000).
     :param silence_duration: The duration (in seconds) of silence after which recording stops.
     :param window_size: The number of seconds of audio to consider for calculating the noise level.
-    :param initial_threshold_multiplier: Multiplier for setting the initial silence threshold based on ambient noise.
-    :return: Numpy array of the recorded audio.
+    :param initial_threshold_multiplier: Speech must also exceed this fraction of the average level over window_size.
+    :param on_block: Optional callback receiving every captured block (e.g. StreamingTranscriber.feed).
+    :return: Numpy array of the recorded audio; empty if no speech was heard.
     """
-    recording = []
-    audio_window = []  # To keep track of recent audio samples
-    is_recording = True
+    # Preallocated buffer with a rolling RMS history of the last window_size seconds
+    capture = AudioCapture(samplerate=samplerate, rms_window=window_size)
+    # Frames are scored as they arrive, so the end of speech is caught on the exact frame
+    vad = VoiceActivityDetector(samplerate=samplerate, silence_duration=silence_duration,
+                                level_ratio=initial_threshold_multiplier, level_window=window_size,
+                                no_speech_timeout=silence_duration + NO_SPEECH_GRACE)
+    end_of_speech = threading.Event()
+    heard_nothing = threading.Event()
 
     def callback(indata, frames, time, status):
-        nonlocal recording, audio_window
-        audio_window.append(np.linalg.norm(indata) * 10)
-        recording.append(indata.copy())  # Store current frame
-        
-        # Maintain the size of the window
-        if len(audio_window) > window_size * samplerate:
-            audio_window.pop(0)
+        capture.write(indata)
+        for event in vad.process(indata):
+            if event.kind == NO_SPEECH:
+                heard_nothing.set()
+            if event.kind in (SPEECH_END, NO_SPEECH):
+                end_of_speech.set()
+        if on_block is not None:
+            on_block(indata)
 
     print("Recording... Press 'q' to stop manually.")
 
-    with sd.InputStream(samplerate=samplerate, channels=1, callback=callback):
-        start_time = time.time()
-        duration_of_silence = 0
-        silence_threshold = None
-
-        while duration_of_silence < silence_duration:
+    with sd.InputStream(samplerate=samplerate, channels=1, blocksize=capture.blocksize, callback=callback):
+        # Wakes immediately on end of speech; the timeout only paces the keypress check
+        while not end_of_speech.wait(0.05):
             if keyboard.is_pressed('q'):
                 print("Recording stopped by keypress.")
-                is_recording = False
                 break
 
-            # Calculate the average noise level
-            if len(audio_window) > 0:
-                average_noise_level = np.mean(audio_window)
-                if silence_threshold is None:
-                    silence_threshold = average_noise_level * initial_threshold_multiplier
-                else:
-                    # Dynamically update the threshold based on the average noise level
-                    silence_threshold = (silence_threshold + average_noise_level * initial_threshold_multiplier) / 2
-
-            # Monitor volume and detect silence
-            if len(audio_window) > 0:
-                volume_norm = np.linalg.norm(recording[-1]) * 10
-                if volume_norm < silence_threshold:
-                    duration_of_silence += len(recording[-1]) / samplerate
-                else:
-                    duration_of_silence = 0  # Reset silence duration if sound is detected
-
-            time.sleep(0.1)  # Small delay to avoid high CPU usage
-
+    startup = lazy_imports.first_sample(capture.first_sample_at)
+    if startup is not None:
+        tracing.event("startup.first_sample", startup)
+    if heard_nothing.is_set():
+        print("No speech detected, recording stopped.")
+        return np.zeros(0, dtype=np.float32)
     print("Recording complete.")
-    return np.concatenate(recording).flatten()
+    return capture.audio()
 
 # 2. Transcription using Whisper
-def transcribe_audio(audio_file):
-    
-    print(f"Transcribing audio... {os.path.exists(audio_file)}")
-    model = whisper.load_model("base")  # Use the base model for quick results
-    result = model.transcribe(audio_file, fp16=False)
-    transcription = result['text'].strip()
+def transcribe_audio(audio_file, model_name="base"):
+    """
+    :param audio_file: Path to an audio file, or 16 kHz float32 samples.
+    :param model_name: The Whisper model to use.
+    :return: The transcript text.
+    """
+    print("Transcribing audio...")
+    if isinstance(audio_file, (str, os.PathLike)):
+        audio_file = load_audio_file(os.fspath(audio_file))
+    # Audio that was already transcribed with this model comes from the transcript cache
+    transcription = transcription_cache.transcribe(audio_file, model_name)['text']
     print("Transcription complete.")
     return transcription
 
 # 3. Compare Script to Transcription
 def compare_scripts(original_script, transcribed_script):
-    # Tokenize and compare using difflib
-    original_words = original_script.split()
-    transcribed_words = transcribed_script.split()
-    
-    # Calculate accuracy
-    matcher = difflib.SequenceMatcher(None, original_words, transcribed_words)
-    accuracy = matcher.ratio() * 100  # Percentage match
-    
-    # Visual representation of what was wrong
-    diff = difflib.ndiff(original_words, transcribed_words)
-    diff_output = "\n".join(diff)
-    
-    return accuracy, diff_output
+    """
+    Aligns the transcription against the script word by word.
+    :return: Tuple of (accuracy as 100 * (1 - WER), compact description of the differences).
+    """
+    result = alignment.align(original_script.split(), transcribed_script.split())
+    accuracy = max(0.0, 1 - result.error_rate) * 100
+    return accuracy, alignment.format_alignment(result)
+
+def score_scripts(original_script, transcribed_script):
+    """
+    :return: Dict with word error rate, character error rate and the word-level edit counts.
+    """
+    words = alignment.word_alignment(original_script, transcribed_script)
+    characters = alignment.character_alignment(original_script, transcribed_script)
+    return {
+        'wer': round(words.error_rate, 4),
+        'cer': round(characters.error_rate, 4),
+        'substitutions': words.substitutions,
+        'deletions': words.deletions,
+        'insertions': words.insertions,
+        'reference_words': words.reference_length,
+    }
 
 # 4. Display Result
 def display_result(accuracy, diff_output):
@@ -97,18 +122,165 @@ def display_result(accuracy, diff_output):
     print("\nDifferences between original and transcription:")
     print(diff_output)
 
+def normalize_script(text):
+    # Lowercase words without punctuation, still separated by single spaces
+    return " ".join(alignment.tokenize(text))
+
+# 5. Batch evaluation over a manifest of script/audio pairs
+def load_manifest(manifest_path):
+    """
+    Reads a JSONL manifest with one {"script": ..., "audio": ...} object per line
+    (an optional "id" is used as the item key, otherwise the line number).
+    Relative audio paths are resolved against the manifest's directory.
+    :return: List of item dicts with 'id', 'script' and 'audio'.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    items = []
+    with open(manifest_path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            items.append({
+                'id': str(entry.get('id', line_number)),
+                'script': entry['script'],
+                'audio': os.path.join(base, entry['audio']),
+            })
+    return items
+
+def load_audio_file(path):
+    """
+    Loads an audio file as 16 kHz float32. WAV files are decoded in-process;
+    anything else goes through whisper's ffmpeg loader.
+    """
+    if path.lower().endswith(".wav"):
+        samples, rate = read_wav(path)
+        return resample_poly(samples, rate)
+    import whisper
+    return whisper.load_audio(path)
+
+def _init_batch_worker(model_name, threads):
+    quantized_whisper.tune_threads(threads)
+    whisper_models.get_model(model_name)
+
+def evaluate_item(item, model_name="base"):
+    """
+    Transcribes one manifest item and scores it against its script.
+    :return: Result dict written as one line of the results file.
+    """
+    start = time.perf_counter()
+    try:
+        audio = load_audio_file(item['audio'])
+        transcription = transcription_cache.transcribe(audio, model_name)['text']
+    except Exception as e:
+        return {'id': item['id'], 'audio': item['audio'], 'error': f"{type(e).__name__}: {e}"}
+    accuracy, diff_output = compare_scripts(normalize_script(item['script']), normalize_script(transcription))
+    return {
+        'id': item['id'],
+        'audio': item['audio'],
+        'accuracy': round(accuracy, 3),
+        **score_scripts(item['script'], transcription),
+        'transcription': transcription,
+        'diff': diff_output,
+        'audio_seconds': round(len(audio) / 16000, 3),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+def summarize_results(results, worst=10):
+    """
+    :param results: Result dicts (items that failed are counted but not scored).
+    :return: Dict with mean/percentile accuracy and the worst-scoring items.
+    """
+    scored = [r for r in results if 'accuracy' in r]
+    summary = {'items': len(results), 'scored': len(scored), 'errors': len(results) - len(scored)}
+    if scored:
+        accuracies = np.array([r['accuracy'] for r in scored])
+        summary.update({
+            'mean': round(float(accuracies.mean()), 3),
+            'p10': round(float(np.percentile(accuracies, 10)), 3),
+            'p50': round(float(np.percentile(accuracies, 50)), 3),
+            'p90': round(float(np.percentile(accuracies, 90)), 3),
+            'min': round(float(accuracies.min()), 3),
+            'mean_wer': round(float(np.mean([r.get('wer', 0.0) for r in scored])), 4),
+            'mean_cer': round(float(np.mean([r.get('cer', 0.0) for r in scored])), 4),
+            'worst': [{'id': r['id'], 'audio': r['audio'], 'accuracy': r['accuracy']}
+                      for r in sorted(scored, key=lambda r: r['accuracy'])[:worst]],
+        })
+    return summary
+
+def run_batch(manifest_path, output_path, model_name="base", workers=2):
+    """
+    Scores every manifest item on a pool of workers that each keep a warm model, appending
+    one JSON line per item to output_path as soon as it finishes. Items already present
+    in output_path are skipped, so an interrupted run picks up where it stopped; items that
+    failed are retried.
+    :return: Aggregate stats over all results in output_path.
+    """
+    items = load_manifest(manifest_path)
+    done = {}  # id -> latest result
+    if os.path.exists(output_path):
+        with open(output_path) as f:
+            for line in f:
+                if line.strip():
+                    result = json.loads(line)
+                    done[result['id']] = result
+    pending = [item for item in items if 'accuracy' not in done.get(item['id'], {})]
+    print(f"{len(items)} items, {len(items) - len(pending)} already scored, {len(pending)} to go.")
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with open(output_path, "a") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(model_name, threads)) as pool:
+        futures = [pool.submit(evaluate_item, item, model_name) for item in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            done[result['id']] = result
+            score = f"{result['accuracy']:.2f}%" if 'accuracy' in result else result['error']
+            print(f"[{i}/{len(pending)}] {result['id']}: {score}")
+
+    summary = summarize_results(list(done.values()))
+    print(json.dumps(summary, indent=2))
+    return summary
+
 # Main function
 def main():
+    parser = argparse.ArgumentParser(description="Compare a read-aloud script against its transcription.")
+    parser.add_argument("--stream", action="store_true", help="Transcribe segments while still recording.")
+    parser.add_argument("--batch", metavar="MANIFEST", help="Score a JSONL manifest of script/audio pairs instead of recording.")
+    parser.add_argument("--output", default="compare-results.jsonl", help="Results file for --batch (appended to, resumable).")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes for --batch.")
+    parser.add_argument("--model", default="base",
+                        help="Whisper model (append .int8, e.g. small.int8, for the quantized CPU backend).")
+    args = parser.parse_args()
+    tracing.event("startup.imports", IMPORT_SECONDS)
+
+    if args.batch:
+        run_batch(args.batch, args.output, model_name=args.model, workers=args.workers)
+        return
+
+    # Warm the model while the script is typed and read
+    whisper_models.preload(args.model)
+
     # Step 1: Input script
-    original_script = re.sub(r'\W+', '', input("Enter the script to be read: ")).lower()
+    original_script = normalize_script(input("Enter the script to be read: "))
+
+    # Step 2 & 3: Record audio, then transcribe it (or transcribe while recording)
+    if args.stream:
+        # Segments at the pauses of the same detector settings record_audio ends the recording with
+        transcriber = StreamingTranscriber(model_name=args.model, level_ratio=0.2, level_window=10).start()
+        record_audio(on_block=transcriber.feed, initial_threshold_multiplier=0.2, window_size=10)
+        transcription = transcriber.finish()
+    else:
+        audio_file = record_audio()
+        if len(audio_file) == 0:
+            return
 
-    # Step 2: Record audio
-    audio_file = record_audio()
+        time.sleep(1)
 
-    time.sleep(1)
+        transcription = transcribe_audio(audio_file, args.model)
 
-    # Step 3: Transcribe the recorded audio
-    transcribed_script = re.sub(r'\W+', '', transcribe_audio(audio_file)).lower()
+    transcribed_script = normalize_script(transcription)
 
     print("Transcribed: " + transcribed_script)
 
@@ -0,0 +1,286 @@
+import argparse
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+NUTRIENTS = ("calories", "carbs", "fat", "protein")
+# The generator page's default ranges
+DEFAULT_TARGETS = {'calories': (1700, 1800), 'carbs': (120, 200), 'fat': (30, 55), 'protein': (190, 210)}
+DEFAULT_FOODS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "foods.json")
+_EPS = 1e-9
+_NO_SUPPLY = 1e18  # Cost per unit of a nutrient nothing left can provide
+
+
+def load_foods(path=DEFAULT_FOODS):
+    with open(path) as file:
+        return json.load(file)
+
+
+def parse_targets(ranges):
+    """
+    :param ranges: {'calories': (min, max), ...} or the generator page's stored ranges
+                   ({'Calories': {'min': ..., 'max': ...}, ...}); missing nutrients are unbounded.
+    :return: (lo, hi) arrays in NUTRIENTS order.
+    """
+    lo = np.full(len(NUTRIENTS), -np.inf)
+    hi = np.full(len(NUTRIENTS), np.inf)
+    for name, bounds in ranges.items():
+        i = NUTRIENTS.index(name.lower())
+        if isinstance(bounds, dict):
+            bounds = (bounds.get('min'), bounds.get('max'))
+        if bounds[0] is not None:
+            lo[i] = bounds[0]
+        if bounds[1] is not None:
+            hi[i] = bounds[1]
+    return lo, hi
+
+
+def serving_levels(food):
+    """
+    Servings a food can be planned at: min_serving to max_serving in serving_step increments.
+    """
+    step = food.get('serving_step') or 0.5
+    low, high = food.get('min_serving', step), food.get('max_serving', food.get('min_serving', step))
+    return [round(float(level), 6) for level in np.arange(low, high + step / 2, step)]
+
+
+class MealPlanSolver:
+    """
+    Cost-minimal meal plans over the enabled foods of a foods.json, by branch and bound.
+
+    Each ungrouped food is one decision (skip it, or pick a serving level); each group is
+    one decision (skip it, or pick one of its foods at one level), since a plan uses at
+    most one food per group. A required food must be in the plan; a group with a required
+    food must be represented by one of its required foods. At every node all options of
+    the next decision are scored at once with NumPy: an option is pruned when the
+    remaining decisions can no longer bring a nutrient into range, or when the cheapest
+    possible completion can't beat the k-th best plan found so far. That bound is the
+    larger of the remaining decisions' minimum cost and, for each nutrient still short
+    of its minimum, the shortfall times the cheapest cost per unit of that nutrient left.
+    """
+
+    def __init__(self, foods, targets=DEFAULT_TARGETS):
+        """
+        :param foods: Dict of food name -> foods.json entry.
+        :param targets: Nutrient ranges (see parse_targets).
+        """
+        self.lo, self.hi = parse_targets(targets)
+        self.units = []  # (options matrix [cost, *NUTRIENTS], labels: (food, servings) or None)
+        grouped = {}
+        for name, food in foods.items():
+            if not food.get('enabled', True):
+                continue
+            if food.get('group'):
+                grouped.setdefault(food['group'], []).append(name)
+            else:
+                self._add_unit(foods, [name], required=food.get('required', False))
+        for group, names in grouped.items():
+            required = [name for name in names if foods[name].get('required')]
+            self._add_unit(foods, required or names, required=bool(required))
+        # Decisions that move the totals most go first, so bounds tighten early
+        self.units.sort(key=lambda unit: -np.ptp(unit[0][:, 1]))
+        self._prepare()
+        self.nodes = 0
+
+    def _add_unit(self, foods, names, required):
+        rows, labels = [], []
+        if not required:
+            rows.append(np.zeros(len(NUTRIENTS) + 1))
+            labels.append(None)
+        for name in names:
+            food = foods[name]
+            per_serving = np.array([food.get('cost', 0)] + [food.get(n, 0) for n in NUTRIENTS], dtype=float)
+            for level in serving_levels(food):
+                rows.append(per_serving * level)
+                labels.append((name, level))
+        if rows:
+            self.units.append((np.array(rows), labels))
+
+    def _prepare(self):
+        count = len(self.units)
+        width = len(NUTRIENTS)
+        # Suffix sums over decisions d.. of each decision's smallest/largest contribution
+        self.suffix_min = np.zeros((count + 1, width))
+        self.suffix_max = np.zeros((count + 1, width))
+        self.suffix_min_cost = np.zeros(count + 1)
+        self.suffix_ratio = np.full((count + 1, width), _NO_SUPPLY)
+        for d in range(count - 1, -1, -1):
+            options = self.units[d][0]
+            self.suffix_min[d] = self.suffix_min[d + 1] + options[:, 1:].min(axis=0)
+            self.suffix_max[d] = self.suffix_max[d + 1] + options[:, 1:].max(axis=0)
+            self.suffix_min_cost[d] = self.suffix_min_cost[d + 1] + options[:, 0].min()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(options[:, 1:] > 0, options[:, :1] / options[:, 1:], _NO_SUPPLY).min(axis=0)
+            self.suffix_ratio[d] = np.minimum(self.suffix_ratio[d + 1], ratio)
+        self.lo_bounded = np.where(np.isfinite(self.lo), self.lo, -_NO_SUPPLY)
+
+    def solve(self, top_k=1):
+        """
+        :param top_k: Number of plans to return.
+        :return: Up to top_k plans, cheapest first; each a dict of cost, foods ({name: servings})
+                 and totals ({nutrient: amount}). Empty if the targets can't be met.
+        """
+        self.nodes = 0
+        self._best = []  # Heap of (-cost, sequence, choices, totals)
+        self._sequence = itertools.count()
+        self._top_k = top_k
+        if self.units:
+            self._search(0, np.zeros(len(NUTRIENTS) + 1), [])
+        elif np.all(self.lo <= _EPS) and np.all(self.hi >= -_EPS):
+            self._best.append((0.0, 0, [], np.zeros(len(NUTRIENTS) + 1)))
+        return [self._plan(totals, choices) for _, _, choices, totals in sorted(self._best, key=lambda e: (-e[0], e[1]))]
+
+    def _bound(self):
+        return -self._best[0][0] if len(self._best) >= self._top_k else np.inf
+
+    def _search(self, d, sums, choices):
+        self.nodes += 1
+        options, labels = self.units[d]
+        totals = sums + options
+        nutrients = totals[:, 1:]
+        feasible = (np.all(nutrients + self.suffix_min[d + 1] <= self.hi + _EPS, axis=1)
+                    & np.all(nutrients + self.suffix_max[d + 1] >= self.lo - _EPS, axis=1))
+        shortfall = np.maximum(self.lo_bounded - nutrients, 0)
+        rest = np.maximum(self.suffix_min_cost[d + 1], (shortfall * self.suffix_ratio[d + 1]).max(axis=1))
+        lower = totals[:, 0] + rest
+        candidates = np.flatnonzero(feasible & (lower < self._bound() - _EPS))
+        last = d + 1 == len(self.units)
+        for i in candidates[np.argsort(lower[candidates], kind="stable")]:
+            if lower[i] >= self._bound() - _EPS:
+                break  # Sorted by bound, so nothing after this can win either
+            chosen = choices + [labels[i]] if labels[i] is not None else choices
+            if last:
+                entry = (-totals[i, 0], next(self._sequence), chosen, totals[i])
+                if len(self._best) < self._top_k:
+                    heapq.heappush(self._best, entry)
+                else:
+                    heapq.heapreplace(self._best, entry)
+            else:
+                self._search(d + 1, totals[i], chosen)
+
+    @staticmethod
+    def _plan(totals, choices):
+        return {'cost': round(float(totals[0]), 2), 'foods': dict(choices),
+                'totals': {n: round(float(amount), 1) for n, amount in zip(NUTRIENTS, totals[1:])}}
+
+
+def exhaustive(solver, top_k=1):
+    """
+    Every combination of the solver's decisions, checked at the leaves; for verifying
+    solve() and timing it against, on small inputs only.
+    """
+    plans = []
+    for picks in itertools.product(*(range(len(options)) for options, _ in solver.units)):
+        totals = sum(solver.units[d][0][i] for d, i in enumerate(picks))
+        if np.all(totals[1:] >= solver.lo - _EPS) and np.all(totals[1:] <= solver.hi + _EPS):
+            choices = [solver.units[d][1][i] for d, i in enumerate(picks) if solver.units[d][1][i] is not None]
+            plans.append((totals, choices))
+    plans.sort(key=lambda plan: plan[0][0])
+    return [MealPlanSolver._plan(totals, choices) for totals, choices in plans[:top_k]]
+
+
+def synthetic_foods(count, seed=0):
+    """
+    Random foods in the foods.json format, with targets met by a random plan of them.
+    :return: (foods, targets)
+    """
+    rng = np.random.default_rng(seed)
+    foods = {}
+    for i in range(count):
+        protein, carbs, fat = rng.uniform(0, 40), rng.uniform(0, 60), rng.uniform(0, 20)
+        step = float(rng.choice([0.5, 1.0]))
+        low = step * int(rng.integers(1, 3))
+        foods[f"Food {i}"] = {
+            'cost': round(float(rng.uniform(0.2, 3.0)), 2),
+            'calories': round(4 * protein + 4 * carbs + 9 * fat),
+            'carbs': round(carbs, 1), 'fat': round(fat, 1), 'protein': round(protein, 1),
+            'min_serving': low, 'max_serving': low + step * int(rng.integers(0, 4)), 'serving_step': step,
+            'group': f"group{i // 3}" if i % 10 < 3 else "",
+            'required': bool(rng.random() < 0.05 and i % 10 >= 3),
+            'enabled': True,
+        }
+    return foods, plan_targets(foods, seed)
+
+
+def plan_targets(foods, seed=0, optional=6, spread=0.1):
+    """
+    Targets that a random valid plan of the foods meets, so the solver has something to
+    find: every required food (or group) plus up to `optional` other foods or groups,
+    each at a random serving level, with ranges of +-spread around the plan's totals.
+    :return: {nutrient: (min, max)}
+    """
+    rng = np.random.default_rng(seed)
+    units = MealPlanSolver(foods, {}).units
+    skippable = [d for d, (_, labels) in enumerate(units) if labels[0] is None]
+    picked = set(rng.permutation(skippable)[:optional].tolist())
+    totals = np.zeros(len(NUTRIENTS) + 1)
+    for d, (options, labels) in enumerate(units):
+        if labels[0] is not None or d in picked:
+            first = 1 if labels[0] is None else 0  # Option 0 of a skippable decision is "skip"
+            totals += options[rng.integers(first, len(options))]
+    return {n: (math.floor(total * (1 - spread)), math.ceil(total * (1 + spread)))
+            for n, total in zip(NUTRIENTS, totals[1:])}
+
+
+def _benchmark(sizes, top_k, exhaustive_limit):
+    # Synthetic food lists, then foods.json, each with targets a plan of its foods meets
+    cases = [(str(count), *synthetic_foods(count)) for count in sizes]
+    foods = load_foods()
+    cases.append(("foods.json", foods, plan_targets(foods)))
+    print(f"{'foods':>10} {'plans':>6} {'cost':>8} {'nodes':>9} {'B&B s':>8} {'exhaustive s':>13}")
+    for label, foods, targets in cases:
+        solver = MealPlanSolver(foods, targets)
+        start = time.perf_counter()
+        plans = solver.solve(top_k)
+        seconds = time.perf_counter() - start
+        combinations = np.prod([float(len(options)) for options, _ in solver.units])
+        check = ""
+        if combinations <= exhaustive_limit:
+            start = time.perf_counter()
+            expected = exhaustive(solver, top_k)
+            check = f"{time.perf_counter() - start:13.3f}"
+            assert [p['cost'] for p in expected] == [p['cost'] for p in plans], (expected, plans)
+        else:
+            check = f"{'(' + format(combinations, '.0e') + ' combos)':>13}"
+        cost = f"{plans[0]['cost']:8.2f}" if plans else f"{'-':>8}"
+        print(f"{label:>10} {len(plans):>6} {cost} {solver.nodes:>9} {seconds:8.3f} {check}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the cheapest meal plans meeting calorie and macro targets.")
+    parser.add_argument("--foods", default=DEFAULT_FOODS, help="foods.json to plan from.")
+    parser.add_argument("--targets", help="JSON file of ranges, as stored by the meal plan generator page.")
+    parser.add_argument("--top", type=int, default=1, help="Number of plans to return.")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="FOODS",
+                        help="Time the solver on synthetic food lists of these sizes.")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        _benchmark(args.benchmark or [10, 20, 40, 80], args.top, exhaustive_limit=2e5)
+        raise SystemExit
+    foods = load_foods(args.foods)
+    targets = DEFAULT_TARGETS
+    if args.targets:
+        with open(args.targets) as file:
+            targets = json.load(file)
+    solver = MealPlanSolver(foods, targets)
+    start = time.perf_counter()
+    plans = solver.solve(args.top)
+    seconds = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(plans, indent=2))
+    elif not plans:
+        print(f"No plan meets the targets ({solver.nodes} nodes, {seconds:.3f}s)")
+    else:
+        for rank, plan in enumerate(plans, 1):
+            totals = ", ".join(f"{n} {amount:g}" for n, amount in plan['totals'].items())
+            print(f"#{rank}  ${plan['cost']:.2f}  ({totals})")
+            for name, servings in plan['foods'].items():
+                print(f"      {servings:g} x {name}")
+        print(f"{solver.nodes} nodes, {seconds:.3f}s")
@@ -1,5 +1,14 @@
-import os
+import argparse
+import contextlib
+import hashlib
+import io
 import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 def validate_json(json_data):
     try:
@@ -14,30 +23,279 @@ def validate_json(json_data):
     except json.JSONDecodeError as e:
         print(f"JSON is invalid: {e}")
 
+class FileEntryParser:
+    """
+    Incremental parser for a streamed JSON array of {"file_name", "content"} objects.
+    feed() returns each entry as soon as its closing brace arrives, and only the entry
+    still being generated is kept in memory. Text before the opening '[' (prose, a
+    ```json fence) is ignored.
+    """
+
+    _OUTSIDE = re.compile(r'[\[\]{}"]')
+    _INSIDE = re.compile(r'["\\]')
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0  # Scan position in buffer
+        self.started = False  # Inside the array
+        self.found = False  # Seen an opening '[' at all
+        self.depth = 0  # Nesting inside the array
+        self.in_string = False
+        self.entry_start = None
+
+    def feed(self, text):
+        """
+        :param text: Next piece of the response.
+        :return: List of the entries (dicts) completed by this piece.
+        """
+        self.buffer += text
+        entries = []
+        while True:
+            if self.in_string:
+                match = self._INSIDE.search(self.buffer, self.pos)
+                if match is None:
+                    self.pos = len(self.buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() == len(self.buffer):
+                        self.pos = match.start()  # Escape split across pieces; wait for the rest
+                        break
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                continue
+
+            match = self._OUTSIDE.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                break
+            self.pos = match.end()
+            char = match.group()
+            if not self.started:
+                if char == "[":
+                    self.started = self.found = True
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                if self.depth == 0 and char == "{":
+                    self.entry_start = match.start()
+                self.depth += 1
+            elif self.depth == 0:  # The array's closing ']'
+                self.started = False
+            else:
+                self.depth -= 1
+                if self.depth == 0 and self.entry_start is not None:
+                    entries.append(json.loads(self.buffer[self.entry_start:self.pos]))
+                    self.entry_start = None
+
+        # Drop what has been fully consumed
+        keep = self.entry_start if self.entry_start is not None else self.pos
+        self.buffer = self.buffer[keep:]
+        self.pos -= keep
+        if self.entry_start is not None:
+            self.entry_start = 0
+        return entries
+
+
+class FileWriter:
+    """
+    Writes files under parent_directory on a thread pool. Each write goes to a temporary
+    file that is then renamed over the target, so a file is never seen half written.
+    Files whose content is unchanged are left alone, directories already created are
+    remembered, and names that resolve outside parent_directory are rejected.
+    """
+
+    def __init__(self, parent_directory, workers=4):
+        self.root = os.path.realpath(parent_directory)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-writer")
+        self.futures = []
+        self.created_directories = set()
+        self.lock = threading.Lock()
+        self.stats = {'written': 0, 'unchanged': 0, 'rejected': 0, 'failed': 0}
+
+    def resolve(self, file_name):
+        """
+        :return: Absolute path for file_name inside the parent directory.
+        :raises ValueError: If the name is absolute or escapes the parent directory.
+        """
+        if not file_name or os.path.isabs(file_name) or os.path.splitdrive(file_name)[0] or file_name.endswith(("/", "\\")):
+            raise ValueError(f"'{file_name}' is not a relative file path")
+        path = os.path.realpath(os.path.join(self.root, file_name))
+        if os.path.commonpath([self.root, path]) != self.root or path == self.root:
+            raise ValueError(f"'{file_name}' is outside {self.root}")
+        return path
+
+    def submit(self, file_name, content):
+        self.futures.append(self.pool.submit(self._write, file_name, content))
+
+    def _count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def _write(self, file_name, content):
+        try:
+            path = self.resolve(file_name)
+        except ValueError as e:
+            print(f"Skipping file: {e}")
+            self._count('rejected')
+            return
+        data = content.encode("utf-8")
+        try:
+            if os.path.getsize(path) == len(data):
+                with open(path, "rb") as f:
+                    unchanged = hashlib.blake2b(f.read()).digest() == hashlib.blake2b(data).digest()
+                if unchanged:
+                    self._count('unchanged')
+                    return
+        except OSError:
+            pass  # Doesn't exist yet
+
+        directory = os.path.dirname(path)
+        try:
+            if directory not in self.created_directories:
+                os.makedirs(directory, exist_ok=True)
+                with self.lock:
+                    self.created_directories.add(directory)
+            temporary = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Failed to write '{file_name}': {e}")
+            self._count('failed')
+            return
+        print(f"File '{path}' created.")
+        self._count('written')
+
+    def close(self):
+        """
+        Waits for every pending write.
+        :return: Counts of written, unchanged, rejected and failed files.
+        """
+        for future in self.futures:
+            future.result()
+        self.pool.shutdown()
+        return dict(self.stats)
+
+
+def materialize(chunks, parent_directory, workers=4):
+    """
+    Writes the files of a streamed response as each entry completes, while the rest is
+    still being generated.
+    :param chunks: Iterable of response text pieces (e.g. ollama_chunks()).
+    :param parent_directory: Directory the files are written under.
+    :param workers: Writer threads.
+    :return: Counts of written, unchanged, rejected and failed files.
+    """
+    parser = FileEntryParser()
+    writer = FileWriter(parent_directory, workers)
+    try:
+        for chunk in chunks:
+            for entry in parser.feed(chunk):
+                if isinstance(entry, dict) and entry.get("file_name"):
+                    writer.submit(entry["file_name"], entry.get("content", ""))
+    finally:
+        stats = writer.close()
+    if not parser.found:
+        print("Invalid response format. Please provide valid JSON.")
+        return stats
+    if parser.in_string or parser.depth:
+        print("Response ended in the middle of an entry; the last file was not written.")
+    print(f"{stats['written']} written, {stats['unchanged']} unchanged, "
+          f"{stats['rejected']} rejected, {stats['failed']} failed.")
+    return stats
+
+
+def ollama_chunks(prompt, model="deepseek-coder-v2:16b", api_url="http://localhost:11434/api/generate"):
+    """
+    Yields the response text of a streamed Ollama completion piece by piece.
+    """
+    import requests
+
+    with requests.post(api_url, json={"model": model, "prompt": prompt, "stream": True}, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                data = json.loads(line)
+                yield data.get("response", "")
+                if data.get("done"):
+                    break
+
+
 def create_files_from_response(response, parent_directory):
-    # Assuming response is in JSON format
+    """
+    Writes the files described by a complete JSON response (see materialize).
+    """
     try:
-        file_data_list = json.loads(response)
-        
-        for file_data in file_data_list:
-            file_name = parent_directory + file_data.get("file_name")
-            content = file_data.get("content", "")
-            
-            # Ensure the directory exists (if file_name includes directories)
-            directory = os.path.dirname(file_name)
-            if directory and not os.path.exists(directory):
-                os.makedirs(directory)
-            
-            # Create the file and write content
-            with open(file_name, "w") as f:
-                f.write(content)
-            print(f"File '{file_name}' created.")
-            
+        return materialize([response], parent_directory)
     except json.JSONDecodeError:
         print("Invalid response format. Please provide valid JSON.")
 
-# Example usage:
-response = '''
+
+def _wait_for(path):
+    thread = threading.current_thread()
+    while not os.path.exists(path):
+        time.sleep(0.001)
+    thread.seen = time.perf_counter()
+
+
+def _benchmark(files, file_kb, chunk_chars, chunk_delay):
+    # A multi-file response arriving in pieces: the old parse-then-write path against streaming
+    import shutil
+    import tempfile
+
+    entries = [{"file_name": f"src/module_{i // 10}/file_{i}.js",
+                "content": "".join(f"console.log('line {j} of file {i}');\n" for j in range(file_kb * 1024 // 32))}
+               for i in range(files)]
+    response = json.dumps(entries, indent=2)
+
+    def stream():
+        for start in range(0, len(response), chunk_chars):
+            time.sleep(chunk_delay)
+            yield response[start:start + chunk_chars]
+
+    def old_path(directory):
+        received = "".join(stream())
+        for file_data in json.loads(received):
+            file_name = os.path.join(directory, file_data["file_name"])
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+            with open(file_name, "w") as f:
+                f.write(file_data["content"])
+
+    first = os.path.join("src", "module_0", "file_0.js")
+    directory = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        watcher = threading.Thread(target=_wait_for, args=(os.path.join(directory, "old", first),))
+        watcher.start()
+        old_path(os.path.join(directory, "old"))
+        old_total = time.perf_counter() - start
+        watcher.join()
+        old_first = watcher.seen - start
+
+        start = time.perf_counter()
+        watcher = threading.Thread(target=_wait_for, args=(os.path.join(directory, "new", first),))
+        watcher.start()
+        stats = materialize(stream(), os.path.join(directory, "new"))
+        new_total = time.perf_counter() - start
+        watcher.join()
+        new_first = watcher.seen - start
+
+        start = time.perf_counter()
+        again = materialize(stream(), os.path.join(directory, "new"))
+        again_total = time.perf_counter() - start
+    shutil.rmtree(directory)
+
+    print(f"{files} files of {file_kb} KB, {len(response) / 1e6:.1f} MB streamed in {chunk_chars}-char pieces")
+    print(f"parse then write: first file at {old_first:.2f}s, done at {old_total:.2f}s")
+    print(f"streaming:        first file at {new_first:.2f}s, done at {new_total:.2f}s  {stats}")
+    print(f"same response again: {again_total:.2f}s  {again}")
+
+
+# Example response
+EXAMPLE_RESPONSE = '''
 [
   {
     "file_name": "index.html",
@@ -54,4 +312,18 @@ response = '''
 ]
 '''
 
-create_files_from_response(response, "prototype-file-setup/test/")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the files of an LLM prototype response as they are generated.")
+    parser.add_argument("--prompt", help="Ask Ollama for the files (default: write the example response).")
+    parser.add_argument("--model", default="deepseek-coder-v2:16b")
+    parser.add_argument("--out", default="prototype-file-setup/test/", help="Directory the files are written under.")
+    parser.add_argument("--benchmark", type=int, metavar="FILES",
+                        help="Time streaming against parse-then-write on a simulated response.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _benchmark(args.benchmark, file_kb=20, chunk_chars=64, chunk_delay=0.0002)
+    elif args.prompt:
+        materialize(ollama_chunks(args.prompt, args.model), args.out)
+    else:
+        create_files_from_response(EXAMPLE_RESPONSE, args.out)
@@ -0,0 +1,264 @@
+import argparse
+import random
+import re
+import time
+
+MATCH, SUBSTITUTION, DELETION, INSERTION = 0, 1, 2, 3
+
+
+def tokenize(text):
+    """
+    Lowercases and splits text into words, dropping punctuation but keeping word
+    boundaries (and in-word apostrophes, e.g. "don't").
+    :return: List of words.
+    """
+    return re.findall(r"[\w']+", text.lower())
+
+
+def encode(reference, hypothesis):
+    """
+    Maps tokens to small integers shared by both sequences.
+    :return: Tuple of (reference ids, hypothesis ids, vocabulary size).
+    """
+    vocabulary = {}
+    reference_ids = [vocabulary.setdefault(t, len(vocabulary)) for t in reference]
+    hypothesis_ids = [vocabulary.setdefault(t, len(vocabulary)) for t in hypothesis]
+    return reference_ids, hypothesis_ids, len(vocabulary)
+
+
+def _peq(reference_ids, vocabulary_size):
+    # Bitmask of reference positions for every token id
+    peq = [0] * vocabulary_size
+    for i, token in enumerate(reference_ids):
+        peq[token] |= 1 << i
+    return peq
+
+
+def _columns(reference_ids, hypothesis_ids, vocabulary_size, keep_columns=False):
+    # Bit-parallel Levenshtein (Myers 1999, Hyyrö 2001): each DP column is held as two
+    # integers whose bits mark where the value rises (pv) or falls (mv) going down a row,
+    # so one column costs a handful of big-integer operations instead of len(reference) cells.
+    m = len(reference_ids)
+    peq = _peq(reference_ids, vocabulary_size)
+    full = (1 << m) - 1
+    top = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    columns = [(pv, mv)] if keep_columns else None
+    for token in hypothesis_ids:
+        eq = peq[token]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & top:
+            score += 1
+        elif mh & top:
+            score -= 1
+        # Shifting in a 1 charges each leading hypothesis token as an insertion (global distance)
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+        if keep_columns:
+            columns.append((pv, mv))
+    return score, columns
+
+
+def edit_distance(reference, hypothesis):
+    """
+    Levenshtein distance over integer-encoded tokens using the bit-parallel algorithm,
+    O(len(hypothesis) * len(reference) / 64) machine-word operations.
+    :param reference: Sequence of hashable tokens.
+    :param hypothesis: Sequence of hashable tokens.
+    :return: Minimum number of substitutions, insertions and deletions.
+    """
+    if len(reference) == 0:
+        return len(hypothesis)
+    reference_ids, hypothesis_ids, size = encode(reference, hypothesis)
+    return _columns(reference_ids, hypothesis_ids, size)[0]
+
+
+class Alignment:
+    """
+    Result of aligning a hypothesis against a reference.
+    ops is a list of (op, reference token or None, hypothesis token or None).
+    """
+
+    def __init__(self, ops, reference_length, hypothesis_length):
+        self.ops = ops
+        self.reference_length = reference_length
+        self.hypothesis_length = hypothesis_length
+        self.substitutions = sum(1 for op in ops if op[0] == SUBSTITUTION)
+        self.deletions = sum(1 for op in ops if op[0] == DELETION)
+        self.insertions = sum(1 for op in ops if op[0] == INSERTION)
+        self.matches = len(ops) - self.substitutions - self.deletions - self.insertions
+
+    @property
+    def distance(self):
+        return self.substitutions + self.deletions + self.insertions
+
+    @property
+    def error_rate(self):
+        """
+        (S + D + I) / N over reference tokens, i.e. WER for words and CER for characters.
+        """
+        if self.reference_length == 0:
+            return 0.0 if self.hypothesis_length == 0 else 1.0
+        return self.distance / self.reference_length
+
+    def as_dict(self):
+        return {
+            'error_rate': round(self.error_rate, 4),
+            'substitutions': self.substitutions,
+            'deletions': self.deletions,
+            'insertions': self.insertions,
+            'matches': self.matches,
+            'reference_length': self.reference_length,
+            'hypothesis_length': self.hypothesis_length,
+        }
+
+
+def align(reference, hypothesis):
+    """
+    Exact alignment with substitution/insertion/deletion counts.
+
+    Runs the bit-parallel DP keeping each column's two bit vectors, then walks back from
+    the bottom-right cell. A cell's value is recovered from its column with two popcounts,
+    so the traceback never materializes the full len(reference) x len(hypothesis) matrix.
+    :param reference: Sequence of tokens (e.g. tokenize(script) or list(text) for characters).
+    :param hypothesis: Sequence of tokens.
+    :return: Alignment.
+    """
+    m, n = len(reference), len(hypothesis)
+    if m == 0 or n == 0:
+        ops = [(DELETION, t, None) for t in reference] + [(INSERTION, None, t) for t in hypothesis]
+        return Alignment(ops, m, n)
+
+    reference_ids, hypothesis_ids, size = encode(reference, hypothesis)
+    score, columns = _columns(reference_ids, hypothesis_ids, size, keep_columns=True)
+
+    def vertical_delta(j, i):
+        # D[i][j] - D[i-1][j]
+        pv, mv = columns[j]
+        bit = 1 << (i - 1)
+        return 1 if pv & bit else (-1 if mv & bit else 0)
+
+    def cell(j, i):
+        pv, mv = columns[j]
+        mask = (1 << i) - 1
+        return j + (pv & mask).bit_count() - (mv & mask).bit_count()
+
+    ops = []
+    i, j, d = m, n, score
+    while i > 0 and j > 0:
+        left = cell(j - 1, i)
+        diagonal = left - vertical_delta(j - 1, i)
+        same = reference_ids[i - 1] == hypothesis_ids[j - 1]
+        # Matches first; on ties prefer deletions/insertions over substitutions so a
+        # dropped word shows up as [-word] next to its neighbour rather than shifting subs
+        if same and diagonal == d:
+            ops.append((MATCH, reference[i - 1], hypothesis[j - 1]))
+            i, j, d = i - 1, j - 1, diagonal
+        elif vertical_delta(j, i) == 1:
+            ops.append((DELETION, reference[i - 1], None))
+            i, d = i - 1, d - 1
+        elif left + 1 == d:
+            ops.append((INSERTION, None, hypothesis[j - 1]))
+            j, d = j - 1, left
+        else:
+            ops.append((SUBSTITUTION, reference[i - 1], hypothesis[j - 1]))
+            i, j, d = i - 1, j - 1, diagonal
+    ops.extend((DELETION, reference[k], None) for k in range(i - 1, -1, -1))
+    ops.extend((INSERTION, None, hypothesis[k]) for k in range(j - 1, -1, -1))
+    ops.reverse()
+    return Alignment(ops, m, n)
+
+
+def word_alignment(reference_text, hypothesis_text):
+    return align(tokenize(reference_text), tokenize(hypothesis_text))
+
+
+def character_alignment(reference_text, hypothesis_text):
+    # Characters of the normalized words, with single spaces kept as boundaries
+    return align(list(" ".join(tokenize(reference_text))), list(" ".join(tokenize(hypothesis_text))))
+
+
+def format_alignment(alignment, context=3):
+    """
+    Compact one-line rendering of an alignment, showing only the edits with a little
+    context. Matching runs longer than 2 * context tokens are collapsed to "...".
+      [old -> new]  substitution
+      [-old]        deletion (in the reference, not said)
+      [+new]        insertion (said, not in the reference)
+    :return: String.
+    """
+    if alignment.distance == 0:
+        return "(no differences)"
+    pieces = []
+    matches = []
+
+    def flush_matches(is_end=False):
+        if len(matches) > 2 * context:
+            head = matches[:context] if pieces else []
+            tail = matches[-context:] if not is_end else []
+            pieces.extend(head + ["..."] + tail)
+        else:
+            pieces.extend(matches)
+        matches.clear()
+
+    for op, ref_token, hyp_token in alignment.ops:
+        if op == MATCH:
+            matches.append(ref_token)
+            continue
+        flush_matches()
+        if op == SUBSTITUTION:
+            pieces.append(f"[{ref_token} -> {hyp_token}]")
+        elif op == DELETION:
+            pieces.append(f"[-{ref_token}]")
+        else:
+            pieces.append(f"[+{hyp_token}]")
+    flush_matches(is_end=True)
+    return " ".join(pieces)
+
+
+def _benchmark(words, error_rate, seed=0):
+    import difflib
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    reference = [rng.choice(vocabulary) for _ in range(words)]
+    hypothesis = []
+    for token in reference:
+        r = rng.random()
+        if r < error_rate / 3:
+            continue
+        if r < 2 * error_rate / 3:
+            hypothesis.append(rng.choice(vocabulary))
+        elif r < error_rate:
+            hypothesis.extend([token, rng.choice(vocabulary)])
+        else:
+            hypothesis.append(token)
+
+    print(f"{words} reference words, {len(hypothesis)} hypothesis words, ~{error_rate:.0%} errors")
+    start = time.perf_counter()
+    ratio = difflib.SequenceMatcher(None, reference, hypothesis).ratio()
+    diff = "\n".join(difflib.ndiff(reference, hypothesis))
+    print(f"  difflib ratio + ndiff: {time.perf_counter() - start:8.3f}s  (ratio {ratio:.4f}, {len(diff)} chars of diff)")
+
+    start = time.perf_counter()
+    distance = edit_distance(reference, hypothesis)
+    print(f"  bit-parallel distance: {time.perf_counter() - start:8.3f}s  (WER {distance / words:.4f})")
+
+    start = time.perf_counter()
+    result = align(reference, hypothesis)
+    compact = format_alignment(result)
+    print(f"  bit-parallel align:    {time.perf_counter() - start:8.3f}s  (WER {result.error_rate:.4f}, "
+          f"S={result.substitutions} D={result.deletions} I={result.insertions}, {len(compact)} chars of diff)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the alignment engine against difflib.")
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 20000])
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    for words in args.words:
+        _benchmark(words, args.error_rate)
@@ -1,18 +1,28 @@
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 import sounddevice as sd
-import numpy as np
-import whisper
 import threading
-import time
+import os
+import sys
+
+# Shared voice helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_capture import AudioCapture
+from transcription_worker import TranscriptionWorker
 
 class AudioRecorderApp(App):
     def build(self):
-        self.audio_data = []
+        # The worker loads the model in the background and runs all transcription off the UI thread
+        self.worker = TranscriptionWorker("base", on_status=self.show_status).start()
+        self.capture = None
+        self.stop_event = None
+        self.keep_recording = None
         self.is_recording = False
+        self.transcripts = {}  # job id -> text, shown in submission order
         layout = BoxLayout(orientation='vertical')
 
         self.label = Label(text='Press "Start Recording" to begin.')
@@ -26,38 +36,94 @@ class AudioRecorderApp(App):
         stop_button.bind(on_press=self.stop_recording)
         layout.add_widget(stop_button)
 
+        cancel_button = Button(text='Cancel')
+        cancel_button.bind(on_press=self.cancel)
+        layout.add_widget(cancel_button)
+
         self.transcript_input = TextInput(hint_text='Transcript will appear here...', multiline=True)
         layout.add_widget(self.transcript_input)
 
         return layout
 
+    def on_stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        self.worker.shutdown()
+
+    def show_status(self, message):
+        if not self.is_recording:
+            self.label.text = message
+
     def start_recording(self, instance):
-        self.audio_data = []
+        if self.is_recording:
+            return
+        # Earlier recordings keep transcribing in the background while this one records
+        self.capture = AudioCapture(samplerate=16000)
+        self.stop_event = threading.Event()
+        self.keep_recording = threading.Event()
         self.is_recording = True
         self.label.text = 'Recording...'
-        threading.Thread(target=self.record_audio).start()
+        threading.Thread(target=self.record_audio, args=(self.capture, self.stop_event, self.keep_recording),
+                         daemon=True).start()
 
     def stop_recording(self, instance):
+        if not self.is_recording:
+            return
         self.is_recording = False
-        self.label.text = 'Processing...'
-        self.process_audio()
+        # record_audio submits the audio once the stream has closed and the last block is in
+        self.keep_recording.set()
+        self.stop_event.set()
+        self.label.text = 'Processing...' if self.worker.model_ready.is_set() else 'Processing (waiting for the model)...'
+
+    def submit_recording(self, capture):
+        job = self.worker.submit(capture.audio(), on_partial=self.show_transcript,
+                                 on_done=self.finish_transcript, on_error=self.transcription_failed)
+        self.transcripts[job.id] = ''
+
+    def cancel(self, instance):
+        if self.is_recording:
+            # Throw the current recording away
+            self.is_recording = False
+            self.stop_event.set()
+            self.label.text = 'Recording discarded.'
+            return
+        cancelled = self.worker.cancel_all()
+        for job_id, text in list(self.transcripts.items()):
+            if not text:
+                del self.transcripts[job_id]
+        self.update_transcript()
+        self.label.text = f'Cancelled {cancelled} transcription(s).' if cancelled else 'Nothing to cancel.'
 
-    def record_audio(self):
-        samplerate = 16000
+    def record_audio(self, capture, stop_event, keep):
+        # Each recording has its own capture and events, so a quick stop/start can't revive an old stream
         def callback(indata, frames, time, status):
-            if self.is_recording:
-                self.audio_data.append(indata.copy())
-
-        with sd.InputStream(samplerate=samplerate, channels=1, callback=callback):
-            while self.is_recording:
-                time.sleep(0.1)
-
-    def process_audio(self):
-        audio = np.concatenate(self.audio_data).flatten()
-        model = whisper.load_model("base")
-        result = model.transcribe(audio, fp16=False)
-        transcript = result['text'].strip()
-        self.transcript_input.text = transcript
+            if not stop_event.is_set():
+                capture.write(indata)
+
+        with sd.InputStream(samplerate=capture.samplerate, channels=1, blocksize=capture.blocksize, callback=callback):
+            while not stop_event.wait(0.1):
+                pass
+        # Closing the stream waits for a callback in progress, so no write can still touch the buffer
+        if keep.is_set():
+            Clock.schedule_once(lambda dt: self.submit_recording(capture))
+
+    def update_transcript(self):
+        self.transcript_input.text = "\n\n".join(text for text in self.transcripts.values() if text)
+
+    def show_transcript(self, job, text):
+        if job.id in self.transcripts:
+            self.transcripts[job.id] = text
+            self.update_transcript()
+
+    def finish_transcript(self, job, transcript):
+        self.show_transcript(job, transcript)
+        if not self.is_recording:
+            self.label.text = 'Processing...' if self.worker.busy() else 'Done.'
+
+    def transcription_failed(self, job, error):
+        self.transcripts.pop(job.id, None)
+        if not self.is_recording:
+            self.label.text = f'Transcription failed: {error}'
 
 if __name__ == '__main__':
     AudioRecorderApp().run()
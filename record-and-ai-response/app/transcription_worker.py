@@ -0,0 +1,155 @@
+import itertools
+import queue
+import threading
+
+from kivy.clock import Clock
+
+import whisper_models
+import long_form
+import transcription_cache
+
+
+class Job:
+    """
+    One recording waiting for or going through transcription.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, audio, on_partial=None, on_done=None, on_error=None):
+        self.id = next(Job._ids)
+        self.audio = audio
+        self.on_partial = on_partial
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        # Takes effect before the job starts or between two chunks; a chunk already in Whisper finishes first
+        self.cancelled.set()
+
+
+class TranscriptionWorker:
+    """
+    Background thread that owns the Whisper model for the app. The model is loaded as
+    soon as the worker starts, recordings are transcribed one at a time from a queue,
+    and every callback is posted to the Kivy event loop with Clock.schedule_once, so
+    the UI thread never waits on the model.
+
+    Long recordings are cut at pauses (long_form.find_cuts) and transcribed chunk by
+    chunk; on_partial receives the text so far after each chunk.
+    """
+
+    def __init__(self, model_name="base", chunk_seconds=20.0, on_status=None):
+        """
+        :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large').
+        :param chunk_seconds: Target chunk length for partial results.
+        :param on_status: Optional callback receiving status messages (model loading, ready, failed).
+        """
+        self.model_name = model_name
+        self.chunk_seconds = chunk_seconds
+        self.on_status = on_status
+        self.model_ready = threading.Event()
+        self._jobs = queue.Queue()
+        self._current = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _post(self, callback, *args):
+        if callback is not None:
+            Clock.schedule_once(lambda dt: callback(*args))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="transcription-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, audio, on_partial=None, on_done=None, on_error=None):
+        """
+        Queues a recording.
+        :param audio: 16 kHz float32 numpy array.
+        :param on_partial: Callback(job, text so far).
+        :param on_done: Callback(job, transcript).
+        :param on_error: Callback(job, exception).
+        :return: The Job (keep it to cancel).
+        """
+        job = Job(audio, on_partial, on_done, on_error)
+        self._jobs.put(job)
+        return job
+
+    def busy(self):
+        with self._lock:
+            return self._current is not None or not self._jobs.empty()
+
+    def cancel_all(self):
+        """
+        Cancels the running job and everything queued behind it.
+        :return: Number of jobs cancelled.
+        """
+        cancelled = 0
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.cancel()
+                cancelled += 1
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+                cancelled += 1
+        return cancelled
+
+    def shutdown(self):
+        self.cancel_all()
+        self._jobs.put(None)
+
+    def _run(self):
+        self._post(self.on_status, f"Loading Whisper model '{self.model_name}'...")
+        try:
+            whisper_models.get_model(self.model_name)
+        except Exception as e:
+            self._post(self.on_status, f"Could not load the model: {e}")
+        else:
+            self.model_ready.set()
+            self._post(self.on_status, "Model ready.")
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job.cancelled.is_set():
+                continue
+            with self._lock:
+                self._current = job
+            try:
+                self._transcribe(job)
+            except Exception as e:
+                self._post(job.on_error, job, e)
+            finally:
+                with self._lock:
+                    self._current = None
+
+    def _transcribe(self, job):
+        audio = job.audio
+        if long_form.should_split(audio, long_form.DEFAULT_WORKERS):
+            # The process pool is faster overall but only reports once everything is done
+            text = transcription_cache.transcribe(audio, model_name=self.model_name,
+                                                  workers=long_form.DEFAULT_WORKERS)['text']
+            if not job.cancelled.is_set():
+                self._post(job.on_done, job, text)
+            return
+
+        cuts = long_form.find_cuts(audio, chunk_seconds=self.chunk_seconds)
+        pieces = []
+        for start, end in zip(cuts[:-1], cuts[1:]):
+            text = transcription_cache.transcribe(audio[start:end], model_name=self.model_name)['text']
+            if job.cancelled.is_set():
+                return
+            if text:
+                pieces.append(text)
+            if end < audio.size:
+                self._post(job.on_partial, job, " ".join(pieces))
+        if not job.cancelled.is_set():
+            self._post(job.on_done, job, " ".join(pieces))
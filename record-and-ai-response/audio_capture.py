@@ -0,0 +1,329 @@
+import math
+import os
+import tempfile
+import time
+import wave
+import weakref
+
+import numpy as np
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class AudioCapture:
+    """
+    Preallocated capture buffer for sounddevice input streams.
+
+    Blocks are copied straight into a preallocated NumPy array from the audio callback,
+    so recording does no per-block allocation and no final concatenate. The array starts
+    at initial_seconds and doubles as needed up to max_seconds, so short utterances only
+    cost a small buffer. A fixed-size ring of per-block RMS values gives O(1) noise-level
+    queries. Once max_seconds is reached the capture either spills to a growing
+    memory-mapped temp file (spill=True, the default) or wraps around and keeps only the
+    most recent audio.
+
+    Usage:
+        capture = AudioCapture(samplerate=16000)
+        with sd.InputStream(samplerate=16000, channels=1, blocksize=capture.blocksize, callback=capture.callback):
+            ...
+        audio = capture.audio()
+    """
+
+    def __init__(self, samplerate=16000, channels=1, max_seconds=600, blocksize=512, rms_window=10,
+                 spill=True, spill_dir=None, dtype=np.float32, initial_seconds=30):
+        """
+        :param samplerate: The sample rate for audio recording (default: 16000).
+        :param channels: Number of input channels.
+        :param max_seconds: Seconds of audio held in RAM before spilling (or wrapping around).
+        :param blocksize: Block size to request from the input stream; sizes the RMS history.
+        :param rms_window: Seconds of per-block RMS history to keep for noise-level estimates.
+        :param spill: Continue into a memory-mapped file when RAM is full instead of overwriting old audio.
+        :param spill_dir: Directory for the spill file (default: the system temp directory).
+        :param dtype: Sample type of the buffer.
+        :param initial_seconds: Seconds of audio allocated up front; size it to the expected recording length.
+        """
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self.dtype = np.dtype(dtype)
+
+        self._capacity = int(max_seconds * samplerate)
+        initial = min(self._capacity, max(int(initial_seconds * samplerate), blocksize))
+        self._buffer = np.zeros((initial, channels), dtype=self.dtype)
+        self._frames = 0  # Total frames written
+        self._spill_path = None
+        self._spill_chunk = self._capacity
+
+        history = max(1, int(np.ceil(rms_window * samplerate / blocksize)))
+        self._rms = np.zeros(history, dtype=np.float64)
+        self._rms_count = 0
+        self._rms_sum = 0.0
+        self.last_block_frames = 0
+        self.first_sample_at = None  # perf_counter() when the first block arrived
+
+    # Writing
+
+    def callback(self, indata, frames, time_info, status):
+        """
+        sounddevice InputStream callback.
+        """
+        self.write(indata)
+
+    def write(self, block):
+        """
+        Copies a block of samples into the buffer and updates the RMS history.
+        :param block: Array of shape (frames, channels) or (frames,).
+        """
+        block = block.reshape(-1, self.channels)
+        n = block.shape[0]
+        if n == 0:
+            return
+        if self.first_sample_at is None:
+            self.first_sample_at = time.perf_counter()
+
+        start = self._frames
+        if start + n > self._buffer.shape[0] and self._buffer.shape[0] < self._capacity:
+            self._expand(start + n)
+        if start + n > self._buffer.shape[0]:
+            if self.spill:
+                self._grow(start + n)
+            else:
+                self._write_wrapped(block)
+                start = None
+        if start is not None:
+            self._buffer[start:start + n] = block
+        self._frames += n
+
+        # RMS via a dot product so no temporary array is allocated
+        flat = block.reshape(-1)
+        rms = float(np.sqrt(np.dot(flat, flat) / flat.size))
+        slot = self._rms_count % self._rms.size
+        self._rms_sum += rms - self._rms[slot]
+        self._rms[slot] = rms
+        self._rms_count += 1
+        if slot == self._rms.size - 1:
+            # Re-sum once per lap so floating point drift can't build up
+            self._rms_sum = float(self._rms.sum())
+        self.last_block_frames = n
+
+    def _write_wrapped(self, block):
+        size = self._buffer.shape[0]
+        n = block.shape[0]
+        if n >= size:
+            block = block[-size:]
+            start = (self._frames + n - size) % size
+            n = size
+        else:
+            start = self._frames % size
+        first = min(n, size - start)
+        self._buffer[start:start + first] = block[:first]
+        self._buffer[:n - first] = block[first:]
+
+    def _expand(self, needed):
+        # Double the in-memory buffer, up to max_seconds; earlier views keep the old array alive
+        size = min(self._capacity, max(needed, 2 * self._buffer.shape[0]))
+        expanded = np.zeros((size, self.channels), dtype=self.dtype)
+        expanded[:self._frames] = self._buffer[:self._frames]
+        self._buffer = expanded
+
+    def _grow(self, needed):
+        # Move to (or extend) a memory-mapped file; old views stay valid since the old map is kept alive by them
+        new_size = max(needed, self._buffer.shape[0] + self._spill_chunk)
+        nbytes = new_size * self.channels * self.dtype.itemsize
+        if self._spill_path is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix="capture_", suffix=".f32", dir=self.spill_dir)
+            os.close(fd)
+            weakref.finalize(self, _remove_file, self._spill_path)
+        with open(self._spill_path, "r+b") as f:
+            f.truncate(nbytes)
+        spilled = np.memmap(self._spill_path, dtype=self.dtype, mode="r+", shape=(new_size, self.channels))
+        if not isinstance(self._buffer, np.memmap):
+            spilled[:self._frames] = self._buffer[:self._frames]
+        self._buffer = spilled
+
+    # Reading
+
+    @property
+    def frames(self):
+        """
+        Total number of frames written, including any overwritten in wrap-around mode.
+        """
+        return self._frames
+
+    @property
+    def duration(self):
+        return self._frames / self.samplerate
+
+    @property
+    def spilled(self):
+        return self._spill_path is not None
+
+    def views(self):
+        """
+        :return: Tuple of arrays (oldest first) covering the retained audio, without copying.
+        """
+        size = self._buffer.shape[0]
+        frames = self._frames
+        if frames <= size:
+            return (self._buffer[:frames],)
+        start = frames % size
+        return (self._buffer[start:], self._buffer[:start])
+
+    def audio(self):
+        """
+        Returns the recorded audio, flattened for mono captures. This is a view into the
+        buffer unless wrap-around mode has already overwritten the start of the recording.
+        :return: Numpy array of the recorded audio.
+        """
+        parts = self.views()
+        data = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return data[:, 0] if self.channels == 1 else data
+
+    def latest(self, seconds):
+        """
+        :param seconds: How much recent audio to return.
+        :return: The most recent audio (a view when it doesn't straddle the wrap point).
+        """
+        n = min(int(seconds * self.samplerate), self._frames, self._buffer.shape[0])
+        parts = self.views()
+        if parts[-1].shape[0] >= n:
+            data = parts[-1][parts[-1].shape[0] - n:]
+        else:
+            data = np.concatenate(parts)[-n:]
+        return data[:, 0] if self.channels == 1 else data
+
+    def rms_history(self):
+        """
+        :return: Per-block RMS values for the last rms_window seconds, oldest first.
+        """
+        size = self._rms.size
+        if self._rms_count <= size:
+            return self._rms[:self._rms_count]
+        start = self._rms_count % size
+        return np.concatenate((self._rms[start:], self._rms[:start]))
+
+    def mean_rms(self):
+        """
+        :return: Mean block RMS over the history window, maintained in O(1).
+        """
+        count = min(self._rms_count, self._rms.size)
+        return self._rms_sum / count if count else 0.0
+
+    def last_rms(self):
+        if self._rms_count == 0:
+            return 0.0
+        return float(self._rms[(self._rms_count - 1) % self._rms.size])
+
+    def close(self):
+        """
+        Releases the buffer and deletes any spill file.
+        """
+        self._buffer = np.zeros((0, self.channels), dtype=self.dtype)
+        if self._spill_path is not None:
+            _remove_file(self._spill_path)
+            self._spill_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_wav(path):
+    """
+    Reads a PCM WAV file into float32 samples in [-1, 1], mixed down to mono.
+    :param path: Path to the WAV file.
+    :return: Tuple of (numpy array of samples, sample rate).
+    """
+    with wave.open(path, 'rb') as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+WHISPER_SAMPLE_RATE = 16000
+
+_filter_cache = {}
+
+
+def _polyphase_filters(up, down, half_width=10, beta=5.0):
+    # Kaiser-windowed sinc low-pass at the lower of the two Nyquist rates, split into `up` phases
+    key = (up, down, half_width, beta)
+    if key not in _filter_cache:
+        rate = max(up, down)
+        half_len = half_width * rate
+        n = np.arange(-half_len, half_len + 1)
+        h = np.sinc(n / rate) * np.kaiser(n.size, beta)
+        h *= up / h.sum()  # Unity gain per phase
+        # Pad so every phase has the same number of taps
+        taps = int(math.ceil(h.size / up))
+        h = np.concatenate((h, np.zeros(taps * up - h.size)))
+        # phases[p, k] = h[k * up + p]
+        _filter_cache[key] = (h.reshape(taps, up).T.astype(np.float32).copy(), half_len)
+    return _filter_cache[key]
+
+
+def resample_poly(samples, orig_sr, target_sr=WHISPER_SAMPLE_RATE, chunk=65536):
+    """
+    Resamples audio with a polyphase FIR filter (upsample by `up`, filter, downsample by `down`)
+    without computing the discarded samples.
+    :param samples: 1-D numpy array of samples.
+    :param orig_sr: Sample rate of `samples`.
+    :param target_sr: Desired sample rate (default: 16000, what Whisper expects).
+    :param chunk: Output samples computed per vectorized step, bounding temporary memory.
+    :return: 1-D float32 numpy array at target_sr.
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    if orig_sr == target_sr:
+        return samples
+    g = math.gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // g, int(orig_sr) // g
+    phases, half_len = _polyphase_filters(up, down)
+    taps = phases.shape[1]
+
+    n_out = int(math.ceil(samples.size * up / down))
+    # Output n sits at position n*down (+ filter delay) on the upsampled grid
+    padded = np.concatenate((np.zeros(taps, dtype=np.float32), samples, np.zeros(taps, dtype=np.float32)))
+    out = np.empty(n_out, dtype=np.float32)
+    k = np.arange(taps)
+    for start in range(0, n_out, chunk):
+        n = np.arange(start, min(start + chunk, n_out))
+        pos = n * down + half_len
+        base = pos // up
+        phase = pos % up
+        # y[n] = sum_k h[phase + k*up] * x[base - k]
+        idx = base[:, None] - k[None, :] + taps
+        out[start:start + n.size] = np.einsum('ij,ij->i', padded[idx], phases[phase])
+    return out
+
+
+def pcm16_to_float(data):
+    """
+    :param data: Raw little-endian 16-bit PCM bytes or an int16 array.
+    :return: float32 numpy array in [-1, 1].
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(data, dtype='<i2')
+    return data.astype(np.float32) / 32768
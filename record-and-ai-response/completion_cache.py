@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Overridable with LLM_CACHE_PATH / LLM_CACHE_MB / LLM_CACHE_TTL_DAYS; LLM_CACHE=off disables caching
+DEFAULT_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "ai-tests", "completions.sqlite"))
+DEFAULT_MAX_MB = float(os.environ.get("LLM_CACHE_MB", 64))
+DEFAULT_TTL_DAYS = float(os.environ.get("LLM_CACHE_TTL_DAYS", 30))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def make_key(backend, model, prompt, context=None, **params):
+    """
+    Hash of everything that determines a completion.
+    :param backend: e.g. 'ollama' or 'openai'.
+    :param model: Model name.
+    :param prompt: Prompt text (or a list of chat messages).
+    :param context: Conversation context (Ollama context array), if any.
+    :param params: Sampling parameters and other request fields (options, format, system, max_tokens, ...).
+    :return: Hex digest.
+    """
+    material = json.dumps([backend, model, prompt, context or None, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+# Default sampling temperatures, used when a request doesn't set one
+OLLAMA_TEMPERATURE = 0.8
+OPENAI_TEMPERATURE = 1.0
+
+
+def is_deterministic(options=None, default_temperature=OLLAMA_TEMPERATURE):
+    """
+    True when repeating the request gives the same answer, so a cached one can stand in:
+    it fixes a seed or samples at temperature 0. A request without a temperature samples
+    at the backend's default, so it is only deterministic with a seed.
+    :param options: Sampling options of the request (Ollama options, or OpenAI's temperature/seed).
+    :param default_temperature: The backend's temperature when options don't set one.
+    """
+    options = options or {}
+    return options.get('seed') is not None or float(options.get('temperature', default_temperature)) <= 0
+
+
+class CompletionCache:
+    """
+    On-disk completion cache in a single SQLite file. Values are zlib-compressed JSON,
+    entries expire after ttl seconds and the least recently used ones are evicted once
+    the stored values exceed max_bytes. Hit/miss/eviction counters persist across runs.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024), ttl=DEFAULT_TTL_DAYS * 86400):
+        """
+        :param path: SQLite file (directories are created), or ':memory:'.
+        :param max_bytes: Budget for the compressed values.
+        :param ttl: Seconds an entry stays valid (None keeps entries until evicted).
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _count(self, name, n=1):
+        self._db.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, n))
+
+    def get(self, key):
+        """
+        :return: The cached value, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count('expired')
+                row = None
+            if row is None:
+                self._count('misses')
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._count('hits')
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, value):
+        """
+        Stores a JSON-serializable value, then evicts least recently used entries over budget.
+        """
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                             (key, blob, len(blob), now, now))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._count('evictions', evicted)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM counters")
+        self._db.execute("VACUUM")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'expired': counters.get('expired', 0),
+            'evictions': counters.get('evictions', 0),
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+_default = None
+
+
+def get_cache():
+    """
+    Shared cache for the default path, or None when disabled with LLM_CACHE=off.
+    """
+    global _default
+    if os.environ.get("LLM_CACHE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    if _default is None:
+        _default = CompletionCache()
+    return _default
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the completion cache.")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+    cache = CompletionCache(args.path)
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,74 @@
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+import types
+
+# Set at the top of a script (before its other imports) to time startup against
+STARTED = time.perf_counter()
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access. The import runs
+    under a per-module lock, so when the preload thread and the main thread touch the
+    module at once one imports it and the other waits for the finished module
+    (importlib.util.LazyLoader isn't thread-safe before Python 3.12).
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+        self._lazy_module = None
+
+    def _load(self):
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        module = self._lazy_module
+        if module is None:
+            module = self._load()
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """
+    Returns a stand-in for the module called `name` without importing it; the real
+    import happens on the first attribute access, from whichever thread gets there first.
+    Keeps heavy optional imports (whisper/torch, aiohttp, keyboard) off the path between
+    launching a script and capturing the first audio sample.
+    :param name: Absolute module name.
+    :return: The module if it is already imported, otherwise the stand-in.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
+
+
+_first_sample_seconds = None
+
+
+def first_sample(at):
+    """
+    Records when the process captured its first audio sample.
+    :param at: perf_counter() value of the first sample (e.g. AudioCapture.first_sample_at).
+    :return: Seconds from STARTED to that sample on the first call, None afterwards.
+    """
+    global _first_sample_seconds
+    if _first_sample_seconds is not None or at is None:
+        return None
+    _first_sample_seconds = at - STARTED
+    return _first_sample_seconds
+
+
+def since_start():
+    """
+    Seconds since this module was first imported (see STARTED).
+    """
+    return time.perf_counter() - STARTED
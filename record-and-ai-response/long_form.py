@@ -0,0 +1,186 @@
+import argparse
+import atexit
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import whisper_models
+import quantized_whisper
+from audio_capture import read_wav, resample_poly, WHISPER_SAMPLE_RATE
+from vad import VoiceActivityDetector
+
+# Worker processes used by default, overridable with WHISPER_WORKERS
+DEFAULT_WORKERS = int(os.environ.get("WHISPER_WORKERS", 1))
+# Recordings shorter than this are sent to a single transcribe call
+LONG_FORM_MIN_SECONDS = 60
+
+_pools = {}  # (model_name, workers) -> ProcessPoolExecutor, kept warm between calls
+_worker_model = None
+
+
+def find_cuts(audio, samplerate=WHISPER_SAMPLE_RATE, chunk_seconds=25.0, search_seconds=10.0, frame_ms=20):
+    """
+    Picks cut points roughly every chunk_seconds, each placed in the quietest stretch
+    (smoothed frame energy) of the preceding search_seconds so cuts land in pauses.
+    :return: List of sample positions, starting with 0 and ending with len(audio).
+    """
+    vad = VoiceActivityDetector(samplerate=samplerate, frame_ms=frame_ms)
+    frame = vad.frame_length
+    n_frames = audio.size // frame
+    if n_frames == 0:
+        return [0, audio.size]
+    energy, _ = vad.frame_features(audio[:n_frames * frame].reshape(n_frames, frame).astype(np.float32))
+    # 200 ms moving average so a cut prefers a real pause over a single quiet frame
+    width = max(1, int(0.2 / vad.frame_seconds))
+    smoothed = np.convolve(energy, np.ones(width) / width, mode='same')
+
+    cuts = [0]
+    chunk_frames = int(chunk_seconds / vad.frame_seconds)
+    search_frames = int(search_seconds / vad.frame_seconds)
+    position = 0
+    while n_frames - position > chunk_frames:
+        window_end = position + chunk_frames
+        window_start = max(position + 1, window_end - search_frames)
+        cut = window_start + int(np.argmin(smoothed[window_start:window_end]))
+        cuts.append(cut * frame)
+        position = cut
+    cuts.append(audio.size)
+    return cuts
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    # Explicit, so loading an int8 model doesn't swap in the benchmark's tuned count
+    quantized_whisper.tune_threads(threads)
+    _worker_model = whisper_models.get_model(model_name)
+
+
+def _transcribe_chunk(audio, offset, options):
+    result = _worker_model.transcribe(audio, fp16=False, word_timestamps=True, **options)
+    words = []
+    for segment in result['segments']:
+        for word in segment.get('words', []):
+            words.append({'word': word['word'], 'start': word['start'] + offset, 'end': word['end'] + offset})
+    return words
+
+
+def _normalize(word):
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+def stitch(chunks, cuts, samplerate=WHISPER_SAMPLE_RATE, max_repeat=6):
+    """
+    Joins per-chunk word lists. Each word is kept by the chunk whose own span contains its
+    midpoint, then any run of words repeated across a boundary is dropped once.
+    :param chunks: Lists of {'word', 'start', 'end'} dicts with absolute timestamps, in order.
+    :param cuts: Cut points (samples) as returned by find_cuts.
+    :return: Single list of words.
+    """
+    words = []
+    for i, chunk_words in enumerate(chunks):
+        lo, hi = cuts[i] / samplerate, cuts[i + 1] / samplerate
+        kept = [w for w in chunk_words if lo <= (w['start'] + w['end']) / 2 < hi
+                or (i == len(chunks) - 1 and (w['start'] + w['end']) / 2 >= hi)]
+        if words and kept:
+            # Both chunks sometimes claim the same words when timestamps drift; drop the longest repeated run
+            for k in range(min(max_repeat, len(words), len(kept)), 0, -1):
+                if [_normalize(w['word']) for w in words[-k:]] == [_normalize(w['word']) for w in kept[:k]]:
+                    kept = kept[k:]
+                    break
+        words.extend(kept)
+    return words
+
+
+def get_pool(model_name="base", workers=DEFAULT_WORKERS, threads_per_worker=None):
+    """
+    Returns a process pool whose workers each hold their own copy of the model.
+    """
+    key = (model_name, workers)
+    if key not in _pools:
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        _pools[key] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                          initargs=(model_name, threads))
+    return _pools[key]
+
+
+@atexit.register
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+
+def should_split(audio, workers=DEFAULT_WORKERS, samplerate=WHISPER_SAMPLE_RATE):
+    return workers > 1 and len(audio) >= LONG_FORM_MIN_SECONDS * samplerate
+
+
+def transcribe_long(audio, model_name="base", workers=DEFAULT_WORKERS, chunk_seconds=25.0, overlap=1.5, **options):
+    """
+    Transcribes a long recording by splitting it at pauses into overlapping windows and
+    transcribing them across a process pool.
+    :param audio: 16 kHz float32 numpy array.
+    :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large').
+    :param workers: Number of worker processes.
+    :param chunk_seconds: Target length of each chunk before overlap.
+    :param overlap: Seconds of extra audio on each side of a cut.
+    :param options: Extra decode options passed to model.transcribe.
+    :return: Dict with 'text' and 'words' (absolute timestamps in seconds).
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    cuts = find_cuts(audio, chunk_seconds=chunk_seconds)
+    pad = int(overlap * WHISPER_SAMPLE_RATE)
+    pool = get_pool(model_name, workers)
+
+    futures = []
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        lo, hi = max(0, start - pad), min(audio.size, end + pad)
+        futures.append(pool.submit(_transcribe_chunk, audio[lo:hi], lo / WHISPER_SAMPLE_RATE, options))
+    chunks = [f.result() for f in futures]
+
+    words = stitch(chunks, cuts)
+    text = "".join(w['word'] for w in words).strip()
+    return {'text': text, 'words': words}
+
+
+def _benchmark(audio, model_name, worker_counts):
+    seconds = audio.size / WHISPER_SAMPLE_RATE
+    print(f"Audio: {seconds / 60:.1f} min, model '{model_name}'")
+
+    model = whisper_models.get_model(model_name)
+    start = time.perf_counter()
+    single = model.transcribe(audio, fp16=False)['text'].strip()
+    baseline = time.perf_counter() - start
+    print(f"single call:  {baseline:7.1f}s  (RTF {baseline / seconds:.3f})")
+
+    for workers in worker_counts:
+        # Warm the pool first so model loading isn't counted
+        pool = get_pool(model_name, workers)
+        list(pool.map(_transcribe_chunk, [np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32)] * workers,
+                      [0.0] * workers, [{}] * workers))
+        start = time.perf_counter()
+        result = transcribe_long(audio, model_name=model_name, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:2d} workers:   {elapsed:7.1f}s  (RTF {elapsed / seconds:.3f}, speedup {baseline / elapsed:.2f}x, "
+              f"{len(result['text'].split())} words vs {len(single.split())})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chunked parallel transcription against a single transcribe call.")
+    parser.add_argument("wav", nargs="*", help="WAV files to concatenate (default: the repo's test recordings).")
+    parser.add_argument("--minutes", type=float, default=10, help="Repeat the audio up to this length.")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = args.wav or [os.path.join(root, "test_audio.wav"), os.path.join(root, "test_audio_manual.wav")]
+    pieces = []
+    for path in paths:
+        samples, rate = read_wav(path)
+        pieces.append(resample_poly(samples, rate))
+    clip = np.concatenate(pieces)
+    repeats = max(1, int(np.ceil(args.minutes * 60 * WHISPER_SAMPLE_RATE / clip.size)))
+    _benchmark(np.tile(clip, repeats)[:int(args.minutes * 60 * WHISPER_SAMPLE_RATE)], args.model, args.workers)
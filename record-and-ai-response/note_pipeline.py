@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import queue
+import threading
+import time
+
+from ollama_client import AsyncOllamaClient, OllamaError
+from note_titles import generate_note
+from completion_cache import get_cache
+from prompt_contexts import PromptContextCache
+import tracing
+
+_STOP = object()
+
+
+class NotePipeline:
+    """
+    Long-running voice-to-note loop with one worker per stage, linked by bounded queues:
+
+        capture (calling thread) -> transcribe -> LLM (asyncio) -> save (I/O)
+
+    The next utterance is recorded while the previous one is transcribed and the one
+    before that is with the model. When a downstream stage falls behind its queue fills
+    and capture waits before starting another recording (backpressure), so memory stays
+    bounded. stop() or Ctrl+C ends capture; notes already recorded are finished before
+    run() returns.
+    """
+
+    def __init__(self, record, transcribe, make_prompt, save, api_url, model="deepseek-coder-v2:16b",
+                 title_mode="json", use_cache=True, seed=None, queue_size=2, llm_concurrency=1, instructions=(), describe=None):
+        """
+        :param record: Callable() -> audio array of one utterance (None or empty to skip).
+        :param transcribe: Callable(audio) -> transcript text.
+        :param make_prompt: Callable(transcript) -> prompt text.
+        :param save: Callable(prompt, result, title, **note); runs on the I/O worker. note holds the
+                     transcript, timings (seconds per stage) and whatever describe returned.
+        :param api_url: URL of the Ollama generate endpoint.
+        :param model: Ollama model name.
+        :param title_mode: See note_titles.generate_note.
+        :param use_cache: Reuse cached completions of deterministic requests (see completion_cache).
+        :param seed: Sample with this seed, making answers repeatable (and so cacheable).
+        :param queue_size: Items each queue holds before the stage feeding it blocks.
+        :param llm_concurrency: Notes in flight with the model at once.
+        :param instructions: Fixed prompt prefixes whose processed context is reused (see prompt_contexts).
+        :param describe: Optional Callable(audio, transcript) -> dict of extra note fields (e.g. action, audio_hash).
+        """
+        self.record = record
+        self.transcribe = transcribe
+        self.make_prompt = make_prompt
+        self.save = save
+        self.api_url = api_url
+        self.model = model
+        self.title_mode = title_mode
+        self.use_cache = use_cache
+        self._options = {'seed': seed} if seed is not None else None
+        self.llm_concurrency = llm_concurrency
+        self.instructions = list(instructions)
+        self.describe = describe
+        self._audio = queue.Queue(maxsize=queue_size)
+        self._prompts = queue.Queue(maxsize=queue_size)
+        self._notes = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._busy = {'capture': 0.0, 'transcribe': 0.0, 'llm': 0.0, 'save': 0.0}
+        self._waited = 0.0  # Seconds capture spent blocked on a full queue
+        self.recorded = 0
+        self.saved = 0
+        self.errors = 0
+        self._started = None
+
+    def stop(self):
+        """
+        Ends capture after the current recording; queued notes are still finished.
+        """
+        self._stopping.set()
+
+    def _account(self, stage, seconds):
+        with self._lock:
+            self._busy[stage] += seconds
+
+    def _failed(self, number, message):
+        print(f"[note {number}] {message}")
+        with self._lock:
+            self.errors += 1
+
+    def _drain(self, source, stage):
+        # A stage that stops early still consumes its input up to _STOP, so the stage
+        # feeding it can never block forever on a full queue
+        while True:
+            item = source.get()
+            if item is _STOP:
+                return
+            self._failed(item[0], f"dropped: the {stage} stage stopped")
+
+    def _transcribe_worker(self):
+        stopped = False
+        try:
+            while True:
+                item = self._audio.get()
+                if item is _STOP:
+                    stopped = True
+                    return
+                number, audio = item
+                start = time.perf_counter()
+                try:
+                    transcript = self.transcribe(audio).strip()
+                    note = {'transcript': transcript, 'timings': {'transcribe': round(time.perf_counter() - start, 3)}}
+                    if transcript:
+                        prompt = self.make_prompt(transcript)
+                        if self.describe is not None:
+                            note.update(self.describe(audio, transcript))
+                except Exception as e:
+                    self._failed(number, f"transcription failed: {e!r}")
+                    continue
+                finally:
+                    self._account('transcribe', time.perf_counter() - start)
+                if not transcript:
+                    print(f"[note {number}] no speech transcribed, skipped")
+                    continue
+                print(f"[note {number}] transcript: {transcript}")
+                self._prompts.put((number, prompt, note))
+        finally:
+            if not stopped:
+                self._drain(self._audio, "transcribe")
+            self._prompts.put(_STOP)
+
+    async def _llm_consumer(self, client, contexts):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._prompts.get)
+            if item is _STOP:
+                # Pass the sentinel on to the other consumers (and the worker's final drain)
+                self._prompts.put(_STOP)
+                return
+            number, prompt, note = item
+            start = time.perf_counter()
+            try:
+                with tracing.span("generate_note", note=number, title_mode=self.title_mode):
+                    result, title, seconds = await generate_note(client, prompt, self.model, self.title_mode, contexts=contexts,
+                                                                 options=self._options)
+            except Exception as e:
+                self._failed(number, f"model request failed: {e!r}")
+                continue
+            finally:
+                self._account('llm', time.perf_counter() - start)
+            # Blocking put off the event loop so other consumers keep streaming
+            note['timings']['response'] = round(seconds, 3)
+            await loop.run_in_executor(None, self._notes.put, (number, prompt, result, title, note))
+
+    def _llm_worker(self):
+        async def run():
+            cache = get_cache() if self.use_cache else None
+            contexts = PromptContextCache(self.instructions, cache=get_cache()) if self.instructions else None
+            async with AsyncOllamaClient(self.api_url, max_concurrency=self.llm_concurrency, cache=cache) as client:
+                await asyncio.gather(*(self._llm_consumer(client, contexts) for _ in range(self.llm_concurrency)))
+        try:
+            asyncio.run(run())
+        except Exception as e:
+            print(f"LLM stage stopped: {e!r}")
+        finally:
+            # Takes the sentinel the consumers passed on, or whatever was left if the stage failed
+            self._drain(self._prompts, "LLM")
+            self._notes.put(_STOP)
+
+    def _save_worker(self):
+        stopped = False
+        try:
+            while True:
+                item = self._notes.get()
+                if item is _STOP:
+                    stopped = True
+                    return
+                number, prompt, result, title, note = item
+                title = "".join(c for c in title if c.isalpha() or c.isdigit() or c == ' ').rstrip()
+                start = time.perf_counter()
+                try:
+                    self.save(prompt, result, title, **note)
+                except Exception as e:
+                    self._failed(number, f"could not be saved: {e!r}")
+                    continue
+                finally:
+                    self._account('save', time.perf_counter() - start)
+                with self._lock:
+                    self.saved += 1
+        finally:
+            if not stopped:
+                self._drain(self._notes, "save")
+
+    def run(self, max_notes=None):
+        """
+        Records utterances on the calling thread until stop(), Ctrl+C or max_notes, then
+        waits for the remaining notes to be transcribed, answered and saved.
+        :return: stats() once everything is written.
+        """
+        self._started = time.perf_counter()
+        workers = [threading.Thread(target=self._transcribe_worker, name="pipeline-transcribe", daemon=True),
+                   threading.Thread(target=self._llm_worker, name="pipeline-llm", daemon=True),
+                   threading.Thread(target=self._save_worker, name="pipeline-save", daemon=True)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            while not self._stopping.is_set() and (max_notes is None or self.recorded < max_notes):
+                start = time.perf_counter()
+                audio = self.record()
+                self._account('capture', time.perf_counter() - start)
+                if audio is None or len(audio) == 0:
+                    continue
+                self.recorded += 1
+                start = time.perf_counter()
+                self._audio.put((self.recorded, audio))
+                self._waited += time.perf_counter() - start
+        except KeyboardInterrupt:
+            print("\nStopping: finishing the notes already recorded (Ctrl+C again to abort).")
+        finally:
+            self._audio.put(_STOP)
+
+        for worker in workers:
+            worker.join()
+        stats = self.stats()
+        print(f"{stats['saved']} notes saved in {stats['seconds']:.1f}s ({stats['notes_per_minute']:.1f} notes/min)")
+        return stats
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        with self._lock:
+            return {
+                'recorded': self.recorded,
+                'saved': self.saved,
+                'errors': self.errors,
+                'seconds': round(elapsed, 3),
+                'notes_per_minute': round(60 * self.saved / elapsed, 2) if elapsed else 0.0,
+                'busy_seconds': {stage: round(s, 3) for stage, s in self._busy.items()},
+                'capture_blocked_seconds': round(self._waited, 3),
+            }
+
+
+def _demo(notes, record_seconds, transcribe_seconds, token_delay):
+    # Simulated capture and transcription against the stub server, compared with running the stages back to back
+    import numpy as np
+    from ollama_stub import start_stub_server
+
+    server = start_stub_server(token_delay=token_delay)
+
+    def record():
+        time.sleep(record_seconds)
+        return np.zeros(16000, dtype=np.float32)
+
+    def transcribe(audio):
+        time.sleep(transcribe_seconds)
+        return "summarize remember to book the venue and email the caterer"
+
+    saved = []
+    pipeline = NotePipeline(record, transcribe, lambda t: f"Please summarize the following text:\n\n{t}",
+                            lambda prompt, result, title, **note: saved.append(title), server.api_url, use_cache=False)
+    stats = pipeline.run(max_notes=notes)
+    llm_seconds = stats['busy_seconds']['llm'] / max(1, stats['saved'])
+    sequential = notes * (record_seconds + transcribe_seconds + llm_seconds)
+    print(f"pipelined: {stats['seconds']:.1f}s  back to back: ~{sequential:.1f}s "
+          f"({60 * notes / sequential:.1f} notes/min)")
+    print(stats)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the note pipeline on simulated utterances and a stub model server.")
+    parser.add_argument("--notes", type=int, default=6)
+    parser.add_argument("--record-seconds", type=float, default=1.0)
+    parser.add_argument("--transcribe-seconds", type=float, default=0.8)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    _demo(args.notes, args.record_seconds, args.transcribe_seconds, args.token_delay)
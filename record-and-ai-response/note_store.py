@@ -0,0 +1,398 @@
+import argparse
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# Overridable with NOTES_DB_PATH; NOTES_STORE=off stops notes being recorded
+DEFAULT_PATH = os.environ.get("NOTES_DB_PATH", os.path.join(os.path.expanduser("~"), ".local", "share", "ai-tests", "notes.sqlite"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    title TEXT,
+    action TEXT,
+    transcript TEXT NOT NULL,
+    prompt TEXT,
+    response TEXT,
+    audio_hash TEXT,
+    timings TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS notes_created ON notes (created);
+CREATE INDEX IF NOT EXISTS notes_audio_hash ON notes (audio_hash);
+"""
+
+# Full-text index over the note text; the table is append-only, so an insert trigger keeps it current
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    title, transcript, response, content='notes', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, title, transcript, response) VALUES (new.id, new.title, new.transcript, new.response);
+END;
+"""
+
+_COLUMNS = ("created", "title", "action", "transcript", "prompt", "response", "audio_hash", "timings", "source")
+
+
+def to_timestamp(value, end=False):
+    """
+    :param value: Epoch seconds, date, datetime or an ISO 'YYYY-MM-DD[THH:MM[:SS]]' string.
+    :param end: For a bare date, return the end of that day instead of its start.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if len(value) > 10 else date.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value + timedelta(days=1) if end else value, datetime.min.time())
+        return value.timestamp() - (1e-6 if end else 0)
+    return value.timestamp()
+
+
+class NoteStore:
+    """
+    Append-only store of voice notes in one SQLite file, with an FTS5 index over the
+    title, transcript and response. add() queues a note; queued notes are written in
+    one transaction once batch_size of them are waiting, by a timer flush_seconds after
+    the first of them was queued, on any query and on close().
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=32, flush_seconds=5.0):
+        """
+        :param path: SQLite file (directories are created), or ':memory:'.
+        :param batch_size: Notes per write transaction.
+        :param flush_seconds: Longest a queued note waits before it is written (0 writes every note at once).
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._first_pending = None
+        self._timer = None
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE scans
+            self.fts = False
+
+    def add(self, transcript, response=None, title=None, action=None, prompt=None, audio_hash=None,
+            timings=None, created=None, source=None):
+        """
+        Queues a note.
+        :param transcript: What was said.
+        :param response: The model's response.
+        :param title: Note title.
+        :param action: Detected action (summarize, make_todo, ...).
+        :param prompt: Prompt sent to the model.
+        :param audio_hash: transcription_cache.audio_digest of the recording.
+        :param timings: Dict of stage name -> seconds.
+        :param created: Epoch seconds (default: now).
+        :param source: Where the note came from (script name or imported file).
+        """
+        row = (created or time.time(), title, action, transcript, prompt, response, audio_hash,
+               json.dumps(timings) if timings else None, source)
+        with self._lock:
+            self._pending.append(row)
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+            due = len(self._pending) >= self.batch_size or time.monotonic() - self._first_pending >= self.flush_seconds
+            if due:
+                self._flush()
+            elif self._timer is None:
+                # Notes arrive minutes apart in the recording scripts, so don't wait for the next add()
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(f"INSERT INTO notes ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                                 self._pending)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._pending = []
+        self._first_pending = None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            self._flush()
+            return [self._note(row) for row in self._db.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _note(row):
+        note = dict(row)
+        if note.get('timings'):
+            note['timings'] = json.loads(note['timings'])
+        return note
+
+    @staticmethod
+    def _range(start, end):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("notes.created >= ?")
+            params.append(to_timestamp(start))
+        if end is not None:
+            clauses.append("notes.created <= ?")
+            params.append(to_timestamp(end, end=True))
+        return clauses, params
+
+    def search(self, query, start=None, end=None, action=None, limit=20):
+        """
+        Full-text search, best matches first.
+        :param query: FTS5 query ('whisper latency', 'title:budget', '"exact phrase"', 'prototyp*').
+                      Text that isn't valid query syntax is searched as plain words.
+        :param start: Only notes created on or after this (see to_timestamp).
+        :param end: Only notes created on or before this; a bare date includes the whole day.
+        :param action: Only notes with this action.
+        :param limit: Maximum notes returned.
+        :return: List of note dicts, each with a 'snippet' of the matching text.
+        """
+        clauses, params = self._range(start, end)
+        if action:
+            clauses.append("notes.action = ?")
+            params.append(action)
+        if not self.fts:
+            words = query.split()
+            for word in words:
+                clauses.append("(notes.title LIKE ? OR notes.transcript LIKE ? OR notes.response LIKE ?)")
+                params += [f"%{word}%"] * 3
+            where = " AND ".join(clauses) or "1"
+            return self._query(f"SELECT *, substr(transcript, 1, 80) AS snippet FROM notes WHERE {where} "
+                               f"ORDER BY created DESC LIMIT ?", params + [limit])
+
+        where = "".join(f" AND {clause}" for clause in clauses)
+        sql = (f"SELECT notes.*, snippet(notes_fts, -1, '[', ']', '...', 12) AS snippet FROM notes_fts "
+               f"JOIN notes ON notes.id = notes_fts.rowid WHERE notes_fts MATCH ?{where} ORDER BY rank LIMIT ?")
+        try:
+            return self._query(sql, [query] + params + [limit])
+        except sqlite3.OperationalError:
+            plain = " ".join('"' + word.replace('"', '""') + '"' for word in re.findall(r"\w+", query))
+            return self._query(sql, [plain] + params + [limit]) if plain else []
+
+    def between(self, start=None, end=None, action=None, limit=None):
+        """
+        Notes created in a date range, oldest first (see search for the arguments).
+        """
+        clauses, params = self._range(start, end)
+        if action:
+            clauses.append("action = ?")
+            params.append(action)
+        where = " AND ".join(clauses) or "1"
+        return self._query(f"SELECT * FROM notes WHERE {where} ORDER BY created LIMIT ?", params + [limit or -1])
+
+    def get(self, note_id):
+        notes = self._query("SELECT * FROM notes WHERE id = ?", (note_id,))
+        return notes[0] if notes else None
+
+    def sources(self):
+        """
+        :return: Set of the source values recorded so far (e.g. imported file paths).
+        """
+        with self._lock:
+            self._flush()
+            return {row[0] for row in self._db.execute("SELECT DISTINCT source FROM notes WHERE source IS NOT NULL")}
+
+    def stats(self):
+        with self._lock:
+            self._flush()
+            count, first, last = self._db.execute("SELECT COUNT(*), MIN(created), MAX(created) FROM notes").fetchone()
+        return {
+            'notes': count,
+            'first': datetime.fromtimestamp(first).isoformat(timespec="seconds") if first else None,
+            'last': datetime.fromtimestamp(last).isoformat(timespec="seconds") if last else None,
+            'full_text_index': self.fts,
+            'path': self.path,
+        }
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def export_markdown(note, directory):
+    """
+    Writes a note as the Obsidian Markdown file save_to_markdown_file produces.
+    :return: The file's path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    title = "".join(c for c in (note.get('title') or "Note") if c.isalpha() or c.isdigit() or c == ' ').rstrip()
+    timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(note['created']))
+    filename = os.path.join(directory, f"{title}_{timestamp}.md")
+    with open(filename, 'w') as file:
+        file.write(f"# Transcript\n\n{note.get('prompt') or note['transcript']}\n\n")
+        file.write(f"# Processed Result\n\n{note.get('response') or ''}\n")
+    return filename
+
+
+def parse_note_file(path):
+    """
+    Reads a note saved by either recording script, for importing older notes.
+    :return: Dict of NoteStore.add arguments, or None if the file isn't a saved note.
+    """
+    with open(path, encoding="utf-8", errors="replace") as file:
+        text = file.read()
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    # record-and-ai-respond-b.py: {title}_{YYYYmmdd_HHMMSS}.md
+    match = re.fullmatch(r"(?s)# Transcript\n\n(.*?)\n\n# Processed Result\n\n(.*?)\n?", text)
+    stamp = re.search(r"_(\d{8}_\d{6})$", name)
+    if match and stamp:
+        created = datetime.strptime(stamp.group(1), "%Y%m%d_%H%M%S").timestamp()
+        return {'transcript': match.group(1), 'prompt': match.group(1), 'response': match.group(2),
+                'title': name[:stamp.start()], 'created': created, 'source': path}
+
+    # record-and-ai-respond-a.py: transcript_{YYYY-mm-dd_HH-MM-SS}.txt
+    match = re.fullmatch(r"(?s)Original Transcript:\n(.*?)\n\nAction: (.*?)\nResponse:\n(.*?)\n?", text)
+    stamp = re.search(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})$", name)
+    if match and stamp:
+        created = datetime.strptime(stamp.group(1), "%Y-%m-%d_%H-%M-%S").timestamp()
+        return {'transcript': match.group(1), 'action': match.group(2), 'response': match.group(3),
+                'created': created, 'source': path}
+    return None
+
+
+_default = None
+
+
+def get_store():
+    """
+    Shared store for the default path (flushed at exit), or None when disabled with NOTES_STORE=off.
+    """
+    global _default
+    if os.environ.get("NOTES_STORE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    if _default is None:
+        _default = NoteStore()
+        atexit.register(_default.close)
+    return _default
+
+
+def _print_notes(notes, as_json):
+    if as_json:
+        print(json.dumps(notes, indent=2))
+        return
+    for note in notes:
+        when = datetime.fromtimestamp(note['created']).strftime("%Y-%m-%d %H:%M")
+        text = note.get('snippet') or note['transcript'][:80]
+        print(f"{note['id']:>6}  {when}  {note.get('action') or '-':<11} {note.get('title') or ''}")
+        print(f"        {' '.join(text.split())}")
+
+
+def _benchmark(count):
+    # grep-style scan over one file per note against an FTS query
+    import random
+    import tempfile
+
+    rng = random.Random(0)
+    words = ("whisper latency budget todo venue caterer agenda prototype react sqlite notes model "
+             "transcript summary meeting grocery invoice deploy kivy android queue cache").split()
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = os.path.join(scratch, "notes")
+        store = NoteStore(os.path.join(scratch, "notes.sqlite"))
+        start = time.perf_counter()
+        for i in range(count):
+            text = " ".join(rng.choice(words) for _ in range(150)) + (" zanzibar" if i % 500 == 0 else "")
+            note = {'transcript': text, 'response': text[::-1], 'title': f"Note {i}", 'created': 1.7e9 + i * 60}
+            store.add(**note)
+            export_markdown(note, directory)
+        store.flush()
+        print(f"{count} notes written in {time.perf_counter() - start:.2f}s (SQLite and Markdown)")
+
+        start = time.perf_counter()
+        found = []
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name)) as file:
+                if "zanzibar" in file.read():
+                    found.append(name)
+        scan_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        hits = store.search("zanzibar", limit=count)
+        search_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        day = store.between(1.7e9, 1.7e9 + 86400)
+        range_seconds = time.perf_counter() - start
+        print(f"scan files: {scan_seconds * 1000:.1f} ms ({len(found)} matches)  "
+              f"FTS search: {search_seconds * 1000:.2f} ms ({len(hits)} matches)  "
+              f"one-day range: {range_seconds * 1000:.2f} ms ({len(day)} notes)")
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search, list, export and import saved voice notes.")
+    parser.add_argument("query", nargs="?", help="Full-text query; without it notes are listed by date.")
+    parser.add_argument("--since", help="Only notes from this date on (YYYY-MM-DD).")
+    parser.add_argument("--until", help="Only notes up to this date (YYYY-MM-DD, inclusive).")
+    parser.add_argument("--action", help="Only notes with this action.")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--show", type=int, metavar="ID", help="Print one note in full.")
+    parser.add_argument("--export", metavar="DIR", help="Write the matching notes to DIR as Markdown.")
+    parser.add_argument("--import", dest="import_paths", nargs="+", metavar="PATH",
+                        help="Import notes saved as files (files or directories).")
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print notes as JSON.")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--benchmark", type=int, metavar="NOTES", help="Compare file scans with indexed search.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _benchmark(args.benchmark)
+        raise SystemExit
+    store = NoteStore(args.path)
+    if args.import_paths:
+        imported = 0
+        # Importing the same files again doesn't duplicate them
+        seen = store.sources()
+        for path in args.import_paths:
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+            for file in files:
+                if file in seen or not file.endswith((".md", ".txt")):
+                    continue
+                note = parse_note_file(file)
+                if note is not None:
+                    store.add(**note)
+                    imported += 1
+        print(f"Imported {imported} notes")
+    elif args.show is not None:
+        note = store.get(args.show)
+        print(json.dumps(note, indent=2) if args.json or note is None else
+              f"# {note.get('title') or 'Note'}\n\n## Transcript\n\n{note['transcript']}\n\n## Response\n\n{note.get('response') or ''}")
+    elif args.stats:
+        print(json.dumps(store.stats(), indent=2))
+    else:
+        if args.query:
+            notes = store.search(args.query, args.since, args.until, args.action, args.limit)
+        else:
+            notes = store.between(args.since, args.until, args.action)[-args.limit:]
+        if args.export:
+            for note in notes:
+                print(export_markdown(note, args.export))
+        else:
+            _print_notes(notes, args.json)
+    store.close()
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import re
+import time
+from collections import Counter
+
+from ollama_client import AsyncOllamaClient, OllamaError
+
+TITLE_MODES = ("json", "local", "llm")
+
+TITLE_PROMPT = "Return a title for a note containing that responses text. The title should be able to be used in a filename"
+
+JSON_INSTRUCTION = ("\n\nReply with a JSON object with two fields: \"response\" (your full answer, Markdown allowed) "
+                    "and \"title\" (a short title for a note containing the response, usable in a filename).")
+
+RESPONSE_SCHEMA = {
+    'type': "object",
+    'properties': {
+        'response': {'type': "string"},
+        'title': {'type': "string"},
+    },
+    'required': ["response", "title"],
+}
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just let me more most my myself no nor not now of off on once only or
+other our ours ourselves out over own same she should so some such than that the their theirs them themselves then
+there these they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours yourself yourselves here's it's let's that's there's what's i'm you're we're they're
+can't don't won't isn't aren't use using used make made like get got one two first next step steps following
+""".split())
+
+
+class JsonFieldStreamer:
+    """
+    Incrementally extracts one top-level string field from a JSON object while it is
+    being streamed, so the response text can be shown token by token even though the
+    model is producing JSON.
+    """
+
+    _ESCAPES = {'n': "\n", 't': "\t", 'r': "\r", 'b': "\b", 'f': "\f", '"': '"', '\\': "\\", '/': "/"}
+
+    def __init__(self, field, on_text):
+        """
+        :param field: Name of the field to extract.
+        :param on_text: Callback receiving decoded pieces of the field's value.
+        """
+        self.field = field
+        self.on_text = on_text
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode = None  # Hex digits of a \uXXXX escape being read
+        self._high_surrogate = None
+        self._target = False
+        self._expecting_value = False
+        self._last_key = None
+        self._current = []
+
+    def feed(self, piece):
+        out = []
+        for c in piece:
+            if self._in_string:
+                text = self._string_char(c)
+                if text:
+                    (out if self._target else self._current).append(text)
+            elif c == '"':
+                self._in_string = True
+                self._target = self._depth == 1 and self._expecting_value and self._last_key == self.field
+                self._current = []
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+            elif c == ':':
+                self._expecting_value = True
+            elif c == ',':
+                self._expecting_value = False
+        if out:
+            self.on_text("".join(out))
+
+    def _string_char(self, c):
+        if self._unicode is not None:
+            self._unicode += c
+            if len(self._unicode) < 4:
+                return ""
+            code = int(self._unicode, 16)
+            self._unicode = None
+            if 0xD800 <= code < 0xDC00:
+                self._high_surrogate = code
+                return ""
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            return chr(code)
+        if self._escape:
+            self._escape = False
+            if c == 'u':
+                self._unicode = ""
+                return ""
+            return self._ESCAPES.get(c, c)
+        if c == '\\':
+            self._escape = True
+            return ""
+        if c == '"':
+            self._in_string = False
+            if self._depth == 1 and not self._expecting_value:
+                self._last_key = "".join(self._current)
+            else:
+                self._expecting_value = False
+            return ""
+        return c
+
+
+def parse_titled_response(text):
+    """
+    :param text: Model output expected to be a JSON object with response and title fields.
+    :return: Tuple of (response, title); (None, None) if it isn't valid JSON.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    return data.get('response'), data.get('title')
+
+
+def make_title(text, max_words=6):
+    """
+    Builds a note title locally: the first Markdown heading if there is one, otherwise
+    the highest-scoring keywords (frequency, weighted towards the start of the text)
+    in the order they first appear.
+    :param text: The response text.
+    :param max_words: Maximum words in the title.
+    :return: Title string (may be empty for empty text).
+    """
+    for line in text.splitlines():
+        heading = re.match(r"\s*(?:#{1,6}\s+|\*\*)(.+?)(?:\*\*)?\s*$", line)
+        if heading and re.search(r"\w", heading.group(1)):
+            return " ".join(heading.group(1).split()[:max_words])
+
+    words = re.findall(r"[A-Za-z][A-Za-z0-9'+#-]*", text)
+    scores = Counter()
+    first_seen = {}
+    for position, word in enumerate(words):
+        key = word.lower()
+        if len(key) < 3 or key in STOPWORDS:
+            continue
+        scores[key] += 1 + 1 / (1 + position / 50)
+        first_seen.setdefault(key, (position, word))
+    best = sorted(scores, key=scores.get, reverse=True)[:max_words]
+    ordered = sorted(best, key=lambda k: first_seen[k][0])
+    return " ".join(w if w.isupper() else w.capitalize() for w in (first_seen[k][1] for k in ordered))
+
+
+async def generate_note(client, prompt, model, title_mode="json", on_token=None, contexts=None, options=None):
+    """
+    Gets a completion and a note title.
+      json:  one request with structured output holding both the response and the title
+             (falls back to make_title if the model returns no usable title)
+      local: one request; the title is built locally with make_title
+      llm:   the original flow, a second request asking for a title using the returned context
+    :param contexts: Optional prompt_contexts.PromptContextCache; a prompt starting with one of
+                     its instructions is sent as the rest of the text plus the instruction's context.
+    :param options: Ollama sampling options for every request (a fixed seed makes the note cacheable).
+    :return: Tuple of (response text, raw title, seconds taken).
+    """
+    start = time.perf_counter()
+    fields = {}
+    if contexts is not None:
+        prompt, fields = await contexts.prepare(client, model, prompt)
+    if options:
+        fields['options'] = options
+    if title_mode == "json":
+        streamer = JsonFieldStreamer('response', on_token) if on_token is not None else None
+        feed = streamer.feed if streamer is not None else None
+        try:
+            result = await client.generate(prompt + JSON_INSTRUCTION, model, on_token=feed, format=RESPONSE_SCHEMA, **fields)
+        except OllamaError as e:
+            if e.status != 400:
+                raise
+            # Ollama before 0.5 only accepts format="json"
+            result = await client.generate(prompt + JSON_INSTRUCTION, model, on_token=feed, format="json", **fields)
+        response, title = parse_titled_response(result['response'])
+        if response is None:
+            response = result['response']
+        if not title or not str(title).strip():
+            title = make_title(response)
+        return response, str(title), time.perf_counter() - start
+
+    result = await client.generate(prompt, model, on_token=on_token, **fields)
+    response = result['response']
+    if title_mode == "local":
+        return response, make_title(response), time.perf_counter() - start
+
+    result = await client.generate(TITLE_PROMPT, model, context=result.get('context', ''),
+                                   **({'options': options} if options else {}))
+    return response, result['response'], time.perf_counter() - start
+
+
+async def _measure(api_url, model, prompts):
+    async with AsyncOllamaClient(api_url) as client:
+        for mode in TITLE_MODES:
+            total = 0.0
+            for prompt in prompts:
+                _, title, seconds = await generate_note(client, prompt, model, title_mode=mode)
+                total += seconds
+            print(f"{mode:>5}: {total / len(prompts):.3f}s per note (last title: {title!r})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-note latency of each title mode.")
+    parser.add_argument("--api-url", help="Ollama generate endpoint (default: a local stub server).")
+    parser.add_argument("--model", default="deepseek-coder-v2:16b")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    api_url = args.api_url
+    if api_url is None:
+        from ollama_stub import start_stub_server
+        api_url = start_stub_server().api_url
+    prompts = [f"Please summarize the following text:\n\nNote {i}: remember to book the venue, email the caterer "
+               f"and draft the agenda for the planning meeting." for i in range(args.runs)]
+    asyncio.run(_measure(api_url, args.model, prompts))
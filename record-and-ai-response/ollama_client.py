@@ -0,0 +1,191 @@
+import asyncio
+import json
+import random
+import sys
+import time
+
+from completion_cache import is_deterministic, make_key
+from lazy_imports import lazy_import
+
+# Imported on first use so scripts start capturing audio before the HTTP stack loads
+aiohttp = lazy_import("aiohttp")
+
+DEFAULT_API_URL = "http://localhost:11434/api/generate"
+
+# Statuses worth retrying: Ollama busy/restarting or a proxy in front of it hiccuping
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class OllamaError(Exception):
+    def __init__(self, status, text):
+        super().__init__(f"{status}, {text}")
+        self.status = status
+        self.text = text
+
+
+class _Retry(Exception):
+    # Wraps a retryable OllamaError so it shares the retry path with connection errors
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class AsyncOllamaClient:
+    """
+    asyncio client for Ollama's /api/generate with a keep-alive connection pool,
+    a cap on in-flight requests, timeouts and retry with exponential backoff.
+    Streaming responses (NDJSON) are parsed line by line as they arrive.
+
+    Usage:
+        async with AsyncOllamaClient(api_url) as client:
+            result = await client.generate(prompt, model, on_token=print)
+    """
+
+    def __init__(self, api_url=DEFAULT_API_URL, max_connections=4, max_concurrency=2, timeout=600,
+                 connect_timeout=5, read_timeout=120, retries=3, backoff=0.5, cache=None):
+        """
+        :param api_url: URL of the Ollama generate endpoint.
+        :param max_connections: Size of the keep-alive connection pool.
+        :param max_concurrency: Requests allowed in flight at once (Ollama queues the rest anyway).
+        :param timeout: Overall limit in seconds for one request, including streaming.
+        :param connect_timeout: Limit in seconds for opening a connection.
+        :param read_timeout: Limit in seconds between two chunks of a streamed response.
+        :param retries: Extra attempts for connection errors and retryable statuses.
+        :param backoff: Base delay in seconds, doubled after every failed attempt.
+        :param cache: Optional CompletionCache consulted by generate().
+        """
+        self.api_url = api_url
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def model_digest(self, model):
+        """
+        :return: Digest of the installed model from /api/tags (changes when the model is
+                 pulled again), or None if the server doesn't report it.
+        """
+        await self.open()
+        url = self.api_url.rsplit("/api/", 1)[0] + "/api/tags"
+        try:
+            async with self._session.get(url) as response:
+                if response.status != 200:
+                    return None
+                models = (await response.json()).get('models', [])
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+        for entry in models:
+            if model in (entry.get('name'), entry.get('model')) or entry.get('name') == f"{model}:latest":
+                return entry.get('digest')
+        return None
+
+    async def stream(self, prompt, model, **fields):
+        """
+        Yields each NDJSON object of a streamed generation as soon as its line is complete.
+        Connection failures are retried only until the first chunk arrives, so tokens are never repeated.
+        :param prompt: Prompt text.
+        :param model: Ollama model name.
+        :param fields: Extra request fields (context, options, format, system, ...).
+        """
+        await self.open()
+        payload = {'prompt': prompt, 'model': model, 'stream': True, **fields}
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                received = False
+                try:
+                    async with self._session.post(self.api_url, json=payload) as response:
+                        if response.status != 200:
+                            text = await response.text()
+                            if response.status in RETRY_STATUSES and attempt < self.retries:
+                                raise _Retry(OllamaError(response.status, text))
+                            raise OllamaError(response.status, text)
+
+                        buffer = b""
+                        async for data in response.content.iter_any():
+                            buffer += data
+                            *lines, buffer = buffer.split(b"\n")
+                            for line in lines:
+                                if line.strip():
+                                    chunk = json.loads(line)
+                                    if 'error' in chunk:
+                                        raise OllamaError(response.status, chunk['error'])
+                                    received = True
+                                    yield chunk
+                        if buffer.strip():
+                            received = True
+                            yield json.loads(buffer)
+                    return
+                except (_Retry, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                    if received or attempt >= self.retries:
+                        raise e.error if isinstance(e, _Retry) else e
+                    delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                    attempt += 1
+                    print(f"Ollama request failed ({e}), retrying in {delay:.1f}s ({attempt}/{self.retries})",
+                          file=sys.stderr)
+                    await asyncio.sleep(delay)
+
+    async def generate(self, prompt, model, on_token=None, use_cache=True, **fields):
+        """
+        Runs a streamed generation and collects it.
+        :param on_token: Optional callback receiving each piece of response text as it arrives.
+        :param use_cache: Set False to skip the client's cache (e.g. when sampling variety is wanted).
+                          Only requests with a fixed seed or temperature 0 are cached (see
+                          completion_cache.is_deterministic).
+        :return: The final chunk (stats, context, ...) with 'response' set to the full text
+                 and 'first_token_seconds' to the time until the first token. Cache hits also
+                 carry 'cached': True.
+        """
+        key = None
+        if self.cache is not None and use_cache and is_deterministic(fields.get('options')):
+            key = make_key("ollama", model, prompt, **fields)
+            cached = self.cache.get(key)
+            if cached is not None:
+                if on_token is not None and cached['response']:
+                    on_token(cached['response'])
+                return dict(cached, first_token_seconds=0.0, cached=True)
+
+        start = time.perf_counter()
+        first_token = None
+        pieces = []
+        final = {}
+        async for chunk in self.stream(prompt, model, **fields):
+            piece = chunk.get('response', '')
+            if piece:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                pieces.append(piece)
+                if on_token is not None:
+                    on_token(piece)
+            if chunk.get('done'):
+                final = chunk
+        final = dict(final)
+        final['response'] = "".join(pieces)
+        if key is not None and final.get('done'):
+            self.cache.put(key, final)
+        final['first_token_seconds'] = first_token
+        return final
+
+
+def print_token(piece):
+    print(piece, end="", flush=True)
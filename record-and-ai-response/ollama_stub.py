@@ -0,0 +1,157 @@
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    """
+    Mimics Ollama's POST /api/generate closely enough for local runs and benchmarks:
+    NDJSON streaming over chunked HTTP/1.1 keep-alive, non-streaming JSON, context
+    arrays and the prompt/eval timing fields. GET /api/tags lists server.models, all
+    with server.model_digest.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/api/tags":
+            self._send_json(404, {'error': f"stub: unknown path {self.path}"})
+            return
+        self._send_json(200, {'models': [{'name': name, 'model': name, 'digest': self.server.model_digest}
+                                         for name in self.server.models]})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests.append(payload)
+            fail = self.server.fail_next > 0
+            if fail:
+                self.server.fail_next -= 1
+        if fail:
+            self._send_json(503, {'error': "stub: service unavailable"})
+            return
+        if self.path != "/api/generate":
+            self._send_json(404, {'error': f"stub: unknown path {self.path}"})
+            return
+
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            self._generate(payload)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _generate(self, payload):
+        prompt = payload.get('prompt', '')
+        context = list(payload.get('context') or [])
+        prompt_tokens = prompt.split()
+        # Only the new prompt tokens are evaluated; the context is already processed
+        prompt_eval_seconds = len(prompt_tokens) * self.server.prompt_token_delay
+        time.sleep(prompt_eval_seconds)
+
+        text = self.server.respond(payload)
+        pieces = [piece + " " for piece in text.split(" ")]
+        pieces[-1] = pieces[-1].rstrip()
+        new_context = context + [zlib.crc32(t.encode()) % 32000 for t in prompt_tokens + text.split()]
+        final = {
+            'model': payload.get('model', ''),
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            'done': True,
+            'done_reason': "stop",
+            'context': new_context,
+            'prompt_eval_count': len(prompt_tokens),
+            'prompt_eval_duration': int(prompt_eval_seconds * 1e9),
+            'eval_count': len(pieces),
+            'eval_duration': int(len(pieces) * self.server.token_delay * 1e9),
+        }
+
+        if not payload.get('stream', True):
+            time.sleep(len(pieces) * self.server.token_delay)
+            self._send_json(200, dict(final, response=text))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', "application/x-ndjson")
+        self.send_header('Transfer-Encoding', "chunked")
+        self.end_headers()
+        for piece in pieces:
+            time.sleep(self.server.token_delay)
+            self._write_chunk({'model': final['model'], 'created_at': final['created_at'], 'response': piece, 'done': False})
+        self._write_chunk(dict(final, response=""))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def default_response(payload):
+    words = payload.get('prompt', '').split()
+    text = "Stub response to: " + " ".join(words[:12])
+    if payload.get('format'):
+        return json.dumps({'response': text, 'title': "Stub " + " ".join(words[:3])})
+    return text
+
+
+def start_stub_server(port=0, token_delay=0.01, prompt_token_delay=0.0005, respond=default_response):
+    """
+    Starts a stub Ollama server on a background thread.
+    :param port: Port to listen on (0 picks a free one).
+    :param token_delay: Seconds per generated token.
+    :param prompt_token_delay: Seconds per prompt token evaluated.
+    :param respond: Callable(payload) -> response text.
+    :return: The server; its api_url attribute is the generate endpoint. Call shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), OllamaStubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = []
+    server.fail_next = 0  # Set to make the next N requests fail with 503
+    server.in_flight = 0
+    server.max_in_flight = 0  # Most generate requests handled at once
+    server.token_delay = token_delay
+    server.prompt_token_delay = prompt_token_delay
+    server.respond = respond
+    server.models = ["stub", "deepseek-coder-v2:16b"]  # Listed by /api/tags; generate accepts any name
+    server.model_digest = "sha256:stub"  # Change to simulate pulling a new version of the model
+    server.api_url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    threading.Thread(target=server.serve_forever, name="ollama-stub", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stub Ollama /api/generate server.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+    server = start_stub_server(port=args.port, token_delay=args.token_delay)
+    print(f"Stub Ollama listening on {server.api_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import time
+
+from completion_cache import CompletionCache, make_key
+from ollama_client import AsyncOllamaClient
+
+# Sent with an instruction when warming it, so the model acknowledges instead of answering
+WARM_SUFFIX = "\n\nThe text is in my next message. Reply only with OK."
+WARM_OPTIONS = {'num_predict': 8, 'temperature': 0}
+# Seconds a model's digest is trusted before /api/tags is asked again
+DIGEST_TTL = 30.0
+
+
+class PromptContextCache:
+    """
+    Ollama context arrays for fixed instruction prefixes, so a prompt that starts with
+    one only has its remaining text (the transcript) processed by the model.
+
+    The first time an instruction is used with a model it is sent once on its own and
+    the returned context is kept: in memory, and in the completion cache when one is
+    given, so later runs skip the warm-up too. Entries are keyed by model name, the
+    model's digest, the instruction text and WARM_SUFFIX, so pulling a new version of a
+    model or editing a template starts a fresh context instead of reusing a stale one.
+    The digest is looked up again once it is digest_ttl seconds old, so a long-running
+    pipeline notices a model pulled while it runs.
+    """
+
+    def __init__(self, instructions, cache=None, digest_ttl=DIGEST_TTL):
+        """
+        :param instructions: Instruction prefixes worth warming (e.g. one per action).
+        :param cache: Optional CompletionCache to persist contexts in.
+        :param digest_ttl: Seconds before a model's digest is fetched again (0 checks on every prompt).
+        """
+        # Longest first, so an instruction that extends another one wins
+        self.instructions = sorted((i for i in instructions if i), key=len, reverse=True)
+        self.cache = cache
+        self._contexts = {}
+        self._locks = {}
+        self.digest_ttl = digest_ttl
+        self._digests = {}  # model -> (digest, monotonic time fetched)
+        self.warmed = 0
+        self.reused = 0
+
+    def split(self, prompt):
+        """
+        :return: (instruction, rest) for a prompt starting with a known instruction, otherwise (None, prompt).
+        """
+        for instruction in self.instructions:
+            if prompt.startswith(instruction):
+                return instruction, prompt[len(instruction):]
+        return None, prompt
+
+    async def _digest(self, client, model):
+        digest, fetched = self._digests.get(model, (None, None))
+        if fetched is None or time.monotonic() - fetched >= self.digest_ttl:
+            digest = await client.model_digest(model)
+            self._digests[model] = (digest, time.monotonic())
+        return digest
+
+    async def _key(self, client, model, instruction):
+        digest = await self._digest(client, model)
+        return make_key("ollama-prefill", model, instruction.rstrip() + WARM_SUFFIX, digest=digest)
+
+    async def context_for(self, client, model, instruction):
+        """
+        :return: The context array after the instruction, warming it on first use; None if
+                 the server returned no context.
+        """
+        key = await self._key(client, model, instruction)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        # Concurrent notes with the same action wait for one warm-up instead of each sending it
+        async with lock:
+            context = self._contexts.get(key)
+            if context is None and self.cache is not None:
+                context = self.cache.get(key)
+            if context is not None:
+                self.reused += 1
+            else:
+                result = await client.generate(instruction.rstrip() + WARM_SUFFIX, model, use_cache=False, options=WARM_OPTIONS)
+                context = result.get('context')
+                if not context:
+                    return None
+                self.warmed += 1
+                if self.cache is not None:
+                    self.cache.put(key, context)
+            self._contexts[key] = context
+            return context
+
+    async def prepare(self, client, model, prompt):
+        """
+        :return: (prompt to send, request fields): the text after a known instruction with
+                 the instruction's context, or the prompt unchanged with no extra fields.
+        """
+        instruction, rest = self.split(prompt)
+        if instruction is None:
+            return prompt, {}
+        context = await self.context_for(client, model, instruction)
+        if context is None:
+            return prompt, {}
+        return rest, {'context': context}
+
+
+def _benchmark(notes, instruction_words, transcript_words, prompt_token_delay):
+    # Prompt processing per request with and without a prefilled instruction, on the stub server
+    from ollama_stub import start_stub_server
+
+    instruction = "Please summarize the following text, " + " ".join(f"rule{i}" for i in range(instruction_words)) + ":\n\n"
+    transcripts = [" ".join(f"note{n}word{i}" for i in range(transcript_words)) for n in range(notes)]
+    server = start_stub_server(token_delay=0.0005, prompt_token_delay=prompt_token_delay)
+
+    async def run(contexts):
+        evaluated, seconds = [], 0.0
+        async with AsyncOllamaClient(server.api_url) as client:
+            start = time.perf_counter()
+            for transcript in transcripts:
+                prompt, fields = instruction + transcript, {}
+                if contexts is not None:
+                    prompt, fields = await contexts.prepare(client, "stub", prompt)
+                result = await client.generate(prompt, "stub", use_cache=False, **fields)
+                evaluated.append(result['prompt_eval_duration'] / 1e9)
+            seconds = time.perf_counter() - start
+        return evaluated, seconds
+
+    plain, plain_seconds = asyncio.run(run(None))
+    store = CompletionCache(":memory:")
+    contexts = PromptContextCache([instruction], cache=store)
+    prefilled, prefilled_seconds = asyncio.run(run(contexts))
+
+    # A later run reuses the stored context; a changed model digest or template warms a new one
+    async def warm_ups(instructions):
+        later = PromptContextCache(instructions, cache=store)
+        async with AsyncOllamaClient(server.api_url) as client:
+            await later.prepare(client, "stub", instructions[0] + "text")
+        return later.warmed
+    next_run = asyncio.run(warm_ups([instruction]))
+    edited = asyncio.run(warm_ups([instruction.replace("summarize", "condense")]))
+    server.model_digest = "sha256:updated-model"
+    pulled = asyncio.run(warm_ups([instruction]))
+    server.shutdown()
+
+    saved = (sum(plain) - sum(prefilled)) / notes
+    print(f"{notes} notes, {instruction_words + 5}-word instruction, {transcript_words}-word transcripts")
+    print(f"full prompt:       prompt eval {1000 * sum(plain) / notes:7.2f} ms/request, total {plain_seconds:.2f}s")
+    print(f"prefilled context: prompt eval {1000 * sum(prefilled) / notes:7.2f} ms/request "
+          f"plus one warm-up, total {prefilled_seconds:.2f}s ({contexts.warmed} warmed, {contexts.reused} reused)")
+    print(f"saved {1000 * saved:.2f} ms of prompt processing per request")
+    print(f"warm-ups: next run {next_run}, edited template {edited}, updated model {pulled}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure prompt processing saved by prefilled instruction contexts, "
+                                                 "against a local Ollama stub.")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--instruction-words", type=int, default=200)
+    parser.add_argument("--transcript-words", type=int, default=60)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.002, help="Stub seconds per prompt token.")
+    args = parser.parse_args()
+    _benchmark(args.notes, args.instruction_words, args.transcript_words, args.prompt_token_delay)
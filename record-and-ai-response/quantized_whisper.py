@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import time
+
+from lazy_imports import lazy_import
+
+torch = lazy_import("torch")
+whisper = lazy_import("whisper")
+
+# Appending this to a model name (e.g. "small.int8") selects the quantized CPU backend
+QUANTIZED_SUFFIX = ".int8"
+# Quantized models are cached here, overridable with WHISPER_INT8_CACHE
+CACHE_DIR = os.environ.get("WHISPER_INT8_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ai-tests", "whisper-int8"))
+# Fastest thread count per model, as measured by the benchmark below
+THREADS_PATH = os.path.join(CACHE_DIR, "threads.json")
+
+_threads_chosen = False
+
+
+def is_quantized(name):
+    return name.endswith(QUANTIZED_SUFFIX)
+
+
+def base_name(name):
+    return name[:-len(QUANTIZED_SUFFIX)] if is_quantized(name) else name
+
+
+def tuned_threads(name):
+    """
+    :return: The fastest thread count recorded for the model by the benchmark, or None.
+    """
+    try:
+        with open(THREADS_PATH) as f:
+            return json.load(f).get(base_name(name), {}).get('threads')
+    except (OSError, ValueError):
+        return None
+
+
+def record_tuned_threads(name, threads, seconds):
+    """
+    Stores the benchmark's fastest thread count for the model, used by tune_threads from then on.
+    :param seconds: Measured seconds per thread count, kept alongside for reference.
+    """
+    try:
+        with open(THREADS_PATH) as f:
+            tuned = json.load(f)
+    except (OSError, ValueError):
+        tuned = {}
+    tuned[base_name(name)] = {'threads': threads, 'cpu_count': os.cpu_count(), 'torch': torch.__version__,
+                              'seconds': {str(n): round(s, 3) for n, s in seconds.items()}}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporary = f"{THREADS_PATH}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(tuned, f, indent=2)
+    os.replace(temporary, THREADS_PATH)
+
+
+def tune_threads(threads=None, name=None):
+    """
+    Sets torch's intra-op threads to threads, else WHISPER_THREADS, else the count the
+    benchmark measured as fastest for the model (see tuned_threads). Once a count has been
+    given explicitly (e.g. by a process-pool worker), later calls without one keep it.
+    Without any of these torch keeps its default.
+    """
+    global _threads_chosen
+    if threads:
+        _threads_chosen = True
+    elif _threads_chosen:
+        return
+    threads = threads or int(os.environ.get("WHISPER_THREADS", 0)) or (tuned_threads(name) if name else None)
+    if threads:
+        torch.set_num_threads(threads)
+
+
+def cache_path(name):
+    # Pickled modules depend on the whisper and torch versions that built them
+    return os.path.join(CACHE_DIR, f"{base_name(name)}-whisper{whisper.__version__}-torch{torch.__version__}.pt")
+
+
+def quantize(model):
+    """
+    Dynamic int8 quantization of every linear layer (attention projections, MLPs):
+    weights are stored as int8 and activations quantized on the fly.
+    :param model: Float32 Whisper model on the CPU.
+    :return: The quantized model.
+    """
+    # whisper.model.Linear only adds a dtype cast for fp16; as plain nn.Linear it matches the quantization mapping
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized(name, threads=None):
+    """
+    Loads an int8 model from the on-disk cache, quantizing and caching it on first use.
+    :param name: Model name, with or without the .int8 suffix.
+    :param threads: Torch threads to use (see tune_threads).
+    :return: The quantized model, on the CPU.
+    """
+    tune_threads(threads, name)
+    path = cache_path(name)
+    if os.path.exists(path):
+        try:
+            return torch.load(path, map_location="cpu", weights_only=False).eval()
+        except Exception as e:
+            print(f"Ignoring unreadable quantized model cache {path}: {e}")
+
+    start = time.perf_counter()
+    model = quantize(whisper.load_model(base_name(name), device="cpu")).eval()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    torch.save(model, temporary)
+    os.replace(temporary, path)
+    print(f"Quantized Whisper model '{base_name(name)}' to int8 in {time.perf_counter() - start:.2f}s, cached at {path}")
+    return model
+
+
+def thread_counts():
+    """
+    :return: Thread counts worth trying: powers of two up to the CPU count, plus torch's default and the CPU count.
+    """
+    cpus = os.cpu_count() or 1
+    counts = {torch.get_num_threads(), cpus}
+    n = 1
+    while n < cpus:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def _time(model, clips, repeat):
+    import numpy as np
+
+    model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False)  # Warm up
+    elapsed = []
+    texts = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = [model.transcribe(audio, fp16=False)['text'].strip() for _, audio in clips]
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed), texts
+
+
+def _benchmark(models, wavs, references, repeat):
+    import alignment
+    import whisper_models
+    from audio_capture import read_wav, resample_poly
+
+    clips = []
+    for path in wavs:
+        samples, rate = read_wav(path)
+        clips.append((os.path.basename(path), resample_poly(samples, rate)))
+    seconds = sum(audio.size for _, audio in clips) / 16000
+    print(f"{len(clips)} clips, {seconds:.1f}s of audio, {torch.get_num_threads()} torch threads")
+
+    default_threads = torch.get_num_threads()
+    for name in models:
+        base_seconds, base_texts = _time(whisper_models.get_model(name), clips, repeat)
+
+        # Sweep the int8 model's thread counts and keep the fastest as its default from now on
+        model = whisper_models.get_model(name + QUANTIZED_SUFFIX)
+        sweep = {}
+        for threads in thread_counts():
+            torch.set_num_threads(threads)
+            sweep[threads] = _time(model, clips, repeat)
+        torch.set_num_threads(default_threads)
+        best = min(sweep, key=lambda threads: sweep[threads][0])
+        int8_seconds, int8_texts = sweep[best]
+        record_tuned_threads(name, best, {threads: result[0] for threads, result in sweep.items()})
+
+        print(f"\n{name}: float32 {base_seconds:.2f}s (RTF {base_seconds / seconds:.3f}, {default_threads} threads), "
+              f"int8 {int8_seconds:.2f}s (RTF {int8_seconds / seconds:.3f}, {best} threads), "
+              f"speedup {base_seconds / int8_seconds:.2f}x")
+        print("  int8 threads: " + ", ".join(f"{threads}: {result[0]:.2f}s" for threads, result in sweep.items())
+              + f"; {best} recorded in {THREADS_PATH}")
+        for (clip, _), reference, base_text, int8_text in zip(clips, references, base_texts, int8_texts):
+            agreement = alignment.word_alignment(base_text, int8_text).error_rate
+            line = f"  {clip}: int8 vs float32 WER {agreement:.3f}"
+            if reference:
+                line += (f", WER vs script: float32 {alignment.word_alignment(reference, base_text).error_rate:.3f} "
+                         f"int8 {alignment.word_alignment(reference, int8_text).error_rate:.3f}")
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare speed and WER of int8 quantized Whisper against float32.")
+    parser.add_argument("wav", nargs="*", help="WAV files (default: the repo's test recordings).")
+    parser.add_argument("--models", nargs="+", default=["base", "small"])
+    parser.add_argument("--script", action="append", default=[],
+                        help="Reference text for the WAV at the same position (repeat per file); "
+                             "without it only agreement with float32 is reported.")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = args.wav or [os.path.join(root, "test_audio.wav"), os.path.join(root, "test_audio_manual.wav")]
+    scripts = args.script + [None] * (len(paths) - len(args.script))
+    tune_threads()
+    _benchmark(args.models, paths, scripts, args.repeat)
@@ -1,16 +1,32 @@
+# Imported first so startup is timed from here (see lazy_imports)
+import lazy_imports
 import os
-import whisper
+import time
+import whisper_models
+import tracing
+import note_store
 import pyaudio
 import wave
+import threading
+import numpy as np
 from datetime import datetime
+from audio_capture import pcm16_to_float, resample_poly, WHISPER_SAMPLE_RATE
+from transcription_cache import audio_digest
+
+IMPORT_SECONDS = lazy_imports.since_start()
 
 # Constants
 ACTIONS = ["summarize", "todo", "interrogate", "prototype"]
 RECORD_SECONDS = 10
 WAVE_OUTPUT_FILENAME = "recording.wav"
+ARCHIVE_RECORDING = True  # Also keep a copy of each recording as WAVE_OUTPUT_FILENAME
 
 # Function to record audio
 def record_audio():
+    """
+    Records RECORD_SECONDS of audio into memory.
+    :return: Tuple of (int16 numpy array of samples, sample rate).
+    """
     chunk = 1024  # Record in chunks of 1024 samples
     sample_format = pyaudio.paInt16  # 16 bits per sample
     channels = 1
@@ -23,12 +39,17 @@ def record_audio():
                     rate=fs,
                     frames_per_buffer=chunk,
                     input=True)
-    frames = []  # Initialize array to store frames
 
-    # Store data in chunks for RECORD_SECONDS seconds
-    for i in range(0, int(fs / chunk * RECORD_SECONDS)):
+    # Preallocate the whole recording and read each chunk straight into it
+    n_chunks = int(fs / chunk * RECORD_SECONDS)
+    samples = np.empty(n_chunks * chunk, dtype=np.int16)
+    for i in range(n_chunks):
         data = stream.read(chunk)
-        frames.append(data)
+        samples[i * chunk:(i + 1) * chunk] = np.frombuffer(data, dtype=np.int16)
+        if i == 0:
+            startup = lazy_imports.first_sample(time.perf_counter())
+            if startup is not None:
+                tracing.event("startup.first_sample", startup)
 
     # Stop and close the stream
     stream.stop_stream()
@@ -36,19 +57,36 @@ def record_audio():
     p.terminate()
 
     print("Finished recording.")
-
-    # Save the recorded data as a WAV file
-    wf = wave.open(WAVE_OUTPUT_FILENAME, 'wb')
-    wf.setnchannels(channels)
-    wf.setsampwidth(p.get_sample_size(sample_format))
-    wf.setframerate(fs)
-    wf.writeframes(b''.join(frames))
-    wf.close()
+    return samples, fs
+
+def archive_recording(samples, fs, filename=WAVE_OUTPUT_FILENAME):
+    """
+    Saves the recorded data as a WAV file on a background thread, off the transcription path.
+    :return: The writer thread (join it before exiting).
+    """
+    def write():
+        wf = wave.open(filename, 'wb')
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(fs)
+        wf.writeframes(samples.tobytes())
+        wf.close()
+
+    thread = threading.Thread(target=write, name="wav-archive")
+    thread.start()
+    return thread
+
+def prepare_audio(samples, fs):
+    """
+    Converts int16 samples to the 16 kHz float32 array Whisper takes directly,
+    so transcription needs neither a WAV file nor an ffmpeg subprocess.
+    """
+    return resample_poly(pcm16_to_float(samples), fs, WHISPER_SAMPLE_RATE)
 
 # Function to transcribe audio using Whisper
-def transcribe_audio(model):
+def transcribe_audio(model, audio):
     print("Transcribing audio...")
-    result = model.transcribe(WAVE_OUTPUT_FILENAME)
+    result = model.transcribe(audio)
     transcript = result["text"]
     print(f"Transcript: {transcript}")
     return transcript
@@ -74,7 +112,12 @@ def generate_prompt(transcript, action):
     return None
 
 # Save transcript and response
-def save_transcript_and_response(transcript, response, action):
+def save_transcript_and_response(transcript, response, action, prompt=None, audio_hash=None, timings=None):
+    # Also recorded in the searchable note store (see note_store)
+    store = note_store.get_store()
+    if store is not None:
+        store.add(transcript, response, action=action, prompt=prompt, audio_hash=audio_hash, timings=timings,
+                  source="record-and-ai-respond-a")
     timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
     filename = f"transcript_{timestamp}.txt"
     with open(filename, "w") as file:
@@ -89,31 +132,50 @@ def get_response_from_llm(prompt):
 
 # Main function
 def main():
-    # Load Whisper model
-    model = whisper.load_model("base")
-
-    # Step 1: Record audio
-    record_audio()
-
-    # Step 2: Transcribe audio
-    transcript = transcribe_audio(model)
-
-    # Step 3: Detect action from transcript
-    action = detect_action(transcript)
-    if not action:
-        print("No valid action detected in transcript.")
-        return
-    
-    # Step 4: Generate the appropriate prompt
-    prompt = generate_prompt(transcript, action)
-    print(f"Generated Prompt: {prompt}")
-
-    # Step 5: (Simulated) Send prompt to LLM and get response
-    response = get_response_from_llm(prompt)
-    print(f"Response from LLM: {response}")
-
-    # Step 6: Save transcript and response
-    save_transcript_and_response(transcript, response, action)
+    tracing.event("startup.imports", IMPORT_SECONDS)
+    # Load Whisper model in the background while recording
+    whisper_models.preload("base")
+
+    # Spans go to TRACE_FILE when it is set
+    with tracing.span("main"):
+        # Step 1: Record audio
+        with tracing.span("record_audio"):
+            samples, fs = record_audio()
+        archive = archive_recording(samples, fs) if ARCHIVE_RECORDING else None
+        with tracing.span("prepare_audio"):
+            audio = prepare_audio(samples, fs)
+        with tracing.span("load_model"):
+            model = whisper_models.get_model("base")
+
+        # Step 2: Transcribe audio
+        with tracing.span("transcribe_audio"):
+            start = time.perf_counter()
+            transcript = transcribe_audio(model, audio)
+            transcribe_seconds = time.perf_counter() - start
+
+        # Step 3: Detect action from transcript
+        with tracing.span("detect_action"):
+            action = detect_action(transcript)
+        if not action:
+            print("No valid action detected in transcript.")
+            return
+
+        # Step 4: Generate the appropriate prompt
+        prompt = generate_prompt(transcript, action)
+        print(f"Generated Prompt: {prompt}")
+
+        # Step 5: (Simulated) Send prompt to LLM and get response
+        with tracing.span("get_response_from_llm"):
+            response = get_response_from_llm(prompt)
+        print(f"Response from LLM: {response}")
+
+        # Step 6: Save transcript and response
+        with tracing.span("save_transcript_and_response"):
+            save_transcript_and_response(transcript, response, action, prompt, audio_digest(audio),
+                                         {'transcribe': round(transcribe_seconds, 3)})
+
+    if archive is not None:
+        archive.join()
 
 if __name__ == "__main__":
     main()
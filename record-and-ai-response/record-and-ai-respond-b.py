@@ -1,93 +1,121 @@
+# Imported first so startup is timed from here (see lazy_imports)
+import lazy_imports
 import sounddevice as sd
 import numpy as np
 import time
 import threading
-import keyboard
-import requests
-import json
+import asyncio
 import os
-import whisper
+import sys
+import argparse
+import functools
+import whisper_models
+import long_form
+import transcription_cache
+import tracing
+import note_store
+from ollama_client import AsyncOllamaClient, OllamaError, print_token
+from note_titles import generate_note, TITLE_MODES
+from completion_cache import get_cache
+from note_pipeline import NotePipeline
+from prompt_contexts import PromptContextCache
+from streaming_transcriber import StreamingTranscriber
+from audio_capture import AudioCapture
+from vad import VoiceActivityDetector, SPEECH_END, NO_SPEECH, NO_SPEECH_GRACE
 
-def record_audio(samplerate=16000, silence_duration=3, window_size=10, initial_threshold_multiplier=0.2):
+# Only needed once recording runs, so it loads after capture has started
+keyboard = lazy_imports.lazy_import("keyboard")
+IMPORT_SECONDS = lazy_imports.since_start()
+
+# The Todoist helpers (todoist_import) live at the repo root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+MARKDOWN_EXPORT = True  # Also write each note to the Obsidian vault as a Markdown file
+
+@tracing.traced()
+def record_audio(samplerate=16000, silence_duration=3, window_size=10, initial_threshold_multiplier=0.2, on_block=None):
     """
-    Records audio continuously, adjusting the silence threshold dynamically in real-time.
+    Records audio until the voice activity detector reports the end of speech, or until
+    silence_duration plus NO_SPEECH_GRACE seconds pass without any speech.
     :param samplerate: The sample rate for audio recording (default: 16000).
     :param silence_duration: The duration (in seconds) of silence after which recording stops.
     :param window_size: The number of seconds of audio to consider for calculating the noise level.
-    :param initial_threshold_multiplier: Multiplier for setting the initial silence threshold based on ambient noise.
-    :return: Numpy array of the recorded audio.
+    :param initial_threshold_multiplier: Speech must also exceed this fraction of the average level over window_size.
+    :param on_block: Optional callback receiving every captured block (e.g. StreamingTranscriber.feed).
+    :return: Numpy array of the recorded audio; empty if no speech was heard.
     """
-    recording = []
-    audio_window = []  # To keep track of recent audio samples
-    is_recording = True
+    # Preallocated buffer with a rolling RMS history of the last window_size seconds
+    capture = AudioCapture(samplerate=samplerate, rms_window=window_size)
+    # Frames are scored as they arrive, so the end of speech is caught on the exact frame
+    vad = VoiceActivityDetector(samplerate=samplerate, silence_duration=silence_duration,
+                                level_ratio=initial_threshold_multiplier, level_window=window_size,
+                                no_speech_timeout=silence_duration + NO_SPEECH_GRACE)
+    end_of_speech = threading.Event()
+    heard_nothing = threading.Event()
 
     def callback(indata, frames, time, status):
-        nonlocal recording, audio_window
-        audio_window.append(np.linalg.norm(indata) * 10)
-        recording.append(indata.copy())  # Store current frame
-        
-        # Maintain the size of the window
-        if len(audio_window) > window_size * samplerate:
-            audio_window.pop(0)
+        capture.write(indata)
+        for event in vad.process(indata):
+            if event.kind == NO_SPEECH:
+                heard_nothing.set()
+            if event.kind in (SPEECH_END, NO_SPEECH):
+                end_of_speech.set()
+        if on_block is not None:
+            on_block(indata)
 
     print("Recording... Press 'q' to stop manually.")
 
-    with sd.InputStream(samplerate=samplerate, channels=1, callback=callback):
-        start_time = time.time()
-        duration_of_silence = 0
-        silence_threshold = None
-
-        while duration_of_silence < silence_duration:
+    with sd.InputStream(samplerate=samplerate, channels=1, blocksize=capture.blocksize, callback=callback):
+        # Wakes immediately on end of speech; the timeout only paces the keypress check
+        while not end_of_speech.wait(0.05):
             if keyboard.is_pressed('q'):
                 print("Recording stopped by keypress.")
-                is_recording = False
                 break
 
-            # Calculate the average noise level
-            if len(audio_window) > 0:
-                average_noise_level = np.mean(audio_window)
-                if silence_threshold is None:
-                    silence_threshold = average_noise_level * initial_threshold_multiplier
-                else:
-                    # Dynamically update the threshold based on the average noise level
-                    silence_threshold = (silence_threshold + average_noise_level * initial_threshold_multiplier) / 2
-
-            # Monitor volume and detect silence
-            if len(audio_window) > 0:
-                volume_norm = np.linalg.norm(recording[-1]) * 10
-                if volume_norm < silence_threshold:
-                    duration_of_silence += len(recording[-1]) / samplerate
-                else:
-                    duration_of_silence = 0  # Reset silence duration if sound is detected
-
-            time.sleep(0.1)  # Small delay to avoid high CPU usage
-
+    startup = lazy_imports.first_sample(capture.first_sample_at)
+    if startup is not None:
+        tracing.event("startup.first_sample", startup)
+    if heard_nothing.is_set():
+        print("No speech detected, recording stopped.")
+        return np.zeros(0, dtype=np.float32)
     print("Recording complete.")
-    return np.concatenate(recording).flatten()
+    return capture.audio()
 
-def transcribe_audio_with_whisper(audio, model_name="base"):
+@tracing.traced()
+def transcribe_audio_with_whisper(audio, model_name="base", workers=long_form.DEFAULT_WORKERS):
     """
     Transcribes audio using Whisper.
     :param audio: The audio data as a numpy array.
-    :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large').
+    :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large'; 'small.int8' for the int8 CPU backend).
+    :param workers: Worker processes for long recordings; above 1, long audio is split at pauses and transcribed in parallel.
     :return: The transcript of the audio.
     """
-    # Load Whisper model
-    model = whisper.load_model(model_name)
-    
-    # # Save numpy audio array to a temporary WAV file
-    # temp_wav_path = "temp_audio.wav"
-    # whisper.utils.save_audio(temp_wav_path, audio)
-
-    # Transcribe audio
-    result = model.transcribe(audio, fp16=False)
-    
-    # # Clean up temporary file
-    # os.remove(temp_wav_path)
-    
-    return result['text'].strip()
+    # Repeat runs over the same audio come from the transcript cache
+    return transcription_cache.transcribe(audio, model_name=model_name, workers=workers)['text']
+
+def record_and_transcribe_streaming(model_name="base", **record_kwargs):
+    """
+    Records audio while transcribing it segment by segment, so the transcript is
+    mostly done by the time the speaker stops.
+    :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large'; 'small.int8' for the int8 CPU backend).
+    :param record_kwargs: Passed through to record_audio.
+    :return: Tuple of (recorded audio, transcript).
+    """
+    # Segments at the pauses of the same detector settings record_audio ends the recording with
+    transcriber = StreamingTranscriber(model_name=model_name, samplerate=record_kwargs.get('samplerate', 16000),
+                                       level_ratio=record_kwargs.get('initial_threshold_multiplier', 0.2),
+                                       level_window=record_kwargs.get('window_size', 10))
+    transcriber.start()
+    audio = record_audio(on_block=transcriber.feed, **record_kwargs)
+    end_of_speech = time.perf_counter()
+    transcript = transcriber.finish()
+    print(f"Transcript ready {time.perf_counter() - end_of_speech:.2f}s after recording stopped.")
+    return audio, transcript
 
 # Function to detect action based on keywords
+@tracing.traced()
 def detect_action(transcript):
     actions = {
         'summarize': 'summarize',
@@ -100,64 +128,162 @@ def detect_action(transcript):
             return action
     return 'none'
 
+# Fixed instruction put in front of the transcript for each action
+ACTION_INSTRUCTIONS = {
+    'summarize': "Please summarize the following text:\n\n",
+    'make_todo': "The following is a list of todo items I have to complete by the end of next week, can you create a plan to tackle them including what to do what days and when relevant, what steps I should complete as part of each task?\n\n",
+    'interrogate': "Ask detailed questions about the following idea to gain more insights:\n\n",
+    'prototype': "Outline the steps to start the following idea, including code examples in the mentioned languages:\n\n",
+}
+
 # Function to generate prompt based on action
 def generate_prompt(action, transcript):
-    if action == 'summarize':
-        return f"Please summarize the following text:\n\n{transcript}"
-    elif action == 'make_todo':
-        return '''The following is a list of todo items I have to complete by the end of next week, can you create a plan to tackle them including what to do what days and when relevant, what steps I should complete as part of each task?\n\n{transcript}'''
-    elif action == 'interrogate':
-        return f"Ask detailed questions about the following idea to gain more insights:\n\n{transcript}"
-    elif action == 'prototype':
-        return f"Outline the steps to start the following idea, including code examples in the mentioned languages:\n\n{transcript}"
-    else:
-        return transcript
+    return ACTION_INSTRUCTIONS.get(action, "") + transcript
 
-def transcribe_and_process_audio(audio, ollama_api_url):
+def transcribe_and_process_audio(audio, ollama_api_url, transcript=None, title_mode="json", use_cache=True, model_name="base",
+                                 push_todos=False, prefill=True, seed=None):
     """
     Sends the audio data to Whisper for transcription and then sends the transcript to the Ollama API for processing.
     :param audio: The audio data as a numpy array.
     :param ollama_api_url: URL of the local Ollama API.
+    :param transcript: Transcript produced while recording (streaming mode); skips transcription when given.
+    :param title_mode: How the note title is produced, see note_titles.generate_note.
+    :param use_cache: Reuse cached completions for a prompt that was already processed.
+    :param model_name: The Whisper model to use.
+    :param push_todos: Also create the tasks of a make_todo plan in Todoist.
+    :param prefill: Reuse the processed action instruction, see process_transcript.
+    :param seed: Sample with this seed, see process_transcript.
     """
-    transcript = transcribe_audio_with_whisper(audio)
+    if transcript is None and (audio is None or len(audio) == 0):
+        return
+    timings = {}
+    if transcript is None:
+        start = time.perf_counter()
+        transcript = transcribe_audio_with_whisper(audio, model_name=model_name)
+        timings['transcribe'] = round(time.perf_counter() - start, 3)
     print(f"Transcript: {transcript}")
 
     action = detect_action(transcript)
     prompt = generate_prompt(action, transcript)
+    note = {'transcript': transcript, 'action': action, 'timings': timings,
+            'audio_hash': transcription_cache.audio_digest(audio) if audio is not None and len(audio) else None}
 
     # Now send the transcript for further processing (e.g., summarization, task creation)
-    process_transcript(prompt, ollama_api_url)
+    result = process_transcript(prompt, ollama_api_url, title_mode=title_mode, use_cache=use_cache, note=note, prefill=prefill,
+                                seed=seed)
+    if push_todos and action == 'make_todo' and result:
+        push_todo_plan(result)
+
+def push_todo_plan(plan):
+    """
+    Creates the tasks in a todo plan in Todoist, in batched sync requests (see todoist_import).
+    The API token is read from TODOIST_API_TOKEN.
+    :param plan: The model's todo plan.
+    """
+    # Only imported when tasks are pushed
+    from todoist_import import import_todo_plan
+
+    token = os.environ.get('TODOIST_API_TOKEN')
+    if not token:
+        print("Set TODOIST_API_TOKEN to push todo plans to Todoist.")
+        return
+    try:
+        result = import_todo_plan(plan, token)
+    except Exception as e:
+        print(f"Error pushing tasks to Todoist: {e}")
+        return
+    print(f"Created {sum(i is not None for i in result.ids)} Todoist tasks in {result.requests} requests")
+    for index, error in result.errors.items():
+        print(f"  Task {index} failed: {error}")
 
-def process_transcript(transcript, api_url, model="deepseek-coder-v2:16b"):
+async def process_transcript_async(transcript, client, model="deepseek-coder-v2:16b", title_mode="json", note=None,
+                                   contexts=None, options=None):
+    """
+    Streams the completion for the transcript (printing tokens as they arrive), gets a
+    note title and saves both to a Markdown file.
+    :param transcript: The transcript text.
+    :param client: An open AsyncOllamaClient.
+    :param model: Ollama model name.
+    :param title_mode: 'json' (response and title in one request), 'local' (title built from
+                       the response's keywords) or 'llm' (a second request for the title).
+    :param note: Extra fields for the note store (see save_note).
+    :param contexts: Optional PromptContextCache holding the action instructions' contexts.
+    :param options: Ollama sampling options (see note_titles.generate_note).
+    :return: The processed result, or None if the request failed.
+    """
+    try:
+        print("Processed result: ", end="", flush=True)
+        processed_result, title, seconds = await generate_note(client, transcript, model, title_mode, on_token=print_token,
+                                                               contexts=contexts, options=options)
+        print()
+    except OllamaError as e:
+        print(f"\nError: {e.status}, {e.text}")
+        return None
+    print(f"Response and title ready in {seconds:.2f}s ({title_mode} title)")
+
+    title = "".join(c for c in title if c.isalpha() or c.isdigit() or c==' ').rstrip()
+
+    note = dict(note or {})
+    note['timings'] = dict(note.get('timings') or {}, response=round(seconds, 3))
+    save_note(transcript, processed_result, title, **note)
+    return processed_result
+
+@tracing.traced()
+def process_transcript(transcript, api_url, model="deepseek-coder-v2:16b", title_mode="json", use_cache=True, note=None,
+                       prefill=True, seed=None):
     """
     Sends the transcript to the Ollama API for further processing and saves the result to a Markdown file.
     :param transcript: The transcript text.
     :param api_url: URL of the local Ollama API.
+    :param title_mode: How the note title is produced, see process_transcript_async.
+    :param use_cache: Reuse cached completions of deterministic requests (see completion_cache);
+                      False always asks the model.
+    :param note: Extra fields for the note store (see save_note).
+    :param prefill: Reuse the model's processed context of the action instruction, so only
+                    the transcript is processed (see prompt_contexts).
+    :param seed: Sample with this seed, making the answer repeatable and so cacheable. Without
+                 one the model samples freely and the answer is never cached.
+    :return: The processed result, or None if the request failed.
     """
-    # Send the transcript to Ollama for actions like summarization, task creation, etc.
-    headers = {'Content-Type': 'application/json'}
-    payload = {'prompt': transcript, 'model': model, 'stream': False}  # Example action
-    response = requests.post(api_url, headers=headers, data=json.dumps(payload))
-
-    if response.status_code == 200:
-        result = response.json()
-        processed_result = result.get('response', '')
-        print(f"Processed result: {processed_result}")
-        context = result.get('context', '')
+    async def run():
+        # One client for all requests so a title call reuses the kept-alive connection
+        cache = get_cache() if use_cache else None
+        async with AsyncOllamaClient(api_url, cache=cache) as client:
+            # Instruction contexts aren't answers, so they persist even when use_cache is off
+            contexts = PromptContextCache(ACTION_INSTRUCTIONS.values(), cache=get_cache()) if prefill else None
+            options = {'seed': seed} if seed is not None else None
+            return await process_transcript_async(transcript, client, model, title_mode, note, contexts, options)
 
-        headers = {'Content-Type': 'application/json'}
-        payload = {'prompt': "Return a title for a note containing that responses text. The title should be able to be used in a filename", 'model': model, 'stream': False, 'context': context}  # Example action
-        response = requests.post(api_url, headers=headers, data=json.dumps(payload))
+    return asyncio.run(run())
 
-        result = response.json()
-        title = result.get('response', '')
-        title = "".join(c for c in title if c.isalpha() or c.isdigit() or c==' ').rstrip()
+@tracing.traced()
+def save_note(prompt, result, title, **note):
+    """
+    Records the note in the searchable note store (see note_store) and, with MARKDOWN_EXPORT,
+    writes it to the Obsidian vault.
+    :param prompt: The prompt sent to the model.
+    :param result: The processed result.
+    :param title: Note title.
+    :param note: Other NoteStore.add fields (transcript, action, audio_hash, timings).
+    """
+    store = note_store.get_store()
+    if store is not None:
+        note.setdefault('transcript', prompt)
+        store.add(prompt=prompt, response=result, title=title, source="record-and-ai-respond-b", **note)
+    if MARKDOWN_EXPORT:
+        save_to_markdown_file(prompt, result, title)
 
-        # Save the result to a Markdown file
-        save_to_markdown_file(transcript, processed_result, title)
-    else:
-        print(f"Error: {response.status_code}, {response.text}")
+def save_pipeline_note(prompt, result, title, push_todos=False, **note):
+    """
+    save for NotePipeline: saves the note and, with push_todos, creates the tasks of a
+    make_todo plan in Todoist (see push_todo_plan).
+    :param note: Fields from the pipeline, including the action set by describe.
+    """
+    save_note(prompt, result, title, **note)
+    if push_todos and note.get('action') == 'make_todo' and result:
+        push_todo_plan(result)
 
+@tracing.traced()
 def save_to_markdown_file(transcript, result, title, directory="C:\\Users\\phant\\Documents\\Obsidian\\02 - Areas\\AI Notes"):
     """
     Saves the transcript and processed result to a Markdown file.
@@ -178,6 +304,52 @@ def save_to_markdown_file(transcript, result, title, directory="C:\\Users\\phant
     print(f"Result saved to {filename}")
 
 if __name__ == "__main__":
-    audio = record_audio(samplerate=16000, silence_duration=1.5, window_size=10, initial_threshold_multiplier=0.8)
+    parser = argparse.ArgumentParser(description="Record a voice note, transcribe it and process it with Ollama.")
+    parser.add_argument("--stream", action="store_true", help="Transcribe segments while still recording.")
+    parser.add_argument("--title-mode", choices=TITLE_MODES, default="json",
+                        help="json: response and title in one request; local: keyword title; llm: separate title request.")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the model instead of reusing cached completions.")
+    parser.add_argument("--seed", type=int,
+                        help="Sample with this seed so answers are repeatable; only seeded answers are cached.")
+    parser.add_argument("--no-prefill", action="store_true",
+                        help="Send the full action instruction with every note instead of reusing its processed context.")
+    parser.add_argument("--whisper-model", default="base",
+                        help="Whisper model (append .int8, e.g. small.int8, for the quantized CPU backend).")
+    parser.add_argument("--trace", metavar="FILE", help="Append timing spans to this JSONL file (see tracing.py).")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Keep recording notes (Ctrl+C to finish) while earlier ones are transcribed and processed.")
+    parser.add_argument("--no-markdown", action="store_true",
+                        help="Only record notes in the note store (search them with note_store.py), not as Markdown files.")
+    parser.add_argument("--todoist", action="store_true",
+                        help="Create the tasks of 'make a todo' plans in Todoist (token from TODOIST_API_TOKEN).")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable(args.trace)
+    MARKDOWN_EXPORT = not args.no_markdown
+    tracing.event("startup.imports", IMPORT_SECONDS)
+
+    # Load the model in the background while the user is speaking
+    whisper_models.preload(args.whisper_model)
+    record_kwargs = dict(samplerate=16000, silence_duration=1.5, window_size=10, initial_threshold_multiplier=0.8)
     ollama_api_url = "http://localhost:11434/api/generate"  # Replace with your Ollama API endpoint
-    transcribe_and_process_audio(audio, ollama_api_url)
+    if args.pipeline:
+        pipeline = NotePipeline(record=lambda: record_audio(**record_kwargs),
+                                transcribe=lambda audio: transcribe_audio_with_whisper(audio, model_name=args.whisper_model),
+                                make_prompt=lambda transcript: generate_prompt(detect_action(transcript), transcript),
+                                save=functools.partial(save_pipeline_note, push_todos=args.todoist),
+                                instructions=() if args.no_prefill else ACTION_INSTRUCTIONS.values(),
+                                describe=lambda audio, transcript: {'action': detect_action(transcript),
+                                                                    'audio_hash': transcription_cache.audio_digest(audio)},
+                                api_url=ollama_api_url, title_mode=args.title_mode, use_cache=not args.no_cache,
+                                seed=args.seed)
+        pipeline.run()
+    elif args.stream:
+        audio, transcript = record_and_transcribe_streaming(model_name=args.whisper_model, **record_kwargs)
+        transcribe_and_process_audio(audio, ollama_api_url, transcript=transcript, title_mode=args.title_mode, use_cache=not args.no_cache,
+                                     model_name=args.whisper_model, push_todos=args.todoist, prefill=not args.no_prefill,
+                                     seed=args.seed)
+    else:
+        audio = record_audio(**record_kwargs)
+        transcribe_and_process_audio(audio, ollama_api_url, title_mode=args.title_mode, use_cache=not args.no_cache,
+                                     model_name=args.whisper_model, push_todos=args.todoist, prefill=not args.no_prefill,
+                                     seed=args.seed)
@@ -1,13 +1,35 @@
 import openai
 
-def send_to_llm(prompt):
+from completion_cache import get_cache, make_key, is_deterministic, OPENAI_TEMPERATURE
+
+def send_to_llm(prompt, use_cache=True, seed=None):
+    """
+    :param prompt: The user message.
+    :param use_cache: Reuse a cached answer for an identical deterministic request; False always calls the API.
+    :param seed: Sample with this seed, making the answer repeatable (and so cacheable).
+    """
+    model = "gpt-4"
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
+    sampling = {'seed': seed} if seed is not None else {}
+    # Same rule as the Ollama path: only seeded or temperature 0 requests are cached
+    cache = get_cache() if use_cache and is_deterministic(sampling, OPENAI_TEMPERATURE) else None
+    key = make_key("openai", model, messages, max_tokens=500, **sampling)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     openai.api_key = 'YOUR_OPENAI_API_KEY'
     response = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500
+        model=model,
+        messages=messages,
+        max_tokens=500,
+        **sampling
     )
-    return response.choices[0].message['content'].strip()
+    content = response.choices[0].message['content'].strip()
+    if cache is not None:
+        cache.put(key, content)
+    return content
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+import whisper_models
+from vad import VoiceActivityDetector, SPEECH_START, SPEECH_END
+
+
+class StreamingTranscriber:
+    """
+    Cuts incoming audio into segments at pauses and transcribes each segment on a
+    worker thread while recording continues, so only the last segment is left to
+    transcribe once the speaker stops. Speech and pauses are those reported by a
+    vad.VoiceActivityDetector, the same detector record_audio ends the recording with.
+
+    Usage:
+        transcriber = StreamingTranscriber(model_name="base")
+        transcriber.start()
+        ... call transcriber.feed(block) for every captured block ...
+        transcript = transcriber.finish()
+    """
+
+    def __init__(self, model_name="base", samplerate=16000, min_pause=0.6, min_segment=2.0,
+                 max_segment=25.0, on_text=None, **vad_options):
+        """
+        :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large').
+        :param samplerate: Sample rate of the blocks passed to feed().
+        :param min_pause: Seconds of quiet that end a segment.
+        :param min_segment: Segments shorter than this (in seconds) keep growing past a pause.
+        :param max_segment: Segments are cut here even without a pause (Whisper sees 30s at a time).
+        :param on_text: Optional callback(index, text) called as each segment is transcribed.
+        :param vad_options: VoiceActivityDetector settings (level_ratio, level_window, speech_ratio, ...);
+                            pass the ones record_audio uses so both agree on what is speech.
+        """
+        self.model_name = model_name
+        self.samplerate = samplerate
+        self.min_pause = min_pause
+        self.min_segment = min_segment
+        self.max_segment = max_segment
+        self.on_text = on_text
+        self._vad = VoiceActivityDetector(samplerate=samplerate, silence_duration=min_pause, **vad_options)
+
+        self._blocks = []  # Blocks of the segment currently being captured
+        self._segment_samples = 0
+        self._has_speech = False
+        self._paused = False  # The detector reported a pause since the segment's last speech
+        self._segment_count = 0
+
+        self._queue = queue.Queue()
+        self._texts = {}
+        self._worker = None
+
+    def start(self):
+        self._worker = threading.Thread(target=self._run, name="streaming-transcriber", daemon=True)
+        self._worker.start()
+        return self
+
+    def feed(self, block):
+        """
+        Adds a block of captured audio. Safe to call from a sounddevice callback:
+        it only runs the detector over the block and hands finished segments to the worker.
+        :param block: Numpy array of samples (any shape, flattened here).
+        """
+        block = np.asarray(block, dtype=np.float32).reshape(-1).copy()
+        if block.size == 0:
+            return
+        for event in self._vad.process(block):
+            if event.kind == SPEECH_START:
+                self._has_speech = True
+                self._paused = False
+            elif event.kind == SPEECH_END:
+                self._paused = True
+
+        self._blocks.append(block)
+        self._segment_samples += block.size
+        if not self._has_speech:
+            # Only keep a short lead-in of silence before speech starts
+            while self._segment_samples - self._blocks[0].size > 0.3 * self.samplerate:
+                self._segment_samples -= self._blocks.pop(0).size
+            return
+
+        length = self._segment_samples / self.samplerate
+        if (self._paused and length >= self.min_segment) or length >= self.max_segment:
+            self._emit()
+
+    def finish(self, timeout=None):
+        """
+        Flushes the last segment and waits for every segment to be transcribed.
+        :param timeout: Seconds to wait for the worker (default: no limit).
+        :return: The full transcript.
+        """
+        if self._has_speech:
+            self._emit()
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join(timeout)
+        return self.transcript()
+
+    def transcript(self):
+        """
+        :return: Text of the segments transcribed so far, in order.
+        """
+        return " ".join(self._texts[i] for i in sorted(self._texts) if self._texts[i]).strip()
+
+    def _emit(self):
+        self._queue.put((self._segment_count, self._blocks))
+        self._segment_count += 1
+        self._blocks = []
+        self._segment_samples = 0
+        # A segment cut at max_segment mid-sentence carries on into the next one
+        self._has_speech = self._vad.in_speech
+        self._paused = False
+
+    def _run(self):
+        model = whisper_models.get_model(self.model_name)
+        previous = ""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            index, blocks = item
+            audio = np.concatenate(blocks)
+            start = time.perf_counter()
+            # Condition on the tail of the previous segment so words split across a cut stay consistent
+            result = model.transcribe(audio, fp16=False, initial_prompt=previous[-200:] or None)
+            text = result['text'].strip()
+            self._texts[index] = text
+            previous = self.transcript()
+            print(f"Segment {index} ({len(audio) / self.samplerate:.1f}s) transcribed in {time.perf_counter() - start:.2f}s")
+            if self.on_text is not None:
+                self.on_text(index, text)
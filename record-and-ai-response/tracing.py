@@ -0,0 +1,255 @@
+import argparse
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+# Set TRACE_FILE (or call enable) to append spans to a JSONL file; tracing is off otherwise
+_path = None
+_file = None
+_lock = threading.Lock()
+_local = threading.local()
+run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def _peak_rss_mb():
+    # Process memory high-water mark in MB, or None where it can't be read
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+def enable(path):
+    """
+    Starts appending spans to path (one JSON object per line).
+    """
+    global _path, _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+        _path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        _file = open(path, 'a', buffering=1)
+
+
+def disable():
+    global _path, _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+        _path = _file = None
+
+
+def enabled():
+    return _file is not None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Times a block with the monotonic clock and records the peak memory of the process
+    when it ends. Spans nest per thread; each record names its parent.
+    """
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        # Attach values only known inside the block (e.g. transcript length)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.wall = time.time()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = (time.perf_counter_ns() - self.start) / 1e9
+        # remove rather than pop: spans of interleaved coroutines on one thread may end out of order
+        _local.stack.remove(self)
+        record = {
+            'run': run_id,
+            'span': self.name,
+            'parent': self.parent,
+            'thread': threading.current_thread().name,
+            'ts': round(self.wall, 3),
+            'seconds': round(seconds, 6),
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.attrs:
+            record['attrs'] = self.attrs
+        line = json.dumps(record, default=str) + "\n"
+        with _lock:
+            if _file is not None:
+                _file.write(line)
+        return False
+
+
+def span(name, **attrs):
+    """
+    Context manager timing a block: with tracing.span("transcribe", model="base"): ...
+    A shared no-op object is returned while tracing is off.
+    """
+    if _file is None:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def event(name, seconds, **attrs):
+    """
+    Records a measurement taken elsewhere (e.g. startup times) in the same format as a span.
+    """
+    if _file is None:
+        return
+    record = {'run': run_id, 'span': name, 'parent': None, 'thread': threading.current_thread().name,
+              'ts': round(time.time(), 3), 'seconds': round(seconds, 6), 'peak_rss_mb': _peak_rss_mb()}
+    if attrs:
+        record['attrs'] = attrs
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        if _file is not None:
+            _file.write(line)
+
+
+def traced(name=None):
+    """
+    Decorator recording a span around every call of the function.
+    :param name: Span name (default: the function's name).
+    """
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _file is None:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _percentile(ordered, q):
+    # Nearest-rank percentile of a sorted list
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(paths, last_runs=None):
+    """
+    Aggregates span records per name.
+    :param paths: JSONL trace files.
+    :param last_runs: Only include the most recent N runs.
+    :return: Dict of span name -> {'count', 'runs', 'p50', 'p95', 'p99', 'max', 'peak_rss_mb'}.
+    """
+    records = []
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # Partly written line from a killed run
+    if last_runs:
+        first_seen = {}
+        for record in records:
+            first_seen[record['run']] = min(record['ts'], first_seen.get(record['run'], record['ts']))
+        keep = set(sorted(first_seen, key=first_seen.get)[-last_runs:])
+        records = [r for r in records if r['run'] in keep]
+
+    seconds = defaultdict(list)
+    runs = defaultdict(set)
+    memory = defaultdict(float)
+    for record in records:
+        seconds[record['span']].append(record['seconds'])
+        runs[record['span']].add(record['run'])
+        if record.get('peak_rss_mb') is not None:
+            memory[record['span']] = max(memory[record['span']], record['peak_rss_mb'])
+    summary = {}
+    for name, values in seconds.items():
+        values.sort()
+        summary[name] = {
+            'count': len(values),
+            'runs': len(runs[name]),
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'p99': _percentile(values, 99),
+            'max': values[-1],
+            'peak_rss_mb': memory.get(name),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'span':<32} {'count':>6} {'runs':>5} {'p50 s':>9} {'p95 s':>9} {'p99 s':>9} {'max s':>9} {'peak MB':>8}")
+    for name, row in sorted(summary.items(), key=lambda item: -item[1]['p50'] * item[1]['count']):
+        peak = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] else "-"
+        print(f"{name:<32} {row['count']:>6} {row['runs']:>5} {row['p50']:>9.3f} {row['p95']:>9.3f} "
+              f"{row['p99']:>9.3f} {row['max']:>9.3f} {peak:>8}")
+
+
+if os.environ.get("TRACE_FILE"):
+    enable(os.environ["TRACE_FILE"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize JSONL traces: p50/p95/p99 per span over many runs.")
+    parser.add_argument("traces", nargs="+", help="Trace files written with TRACE_FILE / --trace.")
+    parser.add_argument("--last", type=int, help="Only the most recent N runs.")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args()
+    result = summarize(args.traces, args.last)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_summary(result)
@@ -0,0 +1,89 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import long_form
+import whisper_models
+from completion_cache import CompletionCache, make_key
+
+# Overridable with WHISPER_CACHE_PATH / WHISPER_CACHE_MB; WHISPER_CACHE=off disables caching
+DEFAULT_PATH = os.environ.get("WHISPER_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "ai-tests", "transcripts.sqlite"))
+DEFAULT_MAX_MB = float(os.environ.get("WHISPER_CACHE_MB", 32))
+
+_cache = None
+
+
+def get_cache():
+    """
+    Shared transcript cache, or None when disabled with WHISPER_CACHE=off.
+    """
+    global _cache
+    if os.environ.get("WHISPER_CACHE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    if _cache is None:
+        # Transcripts of fixed audio don't go stale, so only the size budget evicts them
+        _cache = CompletionCache(DEFAULT_PATH, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024), ttl=None)
+    return _cache
+
+
+def audio_digest(audio):
+    """
+    Hash of the audio as 16-bit PCM, so float noise from different load/resample paths
+    of the same recording doesn't change the key.
+    :param audio: 16 kHz float32 numpy array.
+    """
+    pcm = np.clip(np.round(np.asarray(audio, dtype=np.float32) * 32767), -32768, 32767).astype('<i2')
+    return hashlib.blake2b(pcm.tobytes(), digest_size=20).hexdigest()
+
+
+def _plain(result):
+    # Keep the JSON-friendly parts of a Whisper result (drops token ids, casts numpy floats)
+    segments = [{k: v for k, v in segment.items() if k in ('id', 'start', 'end', 'text', 'words')}
+                for segment in result.get('segments', [])]
+    return json.loads(json.dumps({'text': result['text'].strip(), 'language': result.get('language'),
+                                  'segments': segments}, default=float))
+
+
+def transcribe(audio, model_name="base", workers=1, use_cache=True, **options):
+    """
+    Transcribes 16 kHz float32 audio, reusing the stored result when the same audio was
+    already transcribed with the same model and options.
+    :param audio: 16 kHz float32 numpy array.
+    :param model_name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large').
+    :param workers: Worker processes for long recordings (see long_form.should_split).
+    :param use_cache: Set False to always run Whisper.
+    :param options: Decode options passed to model.transcribe (fp16 defaults to False).
+    :return: Dict with 'text' (stripped) and, depending on the path, 'segments' or 'words'.
+    """
+    options.setdefault('fp16', False)
+    split = long_form.should_split(audio, workers)
+    cache = get_cache() if use_cache else None
+    key = None
+    if cache is not None:
+        key = make_key("whisper", model_name, audio_digest(audio), long_form=split, **options)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if split:
+        options.pop('fp16')
+        result = json.loads(json.dumps(long_form.transcribe_long(audio, model_name=model_name, workers=workers, **options),
+                                       default=float))
+    else:
+        result = _plain(whisper_models.get_model(model_name).transcribe(audio, **options))
+    if key is not None:
+        cache.put(key, result)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the transcript cache.")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+    cache = CompletionCache(DEFAULT_PATH, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024), ttl=None)
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,290 @@
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from audio_capture import read_wav
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+NO_SPEECH = "no_speech"
+
+# Seconds allowed on top of the silence duration for the speaker to start before giving up
+NO_SPEECH_GRACE = 2.0
+
+# kind: one of the constants above
+# sample: stream position (in samples) the event refers to, e.g. the end of the last speech frame
+# detected_at: stream position at which the event was raised
+VadEvent = namedtuple("VadEvent", ["kind", "sample", "detected_at"])
+
+
+class VoiceActivityDetector:
+    """
+    Frame-based voice activity detector for streaming audio.
+
+    Each block passed to process() is cut into fixed-size frames whose energy and
+    zero-crossing rate are computed in one vectorized pass. Frames are compared with an
+    adaptive noise floor that is updated in O(1) per frame, and end of speech is reported
+    at the exact frame where the trailing silence reached silence_duration.
+    """
+
+    def __init__(self, samplerate=16000, frame_ms=20, silence_duration=1.5, speech_ratio=4.0,
+                 fricative_ratio=2.0, zcr_threshold=0.25, level_ratio=0.0, level_window=10,
+                 min_speech=0.15, no_speech_timeout=None):
+        """
+        :param samplerate: Sample rate of the incoming audio.
+        :param frame_ms: Frame length in milliseconds.
+        :param silence_duration: Seconds of non-speech after speech that end an utterance.
+        :param speech_ratio: A frame is speech when its energy exceeds the noise floor by this factor.
+        :param fricative_ratio: Lower energy ratio accepted for high zero-crossing (fricative) frames.
+        :param zcr_threshold: Zero-crossing rate (crossings per sample) above which a frame counts as fricative.
+        :param level_ratio: Frames must also exceed this fraction of the running mean level (0 disables).
+        :param level_window: Seconds over which the running mean level is averaged.
+        :param min_speech: Seconds of speech needed before an utterance is considered started.
+        :param no_speech_timeout: Raise a NO_SPEECH event if nothing is said for this many seconds (None disables).
+        """
+        self.samplerate = samplerate
+        self.frame_length = max(2, int(samplerate * frame_ms / 1000))
+        self.frame_seconds = self.frame_length / samplerate
+        self.silence_frames = int(np.ceil(silence_duration / self.frame_seconds))
+        self.min_speech_frames = max(1, int(np.ceil(min_speech / self.frame_seconds)))
+        self.speech_ratio = speech_ratio
+        self.fricative_ratio = fricative_ratio
+        self.zcr_threshold = zcr_threshold
+        self.level_ratio = level_ratio
+        self.no_speech_timeout = no_speech_timeout
+
+        # Per-frame smoothing factors for the noise floor and the running level
+        self._floor_fall = 0.2
+        self._floor_rise = self.frame_seconds / 2.0
+        self._floor_rise_speech = self.frame_seconds / 30.0
+        self._level_alpha = min(1.0, self.frame_seconds / level_window)
+
+        self.reset()
+
+    def reset(self):
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._position = 0  # Samples consumed into complete frames
+        self._noise_floor = None
+        self._level = 0.0
+        self.in_speech = False
+        self._speech_run = 0
+        self._speech_run_start = 0
+        self._silence_run = 0
+        self._last_speech_end = 0
+        self._heard_speech = False
+        self._timed_out = False
+
+    @property
+    def noise_floor(self):
+        """
+        Current noise floor as an RMS level.
+        """
+        return float(np.sqrt(self._noise_floor)) if self._noise_floor is not None else 0.0
+
+    def frame_features(self, frames):
+        """
+        :param frames: 2-D array of shape (n_frames, frame_length).
+        :return: Tuple of (mean energy per frame, zero-crossing rate per frame).
+        """
+        energy = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+        return energy, zcr
+
+    def process(self, block):
+        """
+        Feeds a block of audio and returns the events it triggered.
+        :param block: Numpy array of samples (any shape, flattened here).
+        :return: List of VadEvent.
+        """
+        samples = np.asarray(block, dtype=np.float32).reshape(-1)
+        if self._leftover.size:
+            samples = np.concatenate((self._leftover, samples))
+        n_frames = samples.size // self.frame_length
+        used = n_frames * self.frame_length
+        self._leftover = samples[used:].copy()
+        if n_frames == 0:
+            return []
+
+        energy, zcr = self.frame_features(samples[:used].reshape(n_frames, self.frame_length))
+        events = []
+        for i in range(n_frames):
+            self._step(float(energy[i]), float(zcr[i]), events)
+        return events
+
+    def _step(self, energy, zcr, events):
+        start = self._position
+        self._position += self.frame_length
+
+        if self._noise_floor is None:
+            self._noise_floor = max(energy, 1e-10)
+            self._level = energy
+        floor = self._noise_floor
+
+        threshold = floor * self.speech_ratio
+        if self.level_ratio:
+            threshold = max(threshold, self._level * self.level_ratio * self.level_ratio)
+        is_speech = energy > threshold or (zcr > self.zcr_threshold and energy > floor * self.fricative_ratio)
+
+        # O(1) noise floor: falls fast, rises slowly, and barely moves while someone is talking
+        if energy < floor:
+            alpha = self._floor_fall
+        elif is_speech:
+            alpha = self._floor_rise_speech
+        else:
+            alpha = self._floor_rise
+        self._noise_floor = max(floor + alpha * (energy - floor), 1e-10)
+        self._level += self._level_alpha * (energy - self._level)
+
+        if is_speech:
+            if self._speech_run == 0:
+                self._speech_run_start = start
+            self._speech_run += 1
+            self._silence_run = 0
+            self._last_speech_end = self._position
+            if not self.in_speech and self._speech_run >= self.min_speech_frames:
+                self.in_speech = True
+                self._heard_speech = True
+                events.append(VadEvent(SPEECH_START, self._speech_run_start, self._position))
+            return
+
+        self._speech_run = 0
+        if self.in_speech:
+            self._silence_run += 1
+            if self._silence_run >= self.silence_frames:
+                self.in_speech = False
+                events.append(VadEvent(SPEECH_END, self._last_speech_end, self._position))
+        elif (self.no_speech_timeout is not None and not self._heard_speech and not self._timed_out
+              and self._position >= self.no_speech_timeout * self.samplerate):
+            self._timed_out = True
+            events.append(VadEvent(NO_SPEECH, self._position, self._position))
+
+
+def legacy_endpoint(audio, samplerate, blocksize=512, silence_duration=1.5, initial_threshold_multiplier=0.8,
+                    poll_interval=0.1):
+    """
+    Replays the old record_audio polling loop over recorded audio.
+    :return: Stream time (seconds) at which the old loop would have stopped recording, or None.
+    """
+    n_blocks = audio.size // blocksize
+    norms = np.linalg.norm(audio[:n_blocks * blocksize].reshape(n_blocks, blocksize), axis=1) * 10
+    cumulative = np.cumsum(norms)
+    block_seconds = blocksize / samplerate
+    duration_of_silence = 0
+    silence_threshold = None
+    t = 0.0
+    while duration_of_silence < silence_duration:
+        t += poll_interval
+        received = int(t / block_seconds)
+        if received > n_blocks:
+            return None
+        if received == 0:
+            continue
+        average_noise_level = cumulative[received - 1] / received
+        if silence_threshold is None:
+            silence_threshold = average_noise_level * initial_threshold_multiplier
+        else:
+            silence_threshold = (silence_threshold + average_noise_level * initial_threshold_multiplier) / 2
+        if norms[received - 1] < silence_threshold:
+            duration_of_silence += block_seconds
+        else:
+            duration_of_silence = 0
+    return t
+
+
+def synthetic_speech(samplerate, seconds, amplitude=0.1, seed=0):
+    """
+    Generates a voiced, syllable-modulated signal to stand in for speech.
+    :return: Numpy array of float32 samples.
+    """
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / samplerate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0.15, None)
+    noise = np.random.default_rng(seed).standard_normal(t.size) * 0.05
+    signal = (voiced + noise) * syllables
+    return (amplitude * signal / np.max(np.abs(signal))).astype(np.float32)
+
+
+def analyze_file(path, blocksize=512, silence_duration=1.5, tail_seconds=6.0, inject_speech=None, **vad_kwargs):
+    """
+    Streams a WAV file through the detector block by block (as a live recording would arrive)
+    and compares its endpoint with the old polling loop.
+    The file is padded with tail_seconds of noise at its quietest level so both detectors can finish.
+    :param inject_speech: Seconds of synthetic speech to mix in 0.3s after the start, for
+                          fixtures that only contain background noise.
+    :return: Dict with speech boundaries and endpoint latencies in seconds.
+    """
+    audio, samplerate = read_wav(path)
+    frame = max(1, samplerate // 50)
+    n = audio.size // frame
+    quiet = np.sqrt(np.min(np.mean(audio[:n * frame].reshape(n, frame) ** 2, axis=1))) if n else 0.0
+    tail = np.random.default_rng(0).standard_normal(int(tail_seconds * samplerate)).astype(np.float32) * quiet
+    padded = np.concatenate((audio, tail))
+    true_end = None
+    if inject_speech:
+        offset = int(0.3 * samplerate)
+        speech = synthetic_speech(samplerate, inject_speech)
+        padded = np.concatenate((padded, np.zeros(max(0, offset + speech.size - padded.size + int(tail_seconds * samplerate)), dtype=np.float32)))
+        padded[offset:offset + speech.size] += speech
+        true_end = (offset + speech.size) / samplerate
+
+    vad = VoiceActivityDetector(samplerate=samplerate, silence_duration=silence_duration, **vad_kwargs)
+    events = []
+    for i in range(0, padded.size, blocksize):
+        events.extend(vad.process(padded[i:i + blocksize]))
+
+    starts = [e for e in events if e.kind == SPEECH_START]
+    ends = [e for e in events if e.kind == SPEECH_END]
+    result = {
+        'file': path,
+        'duration': round(audio.size / samplerate, 3),
+        'samplerate': samplerate,
+        'segments': len(ends),
+        'speech_start': round(starts[0].sample / samplerate, 3) if starts else None,
+        'speech_end': None,
+        'vad_endpoint': None,
+        'vad_latency': None,
+        'legacy_endpoint': None,
+        'legacy_latency': None,
+        'true_speech_end': round(true_end, 3) if true_end is not None else None,
+    }
+    if not ends:
+        return result
+
+    speech_end = ends[-1].sample / samplerate
+    result['speech_end'] = round(speech_end, 3)
+    result['vad_endpoint'] = round(ends[-1].detected_at / samplerate, 3)
+    result['vad_latency'] = round(ends[-1].detected_at / samplerate - speech_end, 3)
+    legacy = legacy_endpoint(padded, samplerate, blocksize=blocksize, silence_duration=silence_duration)
+    if legacy is not None:
+        result['legacy_endpoint'] = round(legacy, 3)
+        result['legacy_latency'] = round(legacy - speech_end, 3)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the voice activity detector over WAV files and report endpoint latency.")
+    parser.add_argument("files", nargs="+", help="WAV files, e.g. test_audio.wav test_audio_manual.wav")
+    parser.add_argument("--silence-duration", type=float, default=1.5)
+    parser.add_argument("--blocksize", type=int, default=512)
+    parser.add_argument("--inject-speech", type=float, default=None, metavar="SECONDS",
+                        help="Mix synthetic speech into the file's noise bed (the repo fixtures contain no speech).")
+    args = parser.parse_args()
+
+    for path in args.files:
+        r = analyze_file(path, blocksize=args.blocksize, silence_duration=args.silence_duration,
+                         inject_speech=args.inject_speech)
+        print(f"{r['file']}: {r['duration']}s @ {r['samplerate']} Hz, {r['segments']} utterance(s)")
+        if r['speech_end'] is None:
+            print("  no speech detected")
+            continue
+        print(f"  speech {r['speech_start']}s -> {r['speech_end']}s"
+              + (f" (true end {r['true_speech_end']}s)" if r['true_speech_end'] is not None else ""))
+        print(f"  VAD endpoint:    {r['vad_endpoint']}s (latency {r['vad_latency']}s)")
+        if r['legacy_endpoint'] is None:
+            print("  legacy endpoint: never stopped before the end of the audio")
+        else:
+            print(f"  legacy endpoint: {r['legacy_endpoint']}s (latency {r['legacy_latency']}s)")
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from lazy_imports import lazy_import
+import quantized_whisper
+
+# whisper (and torch with it) is only executed when a model is first loaded, usually on the preload thread
+whisper = lazy_import("whisper")
+
+# Default RAM budget for resident models, overridable with WHISPER_MODEL_BUDGET_MB
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("WHISPER_MODEL_BUDGET_MB", 4096))
+
+
+def model_size_bytes(model):
+    """
+    Estimates the memory held by a loaded model from its parameters and buffers.
+    :param model: A loaded Whisper (torch) model.
+    :return: Size in bytes.
+    """
+    size = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        size += tensor.numel() * tensor.element_size()
+    for module in model.modules():
+        # int8 dynamic Linear layers keep their weights in packed params, not parameters
+        if hasattr(module, '_packed_params') and callable(getattr(module, 'weight', None)):
+            weight, bias = module.weight(), module.bias()
+            size += weight.numel() * weight.element_size()
+            if bias is not None:
+                size += bias.numel() * bias.element_size()
+    return size
+
+
+def load_model(name, device=None):
+    """
+    Default loader: names ending in .int8 (e.g. "small.int8") load the int8 quantized
+    CPU model (see quantized_whisper), anything else goes to whisper.load_model.
+    """
+    if quantized_whisper.is_quantized(name):
+        return quantized_whisper.load_quantized(name)
+    return whisper.load_model(name, device=device)
+
+
+class ModelRegistry:
+    """
+    Loads each Whisper model once and keeps it resident for the whole process.
+    Models are evicted least-recently-used first once the memory budget is exceeded.
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, device=None, loader=None):
+        """
+        :param memory_budget_mb: RAM (in MB) the resident models may use before eviction kicks in.
+        :param device: Device passed to whisper.load_model (default: whisper's own choice).
+        :param loader: Callable (name, device) -> model, defaults to load_model.
+        """
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.device = device
+        self._loader = loader or load_model
+        self._models = OrderedDict()  # name -> (model, size in bytes), oldest first
+        self._lock = threading.Lock()
+        self._name_locks = {}  # name -> lock, so concurrent callers share one load
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, name):
+        """
+        Returns the model called `name`, loading it on first use.
+        :param name: The Whisper model to use (e.g., 'base', 'small', 'medium', 'large').
+        :return: The loaded model.
+        """
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                self.hits += 1
+                return self._models[name][0]
+            name_lock = self._name_locks.setdefault(name, threading.Lock())
+
+        with name_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    self.hits += 1
+                    return self._models[name][0]
+
+            start = time.perf_counter()
+            model = self._loader(name, self.device)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._models[name] = (model, model_size_bytes(model))
+                self.loads += 1
+                self.load_seconds += elapsed
+                self._evict(keep=name)
+            print(f"Loaded Whisper model '{name}' in {elapsed:.2f}s")
+            return model
+
+    def preload(self, *names, background=True):
+        """
+        Loads models ahead of time so the first transcription doesn't pay for it.
+        :param names: Model names to load.
+        :param background: Load on a daemon thread and return immediately.
+        :return: The loading thread when background is True, otherwise None.
+        """
+        def load_all():
+            for name in names:
+                self.get(name)
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="whisper-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def stats(self):
+        """
+        :return: Dict with load/hit/eviction counts and the currently resident models.
+        """
+        with self._lock:
+            return {
+                'loads': self.loads,
+                'hits': self.hits,
+                'evictions': self.evictions,
+                'load_seconds': round(self.load_seconds, 3),
+                'resident': list(self._models.keys()),
+                'resident_mb': round(sum(size for _, size in self._models.values()) / (1024 * 1024), 1),
+                'budget_mb': round(self.memory_budget / (1024 * 1024), 1),
+            }
+
+    def _evict(self, keep):
+        # Called with self._lock held. Never evicts the model that was just requested,
+        # even if it alone is larger than the budget.
+        total = sum(size for _, size in self._models.values())
+        for name in list(self._models.keys()):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            _, size = self._models.pop(name)
+            total -= size
+            self.evictions += 1
+            print(f"Evicted Whisper model '{name}' to stay within {self.memory_budget // (1024 * 1024)} MB")
+
+
+# Shared registry used by the recording scripts
+registry = ModelRegistry()
+
+
+def get_model(name="base"):
+    return registry.get(name)
+
+
+def preload(*names, background=True):
+    return registry.preload(*names, background=background)
+
+
+def stats():
+    return registry.stats()
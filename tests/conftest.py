@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOICE_DIR = os.path.join(ROOT, "record-and-ai-response")
+PROTOTYPE_DIR = os.path.join(ROOT, "prototype-file-setup")
+# The scripts import their helpers as top-level modules, from the repo root and the voice directory
+for path in (ROOT, VOICE_DIR, PROTOTYPE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
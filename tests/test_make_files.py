@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from make_files import create_files_from_response, materialize
+
+
+@pytest.mark.parametrize("response", [
+    "Sorry, I cannot help with that.",
+    '{"file_name": "index.html", "content": "<html></html>"}',
+])
+def test_response_without_an_array_is_reported_invalid(tmp_path, capsys, response):
+    stats = create_files_from_response(response, str(tmp_path))
+    assert stats['written'] == 0
+    assert "Invalid response format" in capsys.readouterr().out
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_streamed_entries_are_written_and_reported(tmp_path, capsys):
+    response = "Here you go:\n```json\n" + json.dumps([
+        {"file_name": "index.html", "content": "<html></html>"},
+        {"file_name": "src/app.js", "content": "console.log('hi');\n"},
+    ]) + "\n```"
+    chunks = [response[i:i + 7] for i in range(0, len(response), 7)]
+    assert materialize(chunks, str(tmp_path))['written'] == 2
+    out = capsys.readouterr().out
+    assert "index.html' created." in out and "2 written, 0 unchanged" in out
+    assert (tmp_path / "src" / "app.js").read_text() == "console.log('hi');\n"
+
+    assert materialize(chunks, str(tmp_path))['unchanged'] == 2
+    assert "0 written, 2 unchanged" in capsys.readouterr().out
@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+import pytest
+
+from note_pipeline import NotePipeline
+from ollama_stub import start_stub_server
+
+
+@pytest.fixture
+def server():
+    server = start_stub_server(token_delay=0.001, prompt_token_delay=0)
+    yield server
+    server.shutdown()
+
+
+def run_pipeline(pipeline, notes, timeout=20):
+    # run() on a thread, so a stuck stage fails the test instead of hanging it
+    stats = {}
+    thread = threading.Thread(target=lambda: stats.update(pipeline.run(max_notes=notes)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not finish"
+    return stats
+
+
+def make_pipeline(server, saved, transcribe=None, make_prompt=None, save=None):
+    return NotePipeline(record=lambda: np.ones(160, dtype=np.float32),
+                        transcribe=transcribe or (lambda audio: "summarize the venue plan"),
+                        make_prompt=make_prompt or (lambda transcript: f"Please summarize:\n\n{transcript}"),
+                        save=save or (lambda prompt, result, title, **note: saved.append(title)),
+                        api_url=server.api_url, use_cache=False, queue_size=1)
+
+
+def test_all_notes_saved(server):
+    saved = []
+    stats = run_pipeline(make_pipeline(server, saved), 4)
+    assert stats['saved'] == len(saved) == 4 and stats['errors'] == 0
+
+
+def test_save_receives_note_metadata(server):
+    notes = []
+    pipeline = make_pipeline(server, [], save=lambda prompt, result, title, **note: notes.append((prompt, note)))
+    pipeline.describe = lambda audio, transcript: {'action': "summarize", 'audio_hash': f"{audio.size} samples"}
+    run_pipeline(pipeline, 2)
+    assert len(notes) == 2
+    prompt, note = notes[0]
+    assert prompt == "Please summarize:\n\nsummarize the venue plan"
+    assert note['transcript'] == "summarize the venue plan"
+    assert note['action'] == "summarize" and note['audio_hash'] == "160 samples"
+    assert set(note['timings']) == {'transcribe', 'response'}
+
+
+@pytest.mark.parametrize("stage", ["transcribe", "make_prompt", "save"])
+def test_failing_note_is_counted_and_later_notes_continue(server, stage):
+    saved = []
+    calls = {'n': 0}
+
+    def flaky(result):
+        def call(*args, **kwargs):
+            calls['n'] += 1
+            if calls['n'] % 2:
+                raise ValueError(f"{stage} broke")
+            return result(*args, **kwargs)
+        return call
+
+    stages = {'transcribe': dict(transcribe=flaky(lambda audio: "summarize the venue plan")),
+              'make_prompt': dict(make_prompt=flaky(lambda transcript: f"Please summarize:\n\n{transcript}")),
+              'save': dict(save=flaky(lambda prompt, result, title, **note: saved.append(title)))}
+    stats = run_pipeline(make_pipeline(server, saved, **stages[stage]), 6)
+    assert stats['errors'] == 3 and stats['saved'] == len(saved) == 3
+
+
+def test_unexpected_model_error_does_not_stop_the_pipeline(server, monkeypatch):
+    import json
+    import note_pipeline
+
+    generate_note = note_pipeline.generate_note
+    calls = {'n': 0}
+
+    async def flaky_generate_note(*args, **kwargs):
+        calls['n'] += 1
+        if calls['n'] % 2:
+            json.loads("{truncated")  # e.g. a stream cut off mid-line
+        return await generate_note(*args, **kwargs)
+
+    monkeypatch.setattr(note_pipeline, "generate_note", flaky_generate_note)
+    saved = []
+    stats = run_pipeline(make_pipeline(server, saved), 4)
+    assert stats['errors'] == 2 and stats['saved'] == len(saved) == 2
+
+
+def test_stage_that_cannot_start_drains_its_queue(server, monkeypatch):
+    def broken_client(*args, **kwargs):
+        raise RuntimeError("no client")
+
+    monkeypatch.setattr("note_pipeline.AsyncOllamaClient", broken_client)
+    saved = []
+    pipeline = make_pipeline(server, saved)
+    stats = run_pipeline(pipeline, 5)
+    assert stats['recorded'] == 5 and stats['errors'] == 5 and stats['saved'] == 0
@@ -0,0 +1,40 @@
+import sqlite3
+import time
+
+from note_store import NoteStore
+
+
+def written(path):
+    # Counted through a separate connection, as note_store.py run from another shell would see it
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+
+def test_queued_note_is_written_after_flush_seconds_without_another_add(tmp_path):
+    path = str(tmp_path / "notes.sqlite")
+    store = NoteStore(path, batch_size=32, flush_seconds=0.2)
+    store.add("remember to book the venue", response="Booked.", title="Venue")
+    assert written(path) == 0
+    deadline = time.monotonic() + 5
+    while written(path) == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert written(path) == 1
+    store.close()
+
+
+def test_full_batch_and_close_write_immediately(tmp_path):
+    path = str(tmp_path / "notes.sqlite")
+    store = NoteStore(path, batch_size=2, flush_seconds=60)
+    store.add("first")
+    store.add("second")
+    assert written(path) == 2
+    store.add("third")
+    store.close()
+    assert written(path) == 3
+
+
+def test_search_sees_queued_notes(tmp_path):
+    store = NoteStore(str(tmp_path / "notes.sqlite"), flush_seconds=60)
+    store.add("the caterer needs the headcount by friday", title="Catering")
+    assert [note['title'] for note in store.search("caterer")] == ["Catering"]
+    store.close()
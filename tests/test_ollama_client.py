@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from completion_cache import CompletionCache
+from ollama_client import AsyncOllamaClient, OllamaError
+from ollama_stub import start_stub_server
+
+
+@pytest.fixture
+def server():
+    server = start_stub_server(token_delay=0.001, prompt_token_delay=0)
+    yield server
+    server.shutdown()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_stream_yields_tokens_in_order_then_final_chunk(server):
+    server.respond = lambda payload: "one two three four"
+
+    async def collect():
+        async with AsyncOllamaClient(server.api_url) as client:
+            return [chunk async for chunk in client.stream("count please", "stub")]
+
+    chunks = run(collect())
+    assert [c['response'] for c in chunks[:-1]] == ["one ", "two ", "three ", "four"]
+    assert not any(c['done'] for c in chunks[:-1])
+    final = chunks[-1]
+    assert final['done'] and final['response'] == ""
+    assert final['prompt_eval_count'] == 2
+    assert len(final['context']) == 2 + 4
+
+
+def test_generate_collects_response_and_extends_context(server):
+    tokens = []
+
+    async def generate():
+        async with AsyncOllamaClient(server.api_url) as client:
+            first = await client.generate("hello there", "stub", on_token=tokens.append)
+            second = await client.generate("again", "stub", context=first['context'])
+            return first, second
+
+    first, second = run(generate())
+    assert "".join(tokens) == first['response'] == "Stub response to: hello there"
+    assert first['first_token_seconds'] is not None
+    assert second['context'][:len(first['context'])] == first['context']
+    assert server.requests[1]['context'] == first['context']
+
+
+def test_retries_503_until_success(server):
+    server.fail_next = 2
+
+    async def generate():
+        async with AsyncOllamaClient(server.api_url, retries=3, backoff=0.01) as client:
+            return await client.generate("hello", "stub")
+
+    assert run(generate())['response'] == "Stub response to: hello"
+    assert len(server.requests) == 3
+
+
+def test_gives_up_after_retry_budget(server):
+    server.fail_next = 10
+
+    async def generate():
+        async with AsyncOllamaClient(server.api_url, retries=2, backoff=0.01) as client:
+            return await client.generate("hello", "stub")
+
+    with pytest.raises(OllamaError) as error:
+        run(generate())
+    assert error.value.status == 503
+    assert len(server.requests) == 3
+
+
+def test_max_concurrency_limits_requests_in_flight(server):
+    server.token_delay = 0.02
+
+    async def generate_many():
+        async with AsyncOllamaClient(server.api_url, max_connections=8, max_concurrency=2) as client:
+            await asyncio.gather(*(client.generate(f"note {i}", "stub") for i in range(6)))
+
+    run(generate_many())
+    assert len(server.requests) == 6
+    assert server.max_in_flight == 2
+
+
+def test_cache_hit_skips_server(server):
+    cache = CompletionCache(":memory:")
+    options = {'temperature': 0}
+
+    async def generate_twice():
+        async with AsyncOllamaClient(server.api_url, cache=cache) as client:
+            first = await client.generate("cache me", "stub", options=options)
+            tokens = []
+            second = await client.generate("cache me", "stub", on_token=tokens.append, options=options)
+            return first, second, tokens
+
+    first, second, tokens = run(generate_twice())
+    assert len(server.requests) == 1
+    assert second['cached'] and not first.get('cached')
+    assert second['response'] == first['response'] == "".join(tokens)
+
+
+def test_use_cache_false_and_sampling_reach_server(server):
+    cache = CompletionCache(":memory:")
+
+    async def generate():
+        async with AsyncOllamaClient(server.api_url, cache=cache) as client:
+            for _ in range(2):
+                await client.generate("fresh", "stub", use_cache=False, options={'temperature': 0})
+                await client.generate("sampled", "stub", options={'temperature': 0.7})
+
+    run(generate())
+    assert len(server.requests) == 4
+
+
+def test_default_sampling_is_never_cached(server):
+    cache = CompletionCache(":memory:")
+
+    async def generate():
+        async with AsyncOllamaClient(server.api_url, cache=cache) as client:
+            for options in (None, {'num_ctx': 4096}, None, {'num_ctx': 4096}):
+                await client.generate("default sampling", "stub", options=options)
+            for _ in range(2):
+                await client.generate("seeded", "stub", options={'seed': 7, 'num_ctx': 4096})
+
+    run(generate())
+    assert len(server.requests) == 5
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from completion_cache import CompletionCache
+from ollama_client import AsyncOllamaClient
+from ollama_stub import start_stub_server
+from prompt_contexts import PromptContextCache
+
+INSTRUCTION = "Please summarize the following text:\n\n"
+
+
+@pytest.fixture
+def server():
+    server = start_stub_server(token_delay=0.001, prompt_token_delay=0)
+    yield server
+    server.shutdown()
+
+
+def send(server, contexts, transcripts, between=None):
+    async def run():
+        async with AsyncOllamaClient(server.api_url) as client:
+            for i, transcript in enumerate(transcripts):
+                if between is not None:
+                    between(i)
+                prompt, fields = await contexts.prepare(client, "stub", INSTRUCTION + transcript)
+                await client.generate(prompt, "stub", use_cache=False, **fields)
+    asyncio.run(run())
+
+
+def test_instruction_is_warmed_once_and_only_the_rest_is_sent(server):
+    contexts = PromptContextCache([INSTRUCTION])
+    send(server, contexts, ["first note", "second note", "third note"])
+    assert (contexts.warmed, contexts.reused) == (1, 2)
+    prompts = [request['prompt'] for request in server.requests]
+    assert prompts[0].startswith(INSTRUCTION.rstrip()) and prompts[1:] == ["first note", "second note", "third note"]
+    assert server.requests[1]['context'] == server.requests[2]['context']
+
+
+def test_stored_context_is_reused_by_a_later_run(server):
+    store = CompletionCache(":memory:")
+    send(server, PromptContextCache([INSTRUCTION], cache=store), ["first note"])
+    later = PromptContextCache([INSTRUCTION], cache=store)
+    send(server, later, ["second note"])
+    assert later.warmed == 0 and later.reused == 1
+
+
+def test_model_pulled_during_a_run_is_noticed_after_digest_ttl(server):
+    contexts = PromptContextCache([INSTRUCTION], digest_ttl=0)
+
+    def pull_new_model(i):
+        if i == 2:
+            server.model_digest = "sha256:updated"
+
+    send(server, contexts, ["one", "two", "three", "four"], between=pull_new_model)
+    assert (contexts.warmed, contexts.reused) == (2, 2)
+
+
+def test_digest_is_cached_within_ttl(server):
+    contexts = PromptContextCache([INSTRUCTION], digest_ttl=3600)
+
+    def pull_new_model(i):
+        if i == 1:
+            server.model_digest = "sha256:updated"
+
+    send(server, contexts, ["one", "two"], between=pull_new_model)
+    assert (contexts.warmed, contexts.reused) == (1, 1)
+
+
+def test_model_digest_from_tags(server):
+    async def digests():
+        async with AsyncOllamaClient(server.api_url) as client:
+            before = await client.model_digest("stub")
+            server.model_digest = "sha256:new"
+            return before, await client.model_digest("stub"), await client.model_digest("missing")
+
+    assert asyncio.run(digests()) == ("sha256:stub", "sha256:new", None)
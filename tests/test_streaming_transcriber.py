@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from streaming_transcriber import StreamingTranscriber
+from vad import synthetic_speech
+
+SAMPLERATE = 16000
+
+
+def quiet(seconds, seed=1):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SAMPLERATE)) * 1e-3).astype(np.float32)
+
+
+def segments(transcriber, audio, blocksize=512):
+    # Feeds the audio as a recording would arrive and returns the queued segment lengths in seconds
+    for start in range(0, audio.size, blocksize):
+        transcriber.feed(audio[start:start + blocksize])
+    if transcriber._has_speech:
+        transcriber._emit()
+    lengths = []
+    while not transcriber._queue.empty():
+        index, blocks = transcriber._queue.get()
+        lengths.append(sum(block.size for block in blocks) / SAMPLERATE)
+    return lengths
+
+
+def test_cuts_at_the_pauses_the_detector_reports():
+    audio = np.concatenate((quiet(1.0), synthetic_speech(SAMPLERATE, 2.5), quiet(1.0, seed=2),
+                            synthetic_speech(SAMPLERATE, 2.5, seed=3), quiet(0.5, seed=4)))
+    lengths = segments(StreamingTranscriber(samplerate=SAMPLERATE, min_pause=0.6), audio)
+    assert len(lengths) == 2
+    # Each segment holds its speech, a short lead-in and the pause that ended it
+    assert all(2.5 <= length <= 4.0 for length in lengths)
+
+
+def test_short_utterances_are_joined_and_long_ones_split():
+    short = np.concatenate([np.concatenate((synthetic_speech(SAMPLERATE, 0.6, seed=i), quiet(0.8, seed=i)))
+                            for i in range(3)])
+    assert len(segments(StreamingTranscriber(samplerate=SAMPLERATE, min_segment=3.0), short)) == 1
+
+    talk = np.concatenate((quiet(1.0), synthetic_speech(SAMPLERATE, 10.0)))
+    lengths = segments(StreamingTranscriber(samplerate=SAMPLERATE, max_segment=4.0), talk)
+    assert len(lengths) == 3 and max(lengths) <= 4.1
+
+
+def test_silence_alone_is_never_sent():
+    assert segments(StreamingTranscriber(samplerate=SAMPLERATE), quiet(5.0)) == []
@@ -0,0 +1,100 @@
+import pytest
+
+from todoist_store import TaskStore, make_session
+from todoist_stub import start_stub_server
+
+
+@pytest.fixture
+def server():
+    server = start_stub_server()
+    yield server
+    server.shutdown()
+
+
+def open_store(server, path):
+    return TaskStore("stub-token", path=path, sync_url=server.sync_url, session=make_session())
+
+
+def test_incremental_sync_sends_saved_token_and_applies_changes(server, tmp_path):
+    first = server.add_task("Book the venue", "2024-09-16")
+    second = server.add_task("Email the caterer", "2024-09-18T10:00:00")
+    store = open_store(server, tmp_path / "tasks.json")
+    assert store.sync() == 2
+    assert server.requests[-1]['sync_token'] == "*"
+    token = store.sync_token
+
+    added = server.add_task("Draft the agenda", "2024-09-17")
+    server.update_task(first, content="Book the big venue")
+    assert store.sync() == 2
+    assert server.requests[-1]['sync_token'] == token
+    assert store.tasks[first]['content'] == "Book the big venue"
+    assert [t['id'] for t in store.tasks_between("2024-09-01", "2024-09-30")] == [first, added, second]
+
+    assert store.sync() == 0  # Nothing changed since the last token
+
+
+def test_store_reopens_from_disk_and_continues_incrementally(server, tmp_path):
+    path = tmp_path / "tasks.json"
+    server.add_task("Book the venue", "2024-09-16")
+    store = open_store(server, path)
+    store.sync()
+
+    reopened = open_store(server, path)
+    assert reopened.sync_token == store.sync_token
+    assert reopened.tasks == store.tasks
+    assert [t['content'] for t in reopened.tasks_between("2024-09-16", "2024-09-16")] == ["Book the venue"]
+
+    server.add_task("Email the caterer", "2024-09-18")
+    assert reopened.sync() == 1
+    assert server.requests[-1]['sync_token'] == store.sync_token
+    assert len(reopened) == 2
+
+
+def test_completed_and_deleted_tasks_are_removed(server, tmp_path):
+    done = server.add_task("Book the venue", "2024-09-16")
+    gone = server.add_task("Email the caterer", "2024-09-18")
+    kept = server.add_task("Draft the agenda", "2024-09-17")
+    store = open_store(server, tmp_path / "tasks.json")
+    store.sync()
+
+    server.complete_task(done)
+    server.delete_task(gone)
+    assert store.sync() == 2
+    assert set(store.tasks) == {kept}
+    assert [t['id'] for t in store.tasks_between("2024-01-01", "2024-12-31")] == [kept]
+    assert open_store(server, tmp_path / "tasks.json").tasks.keys() == {kept}
+
+
+def test_rescheduled_task_moves_in_the_index(server, tmp_path):
+    task = server.add_task("Book the venue", "2024-09-16")
+    store = open_store(server, tmp_path / "tasks.json")
+    store.sync()
+    server.update_task(task, due_date="2024-10-01")
+    store.sync()
+    assert store.tasks_between("2024-09-01", "2024-09-30") == []
+    assert [t['id'] for t in store.tasks_between("2024-10-01", "2024-10-01")] == [task]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2024-09-16", "2024-09-18", ["Mon", "Mon late", "Tue", "Wed"]),  # Both ends inclusive
+    ("2024-09-17", "2024-09-17", ["Tue"]),
+    ("2024-09-16T23:59:00", "2024-09-17T00:00:00", ["Mon", "Mon late", "Tue"]),  # Datetimes compare by day
+    ("2024-09-19", "2024-09-30", []),
+    ("2024-09-18", "2024-09-16", []),
+])
+def test_tasks_between_boundaries(server, tmp_path, start, end, expected):
+    for content, due in [("Sun", "2024-09-15"), ("Mon", "2024-09-16"), ("Mon late", "2024-09-16T22:00:00"),
+                         ("Tue", "2024-09-17"), ("Wed", "2024-09-18"), ("No date", None)]:
+        server.add_task(content, due)
+    store = open_store(server, None)
+    store.sync()
+    assert [t['content'] for t in store.tasks_between(start, end)] == expected
+
+
+def test_tasks_between_accepts_dates_and_datetimes(server):
+    from datetime import date, datetime
+
+    server.add_task("Mon", "2024-09-16")
+    store = open_store(server, None)
+    store.sync()
+    assert len(store.tasks_between(date(2024, 9, 16), datetime(2024, 9, 16, 8))) == 1
@@ -1,5 +1,6 @@
 import requests
 from datetime import datetime, timedelta
+from todoist_store import TaskStore, make_session
 
 # Replace this with your Todoist API token
 API_TOKEN = '2001d2f1c144be2ee3adf65f87031a2f3ec3daa6'
@@ -7,12 +8,16 @@ API_TOKEN = '2001d2f1c144be2ee3adf65f87031a2f3ec3daa6'
 # Todoist API base URL
 BASE_URL = 'https://api.todoist.com/rest/v2/'
 
+# Keep-alive connections shared by every request
+session = make_session()
+_store = None
+
 # Function to fetch tasks from Todoist
 def fetch_tasks():
     headers = {
         'Authorization': f'Bearer {API_TOKEN}',
     }
-    response = requests.get(f'{BASE_URL}tasks', headers=headers)
+    response = session.get(f'{BASE_URL}tasks', headers=headers)
     
     if response.status_code == 200:
         return response.json()
@@ -20,25 +25,23 @@ def fetch_tasks():
         print(f"Error: {response.status_code} - {response.text}")
         return []
 
+def get_store():
+    """
+    Local task store, synced incrementally: after the first run only changed tasks are downloaded.
+    """
+    global _store
+    if _store is None:
+        _store = TaskStore(API_TOKEN, session=session)
+    try:
+        _store.sync()
+    except requests.RequestException as e:
+        print(f"Error: {e} - using tasks from the last sync")
+    return _store
+
 # Function to list tasks within a specific time period
 def list_tasks_within_time_period(start_date, end_date):
-    # Fetch all tasks
-    tasks = fetch_tasks()
-
-    # Convert start_date and end_date to datetime objects
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date, "%Y-%m-%d")
-
-    # Filter tasks based on due dates
-    filtered_tasks = []
-    for task in tasks:
-        due_info = task.get('due')
-        if due_info:
-            due_date_str = due_info.get('date')
-            if due_date_str:
-                due_date = datetime.strptime(due_date_str.split('T')[0], "%Y-%m-%d")
-                if start_date <= due_date <= end_date:
-                    filtered_tasks.append(task)
+    # Tasks are indexed by due date, so this is a range lookup rather than a scan
+    filtered_tasks = get_store().tasks_between(start_date, end_date)
 
     # Print the filtered tasks
     if filtered_tasks:
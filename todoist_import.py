@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from todoist_store import SYNC_URL, make_session
+
+# The Sync API accepts at most 100 commands per request
+MAX_COMMANDS = 100
+# Sync requests allowed per user in a rolling window (Todoist: 1000 per 15 minutes)
+RATE_LIMIT = (1000, 15 * 60)
+# Namespace for command uuids derived from a plan, so re-sending the same plan is a no-op
+_NAMESPACE = uuid.UUID("6f1c2a52-3c1e-4b8e-9d59-2a9f4e0b7c11")
+
+# One task parsed from an LLM todo plan; parent is the index of its parent task (or None)
+PlannedTask = namedtuple("PlannedTask", ["content", "due", "parent", "description"])
+ImportResult = namedtuple("ImportResult", ["ids", "errors", "requests"])
+
+_ITEM = re.compile(r'^(?P<indent>[ \t]*)(?:[-*+]|\d+[.)])\s+(?:\[(?P<check>[ xX])\]\s*)?(?P<text>.+?)\s*$')
+_HEADING = re.compile(r'^\s*(?:#{1,6}\s+(?P<hash>.+?)|\*\*(?P<bold>[^*]+?)\*\*:?|__(?P<under>[^_]+?)__:?)\s*$')
+_DATE = re.compile(r'\b(\d{4}-\d{2}-\d{2})\b')
+_DAY = re.compile(r'\b(today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', re.IGNORECASE)
+_SECTION = re.compile(r'^#\s+(?:Processed Result|Response:?)\s*$|^Response:\s*$', re.MULTILINE)
+
+
+def _due(text):
+    """
+    Due date named in a heading or task: an ISO date as {'date': ...}, a weekday (or
+    today/tomorrow) as {'string': ...} for Todoist to resolve, otherwise None.
+    """
+    match = _DATE.search(text)
+    if match:
+        return {'date': match.group(1)}
+    match = _DAY.search(text)
+    if match:
+        return {'string': match.group(1).lower()}
+    return None
+
+
+def _clean(text):
+    text = re.sub(r'\*\*|__|`', "", text).strip()
+    return text.rstrip(":").strip()
+
+
+def parse_todo_plan(text):
+    """
+    Turns an LLM todo list or weekly plan (Markdown lists, optionally under day headings)
+    into tasks. Nested items become subtasks of the item above them; a date or weekday in
+    a heading becomes the due date of the items under it. Checked items are skipped.
+    :param text: The model's response, or a saved note containing it.
+    :return: List of PlannedTask, parents before their subtasks.
+    """
+    # Saved notes also contain the transcript; only the response holds the plan
+    section = _SECTION.search(text)
+    if section:
+        text = text[section.end():]
+
+    tasks = []
+    stack = []  # (indent, task index or None when the item was skipped)
+    section_due = None
+    for line in text.splitlines():
+        heading = _HEADING.match(line)
+        if heading:
+            section_due = _due(heading.group('hash') or heading.group('bold') or heading.group('under'))
+            stack = []
+            continue
+        item = _ITEM.match(line)
+        if not item:
+            continue
+        indent = len(item.group('indent').expandtabs(4))
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+        if item.group('check') in ("x", "X") or (stack and parent is None):
+            stack.append((indent, None))  # Skipped, and so are its subtasks
+            continue
+
+        content, _, description = _clean(item.group('text')).partition(": ")
+        if not content:
+            stack.append((indent, None))
+            continue
+        due = _due(content) or (section_due if parent is None else None)
+        tasks.append(PlannedTask(content, due, parent, description.strip()))
+        stack.append((indent, len(tasks) - 1))
+    return tasks
+
+
+class RateLimiter:
+    """
+    Sliding-window pacing: wait() blocks until another request fits in the window.
+    """
+
+    def __init__(self, max_requests, period):
+        self.max_requests = max_requests
+        self.period = period
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= self.period:
+                self._sent.popleft()
+            if len(self._sent) >= self.max_requests:
+                time.sleep(self.period - (now - self._sent[0]))
+                self._sent.popleft()
+            self._sent.append(time.monotonic())
+
+
+class TodoistImporter:
+    """
+    Creates tasks through the Sync API in batches of up to MAX_COMMANDS item_add commands.
+
+    Every task gets a temp_id, so a subtask can name its parent before the parent exists;
+    temp ids resolved by earlier batches are swapped for the real ids. Command uuids are
+    idempotency keys: Todoist ignores a uuid it has already applied, so a request retried
+    after a timeout (make_session retries 429, 5xx and dropped connections, honouring
+    Retry-After) or a whole import run again with the same key creates nothing twice.
+    """
+
+    def __init__(self, token, sync_url=SYNC_URL, session=None, batch_size=MAX_COMMANDS, rate_limit=RATE_LIMIT):
+        """
+        :param token: Todoist API token.
+        :param sync_url: Sync endpoint (point it at todoist_stub for local runs).
+        :param session: requests.Session to use (default: make_session()).
+        :param batch_size: Commands per request, at most MAX_COMMANDS.
+        :param rate_limit: (requests, seconds) to stay under.
+        """
+        self.token = token
+        self.sync_url = sync_url
+        self.session = session or make_session()
+        self.batch_size = min(batch_size, MAX_COMMANDS)
+        self.limiter = RateLimiter(*rate_limit)
+
+    def commands(self, tasks, project_id=None, key=None):
+        """
+        :param tasks: PlannedTasks, parents before their subtasks.
+        :param project_id: Project to add top-level tasks to (default: the inbox).
+        :param key: Idempotency key for this import; defaults to a hash of the tasks, so
+                    importing the same plan again is a no-op. Pass a new key to repeat it.
+        :return: List of item_add commands.
+        """
+        if key is None:
+            key = hashlib.blake2b(json.dumps(tasks).encode(), digest_size=16).hexdigest()
+        temp_ids = [str(uuid.uuid5(_NAMESPACE, f"{key}/temp/{i}")) for i in range(len(tasks))]
+        commands = []
+        for i, task in enumerate(tasks):
+            args = {'content': task.content}
+            if task.description:
+                args['description'] = task.description
+            if task.due:
+                args['due'] = task.due
+            if task.parent is not None:
+                args['parent_id'] = temp_ids[task.parent]
+            elif project_id:
+                args['project_id'] = project_id
+            commands.append({'type': "item_add", 'uuid': str(uuid.uuid5(_NAMESPACE, f"{key}/{i}")),
+                             'temp_id': temp_ids[i], 'args': args})
+        return commands
+
+    def send(self, commands):
+        """
+        Sends one batch of commands.
+        :return: The response's (sync_status, temp_id_mapping).
+        """
+        self.limiter.wait()
+        response = self.session.post(self.sync_url, headers={'Authorization': f'Bearer {self.token}'},
+                                     data={'commands': json.dumps(commands)}, timeout=30)
+        response.raise_for_status()
+        payload = response.json()
+        return payload.get('sync_status', {}), payload.get('temp_id_mapping', {})
+
+    def push(self, tasks, project_id=None, key=None):
+        """
+        Creates the tasks, batch by batch.
+        :return: ImportResult of ids (real task id per task, None if it failed), errors
+                 ({task index: error}) and the number of requests made.
+        """
+        commands = self.commands(tasks, project_id, key)
+        mapping = {}
+        errors = {}
+        requests_made = 0
+        for start in range(0, len(commands), self.batch_size):
+            batch = []
+            for command in commands[start:start + self.batch_size]:
+                parent = command['args'].get('parent_id')
+                if parent in mapping:
+                    command = dict(command, args=dict(command['args'], parent_id=mapping[parent]))
+                batch.append(command)
+            status, temp_id_mapping = self.send(batch)
+            requests_made += 1
+            mapping.update(temp_id_mapping)
+            for offset, command in enumerate(batch):
+                result = status.get(command['uuid'], "missing from sync_status")
+                if result != "ok":
+                    errors[start + offset] = result
+        ids = [mapping.get(command['temp_id']) for command in commands]
+        return ImportResult(ids, errors, requests_made)
+
+
+def import_todo_plan(text, token, project_id=None, **importer_options):
+    """
+    Parses a todo plan and creates its tasks in Todoist.
+    :return: ImportResult (see TodoistImporter.push); empty when the text has no tasks.
+    """
+    tasks = parse_todo_plan(text)
+    if not tasks:
+        return ImportResult([], {}, 0)
+    return TodoistImporter(token, **importer_options).push(tasks, project_id)
+
+
+def _benchmark(task_count, latency):
+    # One REST call per task against batched sync commands, on the stub with simulated latency
+    from todoist_stub import start_stub_server
+
+    lines = []
+    for i in range(task_count // 4):
+        lines.append(f"- Task {i}: first part of the plan")
+        lines += [f"  - Step {j} of task {i}" for j in range(3)]
+    tasks = parse_todo_plan("\n".join(lines))
+
+    server = start_stub_server()
+    server.latency = latency
+    session = make_session()
+    headers = {'Authorization': "Bearer stub-token"}
+    start = time.perf_counter()
+    rest_ids = []
+    for task in tasks:
+        body = {'content': task.content}
+        if task.parent is not None:
+            body['parent_id'] = rest_ids[task.parent]
+        rest_ids.append(session.post(server.rest_url, headers=headers, json=body).json()['id'])
+    rest_seconds = time.perf_counter() - start
+
+    importer = TodoistImporter("stub-token", sync_url=server.sync_url, session=session)
+    start = time.perf_counter()
+    result = importer.push(tasks)
+    batched_seconds = time.perf_counter() - start
+    again = importer.push(tasks)
+    server.shutdown()
+
+    print(f"{len(tasks)} tasks, {latency * 1000:.0f} ms simulated latency per request")
+    print(f"REST, one call per task: {rest_seconds:7.3f}s  {len(tasks)} requests")
+    print(f"batched sync commands:   {batched_seconds:7.3f}s  {result.requests} requests, {len(result.errors)} errors")
+    print(f"same plan imported again: {len(server.tasks) - 2 * len(tasks)} extra tasks created")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create Todoist tasks from an LLM todo plan (or a saved note containing one).")
+    parser.add_argument("file", nargs="?", help="Plan or note to import.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the parsed tasks without sending them.")
+    parser.add_argument("--project-id", help="Project for the new tasks (default: the inbox).")
+    parser.add_argument("--sync-url", default=SYNC_URL)
+    parser.add_argument("--benchmark", type=int, metavar="TASKS",
+                        help="Compare batched import with one REST call per task against a local stub.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per stub request.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _benchmark(args.benchmark, args.latency)
+    elif args.file:
+        with open(args.file, encoding="utf-8") as file:
+            plan = file.read()
+        if args.dry_run:
+            tasks = parse_todo_plan(plan)
+            depths = []
+            for task in tasks:
+                depths.append(0 if task.parent is None else depths[task.parent] + 1)
+                due = f"  (due {next(iter(task.due.values()))})" if task.due else ""
+                print(f"{'  ' * depths[-1]}- {task.content}{due}")
+        else:
+            result = import_todo_plan(plan, os.environ['TODOIST_API_TOKEN'], args.project_id, sync_url=args.sync_url)
+            print(f"Created {sum(i is not None for i in result.ids)} tasks in {result.requests} requests")
+            for index, error in result.errors.items():
+                print(f"  task {index}: {error}")
+    else:
+        parser.error("a file or --benchmark is required")
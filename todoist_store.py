@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Todoist's unified API; the sync endpoint returns only what changed since a sync_token
+SYNC_URL = 'https://api.todoist.com/api/v1/sync'
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-tests", "todoist-tasks.json")
+
+
+def make_session(pool_size=4, retries=3):
+    """
+    requests session with a keep-alive connection pool and retry with backoff on
+    connection errors, 429 and 5xx responses.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def due_key(task):
+    """
+    The task's due date as 'YYYY-MM-DD' (None if it has none). ISO dates sort correctly
+    as strings, so the index never has to parse them.
+    """
+    due = task.get('due')
+    if not due or not due.get('date'):
+        return None
+    return due['date'][:10]
+
+
+def _as_key(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value[:10]
+
+
+class TaskStore:
+    """
+    Local copy of the user's active tasks, kept current with Todoist's incremental sync.
+
+    The first sync downloads everything and stores the returned sync_token; later syncs
+    send the token back and only receive tasks that changed. Tasks are indexed by due
+    date in a sorted list, so range queries are two bisections. The tasks and token are
+    saved to disk whenever a sync changes them, so a new run starts incremental too.
+    """
+
+    def __init__(self, token, path=DEFAULT_PATH, sync_url=SYNC_URL, session=None):
+        """
+        :param token: Todoist API token.
+        :param path: JSON file the store is persisted to (None keeps it in memory only).
+        :param sync_url: Sync endpoint (point it at todoist_stub for local runs).
+        :param session: requests.Session to use (default: make_session()).
+        """
+        self.token = token
+        self.path = path
+        self.sync_url = sync_url
+        self.session = session or make_session()
+        self.sync_token = '*'
+        self.tasks = {}  # id -> task
+        self._index = []  # sorted (due date, id) for tasks that have a due date
+        self.last_sync = None
+        if path and os.path.exists(path):
+            self.load()
+
+    # Index
+
+    def _add(self, task):
+        self.tasks[task['id']] = task
+        key = due_key(task)
+        if key is not None:
+            insort(self._index, (key, task['id']))
+
+    def _remove(self, task_id):
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return
+        key = due_key(task)
+        if key is not None:
+            i = bisect_left(self._index, (key, task_id))
+            if i < len(self._index) and self._index[i] == (key, task_id):
+                del self._index[i]
+
+    def _rebuild(self, tasks):
+        self.tasks = {task['id']: task for task in tasks}
+        self._index = sorted((due_key(task), task['id']) for task in tasks if due_key(task) is not None)
+
+    # Sync and persistence
+
+    def sync(self):
+        """
+        Fetches changes since the last sync (everything on the first one) and applies them.
+        :return: Number of tasks added, changed or removed.
+        """
+        response = self.session.post(self.sync_url, headers={'Authorization': f'Bearer {self.token}'},
+                                     data={'sync_token': self.sync_token, 'resource_types': '["items"]'},
+                                     timeout=30)
+        response.raise_for_status()
+        payload = response.json()
+
+        items = payload.get('items', [])
+        active = [item for item in items if not item.get('is_deleted') and not item.get('checked')]
+        if payload.get('full_sync'):
+            self._rebuild(active)
+        else:
+            for item in items:
+                self._remove(item['id'])
+            for item in active:
+                self._add(item)
+        changed = bool(items) or payload['sync_token'] != self.sync_token
+        self.sync_token = payload['sync_token']
+        self.last_sync = time.time()
+        if self.path and changed:
+            self.save()
+        return len(items)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temporary, 'w') as file:
+            json.dump({'sync_token': self.sync_token, 'last_sync': self.last_sync,
+                       'tasks': list(self.tasks.values())}, file, separators=(",", ":"))
+        os.replace(temporary, self.path)
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable task store {self.path}: {e}")
+            return
+        self._rebuild(data.get('tasks', []))
+        self.sync_token = data.get('sync_token', '*')
+        self.last_sync = data.get('last_sync')
+
+    # Queries
+
+    def tasks_between(self, start, end):
+        """
+        Active tasks due between start and end, both inclusive, in due-date order.
+        :param start: 'YYYY-MM-DD' string, date or datetime.
+        :param end: 'YYYY-MM-DD' string, date or datetime.
+        :return: List of task dicts.
+        """
+        start, end = _as_key(start), _as_key(end)
+        lo = bisect_left(self._index, start, key=lambda entry: entry[0])
+        hi = bisect_right(self._index, end, key=lambda entry: entry[0])
+        return [self.tasks[task_id] for _, task_id in self._index[lo:hi]]
+
+    def __len__(self):
+        return len(self.tasks)
+
+
+def _benchmark(task_count, changes, queries):
+    # Full downloads through the REST endpoint vs incremental sync, against the stub server
+    import random
+    import tempfile
+    from todoist_stub import start_stub_server
+
+    server = start_stub_server()
+    rng = random.Random(0)
+    for i in range(task_count):
+        server.add_task(f"Task {i}", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+
+    session = make_session()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.json")
+        store = TaskStore("stub-token", path=path, sync_url=server.sync_url, session=session)
+        start = time.perf_counter()
+        store.sync()
+        print(f"initial sync:     {time.perf_counter() - start:7.3f}s  {server.bytes_sent:>10} bytes  {len(store)} tasks")
+
+        for _ in range(changes):
+            server.add_task("New task", f"2024-09-{rng.randint(14, 21):02d}")
+        server.complete_task(rng.choice(list(server.tasks)))
+        sent = server.bytes_sent
+        store = TaskStore("stub-token", path=path, sync_url=server.sync_url, session=session)  # Reloaded from disk
+        start = time.perf_counter()
+        changed = store.sync()
+        print(f"incremental sync: {time.perf_counter() - start:7.3f}s  {server.bytes_sent - sent:>10} bytes  {changed} changes")
+
+        sent = server.bytes_sent
+        start = time.perf_counter()
+        tasks = session.get(server.rest_url, headers={'Authorization': "Bearer stub-token"}).json()
+        print(f"REST full fetch:  {time.perf_counter() - start:7.3f}s  {server.bytes_sent - sent:>10} bytes")
+
+        start = time.perf_counter()
+        for _ in range(queries):
+            linear = [t for t in tasks if t.get('due') and datetime.strptime("2024-09-14", "%Y-%m-%d")
+                      <= datetime.strptime(t['due']['date'].split('T')[0], "%Y-%m-%d")
+                      <= datetime.strptime("2024-09-21", "%Y-%m-%d")]
+        linear_seconds = (time.perf_counter() - start) / queries
+        start = time.perf_counter()
+        for _ in range(queries):
+            indexed = store.tasks_between("2024-09-14", "2024-09-21")
+        indexed_seconds = (time.perf_counter() - start) / queries
+        print(f"range query: linear strptime {linear_seconds * 1000:.3f} ms, bisect {indexed_seconds * 1000:.3f} ms "
+              f"({len(indexed)} tasks, linear found {len(linear)})")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare incremental sync and indexed queries with full fetches, "
+                                                 "against a local Todoist stub.")
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+    _benchmark(args.tasks, args.changes, args.queries)
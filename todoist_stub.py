@@ -0,0 +1,228 @@
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class TodoistStubHandler(BaseHTTPRequestHandler):
+    """
+    Mimics the parts of the Todoist API the task scripts use: POST /api/v1/sync with
+    sync tokens (full sync for '*', otherwise only items changed since that token) or
+    item_add commands (deduplicated by uuid, temp ids resolved), GET /rest/v2/tasks
+    returning every active task and POST /rest/v2/tasks creating one.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self._throttled():
+            return
+        if self.path.split("?")[0] != "/rest/v2/tasks":
+            self._send_json(404, {'error': f"stub: unknown path {self.path}"})
+            return
+        with self.server.lock:
+            tasks = [dict(task) for task in self.server.tasks.values() if not task['checked'] and not task['is_deleted']]
+        self._send_json(200, tasks)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode()
+        if self._throttled():
+            return
+        if self.headers.get('Content-Type', '').startswith("application/json"):
+            fields = json.loads(body or "{}")
+        else:
+            fields = {k: v[0] for k, v in parse_qs(body).items()}
+        if self.path == "/rest/v2/tasks":
+            task_id = self.server.add_task(fields.pop('content'), fields.pop('due_date', None), **fields)
+            self._send_json(200, self.server.tasks[task_id])
+            return
+        if self.path != "/api/v1/sync":
+            self._send_json(404, {'error': f"stub: unknown path {self.path}"})
+            return
+        if 'commands' in fields:
+            self._run_commands(json.loads(fields['commands']))
+            return
+
+        with self.server.lock:
+            self.server.requests.append(fields)
+            token = fields.get('sync_token', '*')
+            full = token == '*' or not token.isdigit() or int(token) > self.server.version
+            if full:
+                items = [dict(task) for task in self.server.tasks.values() if not task['checked'] and not task['is_deleted']]
+            else:
+                since = int(token)
+                items = [dict(task) for task_id, task in self.server.tasks.items() if self.server.changed[task_id] > since]
+            payload = {'items': items, 'sync_token': str(self.server.version), 'full_sync': full}
+        self._send_json(200, payload)
+
+    def _run_commands(self, commands):
+        server = self.server
+        if len(commands) > 100:
+            self._send_json(400, {'error': "Too many commands"})
+            return
+        status = {}
+        mapping = {}
+        for command in commands:
+            with server.lock:
+                server.requests.append(command)
+                seen = server.applied.get(command['uuid'])
+            if seen is not None:
+                # Already applied: report the original outcome without doing it again
+                status[command['uuid']], temp_ids = seen
+                mapping.update(temp_ids)
+                continue
+            args = dict(command.get('args', {}))
+            if command.get('type') != "item_add" or not args.get('content'):
+                result, temp_ids = {'error': "stub: unsupported command"}, {}
+            else:
+                parent = args.get('parent_id')
+                parent = mapping.get(parent) or server.temp_ids.get(parent) or parent
+                if parent is not None and parent not in server.tasks:
+                    result, temp_ids = {'error_code': 22, 'error': "Invalid parent id"}, {}
+                else:
+                    due = args.pop('due', None)
+                    args['parent_id'] = parent
+                    task_id = server.add_task(args.pop('content'), **args)
+                    if due:
+                        server.tasks[task_id]['due'] = {'date': due.get('date') or due.get('string'),
+                                                        'string': due.get('string') or due.get('date'),
+                                                        'is_recurring': False}
+                    result, temp_ids = "ok", {command['temp_id']: task_id} if command.get('temp_id') else {}
+            with server.lock:
+                server.applied[command['uuid']] = (result, temp_ids)
+                server.temp_ids.update(temp_ids)
+            status[command['uuid']] = result
+            mapping.update(temp_ids)
+
+        if server.drop_responses:
+            # The commands were applied but the client never hears back, as after a timeout
+            server.drop_responses -= 1
+            self.close_connection = True
+            self.connection.close()
+            return
+        self._send_json(200, {'sync_status': status, 'temp_id_mapping': mapping})
+
+    def _throttled(self):
+        # Simulated network latency and a per-server request budget answered with 429
+        server = self.server
+        time.sleep(server.latency)
+        with server.lock:
+            server.request_count += 1
+            limited = server.rate_limit is not None and server.request_count > server.rate_limit
+            if limited:
+                server.throttled += 1
+                server.request_count = 0
+        if limited:
+            self.send_response(429)
+            self.send_header('Retry-After', "1")
+            self.send_header('Content-Length', "0")
+            self.end_headers()
+        return limited
+
+    def _send_json(self, status, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.lock:
+            self.server.bytes_sent += len(data)
+
+
+class TodoistStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, TodoistStubHandler)
+        self.lock = threading.Lock()
+        self.tasks = {}  # id -> task, including completed and deleted ones
+        self.changed = {}  # id -> version of its last change
+        self.version = 0
+        self.requests = []
+        self.bytes_sent = 0
+        self.applied = {}  # command uuid -> (sync_status entry, temp_id_mapping)
+        self.temp_ids = {}
+        self.latency = 0.0  # Seconds added to every request
+        self.rate_limit = None  # Requests allowed before each 429 response
+        self.request_count = 0
+        self.throttled = 0
+        self.drop_responses = 0  # Command batches to apply without answering
+        self._ids = itertools.count(1)
+        host, port = self.server_address[:2]
+        self.sync_url = f"http://{host}:{port}/api/v1/sync"
+        self.rest_url = f"http://{host}:{port}/rest/v2/tasks"
+
+    def _touch(self, task_id):
+        self.version += 1
+        self.changed[task_id] = self.version
+
+    def add_task(self, content, due_date=None, **fields):
+        """
+        :param due_date: 'YYYY-MM-DD' or a full 'YYYY-MM-DDTHH:MM:SS' timestamp.
+        :return: The new task's id.
+        """
+        with self.lock:
+            task_id = str(next(self._ids))
+            self.tasks[task_id] = {
+                'id': task_id,
+                'content': content,
+                'description': "",
+                'project_id': "1",
+                'priority': 1,
+                'labels': [],
+                'due': {'date': due_date, 'string': due_date, 'is_recurring': False} if due_date else None,
+                'checked': False,
+                'is_deleted': False,
+                'added_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                **fields,
+            }
+            self._touch(task_id)
+        return task_id
+
+    def update_task(self, task_id, **fields):
+        with self.lock:
+            if 'due_date' in fields:
+                due_date = fields.pop('due_date')
+                fields['due'] = {'date': due_date, 'string': due_date, 'is_recurring': False} if due_date else None
+            self.tasks[task_id].update(fields)
+            self._touch(task_id)
+
+    def complete_task(self, task_id):
+        self.update_task(task_id, checked=True)
+
+    def delete_task(self, task_id):
+        self.update_task(task_id, is_deleted=True)
+
+
+def start_stub_server(port=0):
+    """
+    Starts a stub Todoist server on a background thread.
+    :param port: Port to listen on (0 picks a free one).
+    :return: The server; sync_url and rest_url point at it. Call shutdown() when done.
+    """
+    server = TodoistStubServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, name="todoist-stub", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stub Todoist API server with some sample tasks.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = start_stub_server(port=args.port)
+    server.add_task("Book the venue", "2024-09-16")
+    server.add_task("Email the caterer", "2024-09-18T10:00:00")
+    server.add_task("Draft the agenda")
+    print(f"Stub Todoist listening on {server.sync_url} and {server.rest_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()